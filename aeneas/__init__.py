@@ -6,10 +6,12 @@
 to automagically synchronize audio and text.
 """
 
+from aeneas.alignmentserver import AlignmentServer
 from aeneas.analyzecontainer import AnalyzeContainer
 from aeneas.audiofile import AudioFile
-from aeneas.container import Container, ContainerFormat
-from aeneas.dtw import DTWAlgorithm, DTWAligner
+from aeneas.checkpoint import CheckpointStore
+from aeneas.container import Container, ContainerFormat, ContainerWriter
+from aeneas.dtw import DTWAlgorithm, DTWAligner, WaveFeatures
 from aeneas.espeakwrapper import ESPEAKWrapper
 from aeneas.executejob import ExecuteJob
 from aeneas.executetask import ExecuteTask
@@ -22,12 +24,17 @@ from aeneas.idsortingalgorithm import IDSortingAlgorithm
 from aeneas.job import Job, JobConfiguration
 from aeneas.language import Language
 from aeneas.logger import Logger
+from aeneas.memorygovernor import MemoryGovernor
 #from aeneas.mfcc
+from aeneas.spoolrunner import SpoolRunner
 from aeneas.syncmap import SyncMap, SyncMapFragment, SyncMapFormat
+from aeneas.syncmapcache import SyncMapCache
 from aeneas.synthesizer import Synthesizer
 from aeneas.task import Task, TaskConfiguration
 from aeneas.textfile import TextFile, TextFileFormat, TextFragment
+from aeneas.ttsbackend import ESPEAKTTSBackend, FakeTTSBackend, TTSBackend, TTSBackendType
 from aeneas.validator import Validator
+from aeneas.workqueue import WorkItem, WorkQueue, WorkQueueNode
 
 __author__ = "Alberto Pettarin"
 __copyright__ = """
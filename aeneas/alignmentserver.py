@@ -0,0 +1,751 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+A long-running alignment server,
+which executes tasks and jobs submitted over HTTP,
+without paying the startup cost of a new interpreter
+(and of importing ``numpy`` and ``scikits.audiolab``)
+for each of them.
+
+Between requests, the server keeps warm:
+
+1. the TTS backend;
+2. the pool of worker processes (if more than one worker is used);
+3. the MFCC filterbanks (see :class:`aeneas.dtw.DTWAligner`),
+   in this process and in each worker process;
+4. the decoded audio files (features) of the last requests
+   (see :class:`aeneas.globalconstants.SERVER_FEATURE_CACHE_SIZE`);
+5. the synthesized texts (features and anchors) of the last requests
+   (see :class:`aeneas.globalconstants.SERVER_SYNTHESIS_CACHE_SIZE`);
+6. the persistent sync map cache, if any
+   (see :class:`aeneas.syncmapcache.SyncMapCache`).
+
+The server listens on localhost only (by default),
+and it expects the paths in the requests
+to be readable (and writable, for the output files)
+on the machine where it runs.
+
+The requests are JSON objects, POSTed to:
+
+1. ``/task``, with keys ``audio_file_path``, ``text_file_path``,
+   ``config_string``, and, optionally, ``sync_map_file_path``
+   (the output sync map file);
+2. ``/job``, with keys ``container_path``, ``output_directory``,
+   and, optionally, ``config_string``.
+   Small jobs can be sent in the request itself, with key
+   ``container_data`` (the base64-encoded contents of the container)
+   instead of ``container_path``, and, omitting ``output_directory``,
+   the output container is returned in the response,
+   with key ``output_container_data`` (base64-encoded):
+   such jobs are executed in memory, without extracting the container.
+
+The response is a JSON object with a ``success`` key,
+and, for tasks, the computed ``sync_map``
+(a list of ``[identifier, begin, end]`` triples).
+
+``GET /status`` returns the status of the server.
+"""
+
+import base64
+import BaseHTTPServer
+import collections
+import copy
+import json
+import multiprocessing
+import os
+import shutil
+import SocketServer
+import tempfile
+import threading
+import time
+
+import aeneas.globalconstants as gc
+import aeneas.globalfunctions as gf
+from aeneas.executejob import ExecuteJob
+from aeneas.executetask import ExecuteTask
+from aeneas.logger import Logger
+from aeneas.task import Task
+from aeneas.ttsbackend import create_tts_backend
+
+__author__ = "Alberto Pettarin"
+__copyright__ = """
+    Copyright 2012-2013, Alberto Pettarin (www.albertopettarin.it)
+    Copyright 2013-2015, ReadBeyond Srl (www.readbeyond.it)
+    """
+__license__ = "GNU AGPL v3"
+__version__ = "1.0.0"
+__email__ = "aeneas@readbeyond.it"
+__status__ = "Production"
+
+class AlignmentServer(object):
+    """
+    A server executing the tasks and jobs submitted over HTTP.
+
+    Call ``serve_forever`` to start serving requests,
+    and ``shutdown`` (from another thread) to stop.
+
+    :param host: the host to listen on. Default:
+                 :class:`aeneas.globalconstants.SERVER_HOST`
+    :type  host: string
+    :param port: the port to listen on (if ``0``, pick a free one). Default:
+                 :class:`aeneas.globalconstants.SERVER_PORT`
+    :type  port: int
+    :param workers: the number of tasks executed at the same time;
+                    if greater than ``1``, use a pool of worker processes.
+                    Default:
+                    :class:`aeneas.globalconstants.SERVER_WORKERS`
+    :type  workers: int
+    :param tts_backend: the TTS backend used to synthesize the text
+                        of each task; if ``None``, use the default one
+    :type  tts_backend: :class:`aeneas.ttsbackend.TTSBackend`
+    :param cache_directory: the directory of the persistent sync map cache;
+                            if ``None``, the cache is not used.
+                            Default:
+                            :class:`aeneas.globalconstants.EXECUTE_TASK_CACHE_DIRECTORY`
+    :type  cache_directory: string (path)
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    """
+
+    TAG = "AlignmentServer"
+
+    def __init__(
+            self,
+            host=gc.SERVER_HOST,
+            port=gc.SERVER_PORT,
+            workers=gc.SERVER_WORKERS,
+            tts_backend=None,
+            cache_directory=gc.EXECUTE_TASK_CACHE_DIRECTORY,
+            logger=None
+        ):
+        self.logger = logger
+        if self.logger == None:
+            self.logger = Logger()
+        self.workers = max(1, workers)
+        self.tts_backend = tts_backend
+        if self.tts_backend == None:
+            self.tts_backend = create_tts_backend(logger=Logger())
+        self.cache_directory = cache_directory
+        self.lock = threading.Lock()
+        self.slots = threading.Semaphore(self.workers)
+        self.features = _SharedCache(
+            gc.SERVER_FEATURE_CACHE_SIZE,
+            self._remove_shared
+        )
+        self.synthesis = _SharedCache(
+            gc.SERVER_SYNTHESIS_CACHE_SIZE,
+            lambda value: self._remove_shared(value[0])
+        )
+        self.shared_directory = None
+        self.pool = None
+        if self.workers > 1:
+            self._log("Starting %d worker processes" % self.workers)
+            self.pool = multiprocessing.Pool(processes=self.workers)
+            self.shared_directory = tempfile.mkdtemp(dir=gf.custom_tmp_dir())
+        self.shared_files = 0
+        self.requests = 0
+        self.start_time = time.time()
+        self.http_server = _ThreadingHTTPServer((host, port), _AlignmentRequestHandler)
+        self.http_server.alignment_server = self
+
+    def _log(self, message, severity=Logger.DEBUG):
+        with self.lock:
+            self.logger.log(message, severity, self.TAG)
+
+    @property
+    def server_address(self):
+        """
+        The ``(host, port)`` pair the server is listening on.
+
+        :rtype: tuple
+        """
+        return self.http_server.server_address
+
+    def serve_forever(self):
+        """
+        Serve requests until ``shutdown`` is called.
+        """
+        self._log("Listening on %s:%d" % self.server_address, Logger.INFO)
+        try:
+            self.http_server.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self):
+        """
+        Stop serving requests.
+        It must be called from a thread other than
+        the one running ``serve_forever``.
+        """
+        self.http_server.shutdown()
+
+    def close(self):
+        """
+        Release the resources held by the server:
+        the socket, the worker processes, and the shared files.
+        """
+        self.http_server.server_close()
+        if self.pool != None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if (self.shared_directory != None) and (os.path.isdir(self.shared_directory)):
+            shutil.rmtree(self.shared_directory, ignore_errors=True)
+        self.shared_directory = None
+
+    def status(self):
+        """
+        Return the status of the server.
+
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "success": True,
+                "version": __version__,
+                "workers": self.workers,
+                "requests": self.requests,
+                "cached_features": len(self.features),
+                "cached_synthesis": len(self.synthesis),
+                "uptime": time.time() - self.start_time
+            }
+
+    def execute_task(self, request):
+        """
+        Execute the task described by the given request.
+
+        Raise ``ValueError`` if the request is not valid.
+
+        :param request: the request
+        :type  request: dict
+        :rtype: dict
+        """
+        for key in ["audio_file_path", "text_file_path", "config_string"]:
+            if not key in request:
+                raise ValueError("Missing '%s'" % key)
+        for key in ["audio_file_path", "text_file_path"]:
+            if not os.path.isfile(request[key]):
+                raise ValueError("File '%s' cannot be read" % request[key])
+        self._count_request()
+        start = time.time()
+        task = Task(request["config_string"])
+        task.audio_file_path_absolute = request["audio_file_path"]
+        task.text_file_path_absolute = request["text_file_path"]
+        if request.get("sync_map_file_path", None) != None:
+            task.sync_map_file_path_absolute = request["sync_map_file_path"]
+        tts_backend = self._tts_backend(Logger())
+        features = None
+        synthesis = None
+        shared = dict()
+        try:
+            if not self._cached(task):
+                features = self._shared_audio(task)
+                if features != None:
+                    shared["real_features"] = features.value.slice(
+                        gf.safe_float(task.configuration.is_audio_file_head_length, None),
+                        gf.safe_float(task.configuration.is_audio_file_process_length, None)
+                    )
+                synthesis = self._shared_synthesis(task, tts_backend)
+                if synthesis != None:
+                    shared["synt_features"], shared["synt_anchors"] = synthesis.value
+            arguments = (
+                task,
+                tts_backend,
+                self.cache_directory,
+                shared
+            )
+            with self.slots:
+                if self.pool != None:
+                    result = self.pool.apply(_execute_task, (arguments,))
+                else:
+                    result = _execute_task(arguments)
+        finally:
+            # the shared files of an evicted entry
+            # are removed only when no task uses them
+            self.features.release(features)
+            self.synthesis.release(synthesis)
+        success, sync_map, sync_map_file_path, entries = result
+        response = {
+            "success": success,
+            "sync_map": sync_map,
+            "sync_map_file_path": sync_map_file_path,
+            "elapsed": time.time() - start
+        }
+        if request.get("log", False):
+            logger = Logger()
+            logger.add_entries(entries)
+            response["log"] = logger.to_list_of_strings()
+        return response
+
+    def execute_job(self, request):
+        """
+        Execute the job contained in the container
+        described by the given request,
+        and write its output container.
+
+        The tasks of the job are executed by the pool
+        of worker processes of the server, if any,
+        each one holding one of its slots,
+        so that the tasks of concurrent jobs and requests
+        share the same workers.
+
+        If the request has the contents of the container,
+        instead of its path, the job is executed in memory,
+        and, if the request has no output directory,
+        the output container is returned in the response.
+
+        Raise ``ValueError`` if the request is not valid.
+
+        :param request: the request
+        :type  request: dict
+        :rtype: dict
+        """
+        container_path = request.get("container_path", None)
+        container_data = None
+        if "container_data" in request:
+            try:
+                container_data = base64.b64decode(request["container_data"])
+            except TypeError:
+                raise ValueError("Invalid 'container_data'")
+        elif container_path == None:
+            raise ValueError("Missing 'container_path'")
+        elif not os.path.exists(container_path):
+            raise ValueError("Container '%s' cannot be read" % container_path)
+        output_directory = request.get("output_directory", None)
+        if (output_directory == None) and (container_data == None):
+            raise ValueError("Missing 'output_directory'")
+        if (output_directory != None) and (not os.path.isdir(output_directory)):
+            raise ValueError("Directory '%s' does not exist" % output_directory)
+        self._count_request()
+        start = time.time()
+        logger = Logger()
+        executor = ExecuteJob(
+            logger=logger,
+            tts_backend=self._tts_backend(logger),
+            workers=self.workers,
+            cache_directory=self.cache_directory,
+            pool=self.pool,
+            slots=self.slots
+        )
+        output_path = None
+        success = False
+        try:
+            if executor.load_job_from_container(
+                    container_path,
+                    request.get("config_string", None),
+                    container_data
+                ):
+                if (executor.open_output_container(output_directory) and
+                        executor.execute()):
+                    success, output_path = executor.write_output_container(
+                        output_directory
+                    )
+        finally:
+            executor.clean(True)
+        response = {
+            "success": success,
+            "output_path": output_path,
+            "elapsed": time.time() - start
+        }
+        if success and (executor.output_container_data != None):
+            response["output_container_data"] = base64.b64encode(executor.output_container_data)
+        if request.get("log", False):
+            response["log"] = logger.to_list_of_strings()
+        return response
+
+    def _count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def _tts_backend(self, logger):
+        """
+        Return a copy of the TTS backend of the server,
+        logging to the given logger,
+        so that concurrent requests do not share a logger.
+
+        :param logger: the logger of the request
+        :type  logger: :class:`aeneas.logger.Logger`
+        :rtype: :class:`aeneas.ttsbackend.TTSBackend`
+        """
+        tts_backend = copy.copy(self.tts_backend)
+        tts_backend.logger = logger
+        return tts_backend
+
+    def _cached(self, task):
+        """
+        Return ``True`` if the sync map of the given task
+        is in the sync map cache, if it is used,
+        so that its features must not be computed.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: bool
+        """
+        if self.cache_directory == None:
+            return False
+        executor = ExecuteTask(
+            task,
+            logger=Logger(),
+            tts_backend=self.tts_backend,
+            cache_directory=self.cache_directory
+        )
+        return executor.execute_cached()
+
+    def _shared_audio(self, task):
+        """
+        Return the cache entry holding the features
+        of the whole audio file of the task,
+        reusing them or decoding (and caching) them,
+        or ``None`` if the audio file cannot be shared.
+
+        The audio file is identified by its path,
+        size and modification time, and it is decoded
+        by one of the worker processes, if any.
+
+        The entry is acquired on behalf of the task,
+        and it must be released with ``self.features.release``
+        when the task is over.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: :class:`aeneas.alignmentserver._SharedEntry`
+        """
+        if (self.features.size <= 0) or (task.audio_file_path_absolute == None):
+            return None
+        path = os.path.realpath(task.audio_file_path_absolute)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (path, stat.st_size, stat.st_mtime)
+        entry = self.features.acquire(key)
+        if entry != None:
+            self._log("Reusing the features of the audio file")
+            return entry
+        with self.slots:
+            if self.pool != None:
+                features = self.pool.apply(_precompute_audio, (path,))
+            else:
+                features = _precompute_audio(path)
+        if features == None:
+            return None
+        self._share(features)
+        return self.features.add(key, features)
+
+    def _shared_synthesis(self, task, tts_backend):
+        """
+        Return the cache entry holding the pair ``(features, anchors)``
+        of the synthesis of the text of the task,
+        reusing it or computing (and caching) it,
+        or ``None`` if the synthesis cannot be shared.
+
+        The text is synthesized (and its features computed)
+        by one of the worker processes, if any, holding a slot.
+
+        The entry is acquired on behalf of the task,
+        and it must be released with ``self.synthesis.release``
+        when the task is over.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :param tts_backend: the TTS backend of the request
+        :type  tts_backend: :class:`aeneas.ttsbackend.TTSBackend`
+        :rtype: :class:`aeneas.alignmentserver._SharedEntry`
+        """
+        if (
+                gc.SYNTHESIZER_MATCH_SPEECH_RATE or
+                (self.synthesis.size <= 0) or
+                (task.text_file == None) or
+                (len(task.text_file) == 0)
+            ):
+            return None
+        key = ExecuteTask.synthesis_key(task.text_file)
+        entry = self.synthesis.acquire(key)
+        if entry != None:
+            self._log("Reusing the synthesis of the text")
+            return entry
+        arguments = (task.text_file, tts_backend)
+        with self.slots:
+            if self.pool != None:
+                result = self.pool.apply(_precompute_synthesis, (arguments,))
+            else:
+                result = _precompute_synthesis(arguments)
+        if result == None:
+            return None
+        self._share(result[0])
+        return self.synthesis.add(key, result)
+
+    def _share(self, features):
+        """
+        If the tasks are executed by worker processes,
+        store the given features in the shared directory,
+        so that the workers memory-map them
+        instead of receiving a copy.
+
+        :param features: the features
+        :type  features: :class:`aeneas.dtw.WaveFeatures`
+        """
+        if self.shared_directory == None:
+            return
+        with self.lock:
+            path = os.path.join(self.shared_directory, "%06d" % self.shared_files)
+            self.shared_files += 1
+        features.share(path)
+
+    def _remove_shared(self, features):
+        if features.path != None:
+            for extension in [features.MFCC_EXTENSION, features.ENERGY_EXTENSION]:
+                try:
+                    os.remove(features.path + extension)
+                except OSError:
+                    pass
+
+
+
+class _SharedEntry(object):
+    """
+    An entry of :class:`aeneas.alignmentserver._SharedCache`.
+
+    :param value: the cached value
+    :type  value: object
+    """
+
+    def __init__(self, value):
+        self.value = value
+        self.references = 0
+        self.evicted = False
+
+
+
+class _SharedCache(object):
+    """
+    A thread-safe LRU cache of values shared by the tasks
+    executed at the same time, counting the tasks using each entry,
+    so that the resources of an evicted entry
+    (e.g., its shared files, which the worker processes might
+    not have memory-mapped yet) are removed
+    only when the last task using it is over.
+
+    :param size: the maximum number of entries
+    :type  size: int
+    :param remove: the function called with the value of an entry
+                   when it is evicted and no longer used
+    :type  remove: function
+    """
+
+    def __init__(self, size, remove):
+        self.size = size
+        self.remove = remove
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def acquire(self, key):
+        """
+        Return the entry with the given key,
+        acquired on behalf of a task,
+        or ``None`` if it is not cached.
+
+        :param key: the key
+        :type  key: object
+        :rtype: :class:`aeneas.alignmentserver._SharedEntry`
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry == None:
+                return None
+            # move it to the end (most recently used)
+            self.entries[key] = entry
+            entry.references += 1
+            return entry
+
+    def add(self, key, value):
+        """
+        Cache the given value, evicting the least recently used entries,
+        and return its entry, acquired on behalf of a task.
+
+        :param key: the key
+        :type  key: object
+        :param value: the value
+        :type  value: object
+        :rtype: :class:`aeneas.alignmentserver._SharedEntry`
+        """
+        entry = _SharedEntry(value)
+        entry.references = 1
+        removed = []
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous != None:
+                removed.append(previous)
+            self.entries[key] = entry
+            while len(self.entries) > self.size:
+                removed.append(self.entries.popitem(last=False)[1])
+            removed = [item for item in removed if self._evict(item)]
+        for item in removed:
+            self.remove(item.value)
+        return entry
+
+    def release(self, entry):
+        """
+        Release the given entry on behalf of a task,
+        removing its resources if it has been evicted
+        and no other task uses it.
+
+        :param entry: the entry (if ``None``, do nothing)
+        :type  entry: :class:`aeneas.alignmentserver._SharedEntry`
+        """
+        if entry == None:
+            return
+        with self.lock:
+            entry.references -= 1
+            removable = entry.evicted and (entry.references == 0)
+        if removable:
+            self.remove(entry.value)
+
+    def _evict(self, entry):
+        entry.evicted = True
+        return entry.references == 0
+
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    An HTTP server handling each request in its own thread.
+    """
+
+    daemon_threads = True
+
+    allow_reuse_address = True
+
+
+
+class _AlignmentRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    The handler of the requests to :class:`aeneas.alignmentserver.AlignmentServer`.
+    """
+
+    server_version = "aeneas/%s" % __version__
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._send(200, self.server.alignment_server.status())
+        else:
+            self._send(404, {"success": False, "error": "Unknown path '%s'" % self.path})
+
+    def do_POST(self):
+        server = self.server.alignment_server
+        functions = {
+            "/task": server.execute_task,
+            "/job": server.execute_job
+        }
+        if not self.path in functions:
+            self._send(404, {"success": False, "error": "Unknown path '%s'" % self.path})
+            return
+        try:
+            length = int(self.headers.getheader("content-length", 0))
+            request = json.loads(self.rfile.read(length))
+            if not isinstance(request, dict):
+                raise ValueError("The request must be a JSON object")
+            response = functions[self.path](request)
+        except ValueError as exc:
+            self._send(400, {"success": False, "error": str(exc)})
+            return
+        except Exception as exc:
+            server._log("Unexpected error: %s" % exc, Logger.WARNING)
+            self._send(500, {"success": False, "error": "Unexpected error"})
+            return
+        self._send(200 if response["success"] else 500, response)
+
+    def _send(self, code, response):
+        body = json.dumps(response)
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        self.server.alignment_server._log(format % args)
+
+
+
+def _precompute_audio(path):
+    """
+    Decode the given audio file, and return its features.
+
+    It is a module-level function, as it must be pickled
+    to be sent to the worker processes.
+
+    :param path: the path of the audio file
+    :type  path: string (path)
+    :rtype: :class:`aeneas.dtw.WaveFeatures`
+    """
+    return ExecuteTask.precompute_audio(path)
+
+
+
+def _precompute_synthesis(arguments):
+    """
+    Synthesize the given text file,
+    and return its features and anchors.
+
+    It is a module-level function, as it must be pickled
+    to be sent to the worker processes.
+
+    :param arguments: a tuple ``(text_file, tts_backend)``
+    :type  arguments: tuple
+    :rtype: tuple ``(features, anchors)``
+    """
+    text_file, tts_backend = arguments
+    return ExecuteTask.precompute_synthesis(
+        text_file,
+        tts_backend=tts_backend,
+        logger=tts_backend.logger
+    )
+
+
+
+def _execute_task(arguments):
+    """
+    Execute a task, and write its sync map file, if requested.
+
+    It is a module-level function, as it must be pickled
+    to be sent to the worker processes.
+
+    :param arguments: a tuple ``(task, tts_backend, cache_directory, shared)``
+    :type  arguments: tuple
+    :rtype: tuple ``(success, sync_map, sync_map_file_path, log_entries)``
+    """
+    task, tts_backend, cache_directory, shared = arguments
+    logger = Logger()
+    sync_map = None
+    sync_map_file_path = None
+    success = False
+    try:
+        executor = ExecuteTask(
+            task,
+            logger=logger,
+            tts_backend=tts_backend,
+            cache_directory=cache_directory,
+            **shared
+        )
+        success = executor.execute()
+        if success:
+            sync_map = [
+                [fragment.text_fragment.identifier, fragment.begin, fragment.end]
+                for fragment in task.sync_map.fragments
+            ]
+            if task.sync_map_file_path_absolute != None:
+                sync_map_file_path = task.output_sync_map_file()
+                success = (sync_map_file_path != None)
+    except:
+        logger.log("Unexpected error while executing the task", Logger.WARNING, AlignmentServer.TAG)
+        success = False
+    return (success, sync_map, sync_map_file_path, logger.entries)
+
+
+
@@ -33,6 +33,14 @@ class AnalyzeContainer(object):
     """
     Analyze a given container and build the corresponding job.
 
+    The entries of the container are arranged in a tree
+    of directories once per analysis
+    (see :class:`aeneas.analyzecontainer._EntryTree`),
+    so that looking for the files of each task
+    visits only the entries inside its directory,
+    and the regular expressions of the configuration
+    are compiled once.
+
     :param container: the container to be analyzed
     :type  container: :class:`aeneas.container.Container`
     :param logger: the logger object
@@ -46,6 +54,7 @@ class AnalyzeContainer(object):
         if self.logger == None:
             self.logger = Logger()
         self.container = container
+        self.regexes = dict()
 
     def analyze(self):
         """
@@ -84,6 +93,19 @@ class AnalyzeContainer(object):
         """ Log """
         self.logger.log(message, severity, self.TAG)
 
+    def _compile(self, regex_string):
+        """
+        Return the compiled regex for the given string,
+        compiling it only the first time.
+
+        :param regex_string: the regex string
+        :type  regex_string: string
+        :rtype: regex
+        """
+        if not regex_string in self.regexes:
+            self.regexes[regex_string] = re.compile(r"" + regex_string)
+        return self.regexes[regex_string]
+
     def _analyze_txt_config(self, config_string=None):
         """
         Analyze the given container and return the corresponding job.
@@ -120,9 +142,9 @@ class AnalyzeContainer(object):
         self._log("Creating the Job object")
         job = Job(config_string)
 
-        # get the entries in this container
+        # get the entries in this container, arranged in a tree
         self._log("Getting entries")
-        entries = self.container.entries()
+        entries = _EntryTree(self.container.entries())
 
         # convert the config string to dict
         self._log("Converting config string into config dict")
@@ -148,11 +170,11 @@ class AnalyzeContainer(object):
         # prepare relative path and file name regex for text and audio files
         text_file_relative_path = parameters[gc.PPN_JOB_IS_TEXT_FILE_RELATIVE_PATH]
         self._log("Relative path for text file: '%s'" % text_file_relative_path)
-        text_file_name_regex = re.compile(r"" + parameters[gc.PPN_JOB_IS_TEXT_FILE_NAME_REGEX])
+        text_file_name_regex = self._compile(parameters[gc.PPN_JOB_IS_TEXT_FILE_NAME_REGEX])
         self._log("Regex for text file: '%s'" % parameters[gc.PPN_JOB_IS_TEXT_FILE_NAME_REGEX])
         audio_file_relative_path = parameters[gc.PPN_JOB_IS_AUDIO_FILE_RELATIVE_PATH]
         self._log("Relative path for audio file: '%s'" % audio_file_relative_path)
-        audio_file_name_regex = re.compile(r"" + parameters[gc.PPN_JOB_IS_AUDIO_FILE_NAME_REGEX])
+        audio_file_name_regex = self._compile(parameters[gc.PPN_JOB_IS_AUDIO_FILE_NAME_REGEX])
         self._log("Regex for audio file: '%s'" % parameters[gc.PPN_JOB_IS_AUDIO_FILE_NAME_REGEX])
 
         # flat hierarchy
@@ -451,8 +473,8 @@ class AnalyzeContainer(object):
         1. are in ``root/relative_path``, and
         2. match ``file_name_regex``.
 
-        :param entries: the list of entries (file paths) in the container
-        :type  entries: list of strings (path)
+        :param entries: the tree of the entries (file paths) in the container
+        :type  entries: :class:`aeneas.analyzecontainer._EntryTree`
         :param root: the root directory of the container
         :type  root: string (path)
         :param relative_path: the relative path in which we must search
@@ -468,17 +490,11 @@ class AnalyzeContainer(object):
             target = gf.norm_join(root, relative_path)
         self._log("Finding files within target: '%s'" % target)
         files = []
-        target_len = len(target)
-        for entry in entries:
-            if entry.startswith(target):
-                self._log("Examining entry: '%s'" % entry)
-                entry_suffix = entry[target_len + 1:]
-                self._log("Examining entry suffix: '%s'" % entry_suffix)
-                if re.search(file_name_regex, entry_suffix) != None:
-                    self._log("Match: '%s'" % entry)
-                    files.append(entry)
-                else:
-                    self._log("No match: '%s'" % entry)
+        candidates = entries.entries(target)
+        for entry, entry_suffix in candidates:
+            if file_name_regex.search(entry_suffix) != None:
+                files.append(entry)
+        self._log("Matched %d entries out of %d" % (len(files), len(candidates)))
         return sorted(files)
 
     def _match_files_flat_hierarchy(self, text_files, audio_files):
@@ -544,8 +560,8 @@ class AnalyzeContainer(object):
 
             => ["/foo/bar/1", "/foo/bar/2", "/foo/bar/3"]
 
-        :param entries: the list of entries (paths) of a container
-        :type  entries: list of strings (paths)
+        :param entries: the tree of the entries (paths) of a container
+        :type  entries: :class:`aeneas.analyzecontainer._EntryTree`
         :param root: the root directory to search within
         :type  root: string (path)
         :param regex_string: regex string to match directory names
@@ -555,25 +571,86 @@ class AnalyzeContainer(object):
         self._log("Matching directory names in paged hierarchy")
         self._log("Matching within '%s'" % root)
         self._log("Matching regex '%s'" % regex_string)
-        regex = re.compile(r"" + regex_string)
-        directories = set()
-        root_len = len(root)
+        regex = self._compile(regex_string)
+        directories = [
+            directory for directory in entries.directories(root)
+            if regex.match(directory) != None
+        ]
+        self._log("Matched %d directories" % len(directories))
+        return directories
+
+
+
+class _EntryTree(object):
+    """
+    A tree of the directories containing the entries of a container.
+
+    Each node maps the names of its subdirectories to their nodes,
+    and lists the entries directly inside its directory.
+
+    :param entries: the list of entries (paths) of a container
+    :type  entries: list of strings (paths)
+    """
+
+    def __init__(self, entries):
+        self.root = (dict(), [])
         for entry in entries:
-            # look only inside root dir
-            if entry.startswith(root):
-                self._log("Examining '%s'" % entry)
-                # remove common prefix root/
-                entry = entry[root_len + 1:]
-                # split path
-                entry_splitted = entry.split(os.sep)
-                # match regex
-                if ((len(entry_splitted) >= 2) and
-                        (re.match(regex, entry_splitted[0]) != None)):
-                    directories.add(entry_splitted[0])
-                    self._log("Match: '%s'" % entry_splitted[0])
-                else:
-                    self._log("No match: '%s'" % entry)
-        return sorted(directories)
+            node = self.root
+            for name in entry.split(os.sep)[:-1]:
+                if name in ["", "."]:
+                    continue
+                if not name in node[0]:
+                    node[0][name] = (dict(), [])
+                node = node[0][name]
+            node[1].append(entry)
+
+    def _node(self, directory):
+        """
+        Return the node of the given directory,
+        or ``None`` if no entry is inside it.
+        """
+        node = self.root
+        for name in os.path.normpath(directory).split(os.sep):
+            if name in ["", "."]:
+                continue
+            if not name in node[0]:
+                return None
+            node = node[0][name]
+        return node
+
+    def directories(self, directory):
+        """
+        Return the sorted names of the subdirectories
+        of the given directory.
 
+        :param directory: the directory
+        :type  directory: string (path)
+        :rtype: list of strings
+        """
+        node = self._node(directory)
+        if node == None:
+            return []
+        return sorted(node[0].keys())
 
+    def entries(self, directory):
+        """
+        Return the entries inside the given directory,
+        or inside its subdirectories, as a list of pairs
+        ``(entry, path of the entry relative to directory)``.
 
+        :param directory: the directory
+        :type  directory: string (path)
+        :rtype: list of pairs of strings
+        """
+        result = []
+        node = self._node(directory)
+        if node == None:
+            return result
+        stack = [(node, "")]
+        while len(stack) > 0:
+            (children, entries), prefix = stack.pop()
+            for entry in entries:
+                result.append((entry, prefix + os.path.basename(entry)))
+            for name in children:
+                stack.append((children[name], prefix + name + os.sep))
+        return result
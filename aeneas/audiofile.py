@@ -33,19 +33,26 @@ class AudioFile(object):
     :class:`aeneas.ffprobewrapper.FFPROBEWrapper`
     )
 
+    The audio file can be held in memory,
+    by passing its contents as ``data``:
+    in this case, ``file_path`` is used only in log messages.
+
     :param file_path: the path to the audio file
     :type  file_path: string (path)
     :param logger: the logger object
     :type  logger: :class:`aeneas.logger.Logger`
+    :param data: the contents of the audio file
+    :type  data: string
     """
 
     TAG = "AudioFile"
 
-    def __init__(self, file_path, logger=None):
+    def __init__(self, file_path=None, logger=None, data=None):
         self.logger = logger
         if self.logger == None:
             self.logger = Logger()
         self.file_path = file_path
+        self.data = data
         self.file_size = None
         self.audio_length = None
         self.audio_format = None
@@ -151,20 +158,23 @@ class AudioFile(object):
         self._log("Reading properties")
 
         # check the file can be read
-        if not os.path.isfile(self.file_path):
+        if (self.data == None) and (not os.path.isfile(self.file_path)):
             msg = "File '%s' cannot be read" % self.file_path
             self._log(msg, Logger.CRITICAL)
             raise OSError(msg)
 
         # get the file size
         self._log("Getting file size for '%s'" % self.file_path)
-        self.file_size = os.path.getsize(self.file_path)
+        if self.data == None:
+            self.file_size = os.path.getsize(self.file_path)
+        else:
+            self.file_size = len(self.data)
         self._log("File size for '%s' is '%d'" % (self.file_path, self.file_size))
 
         # get the audio properties
         self._log("Reading properties with FFPROBEWrapper...")
         prober = FFPROBEWrapper(logger=self.logger)
-        properties = prober.read_properties(self.file_path)
+        properties = prober.read_properties(self.file_path, audio_data=self.data)
         self._log("Reading properties with FFPROBEWrapper... done")
 
         # save relevant properties in results inside the audiofile object
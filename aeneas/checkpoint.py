@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+A store of per-task checkpoints, that is,
+of the sync maps computed for the tasks of a job,
+so that an interrupted job can be resumed
+without executing again its completed tasks.
+
+Each checkpoint is a JSON file, named after a key
+which is the hash of the task configuration
+and of the contents of its audio and text files:
+if any of them changes, the checkpoint is no longer valid.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import aeneas.globalfunctions as gf
+from aeneas.logger import Logger
+from aeneas.syncmap import SyncMap, SyncMapFragment
+
+__author__ = "Alberto Pettarin"
+__copyright__ = """
+    Copyright 2012-2013, Alberto Pettarin (www.albertopettarin.it)
+    Copyright 2013-2015, ReadBeyond Srl (www.readbeyond.it)
+    """
+__license__ = "GNU AGPL v3"
+__version__ = "1.0.0"
+__email__ = "aeneas@readbeyond.it"
+__status__ = "Production"
+
+class CheckpointStore(object):
+    """
+    A directory holding the checkpoints of the tasks of a job.
+
+    The directory is created, if it does not exist.
+    It should be used by a single job,
+    since ``clean`` removes the checkpoints
+    of the tasks not belonging to the job.
+
+    :param directory: the path of the checkpoint directory
+    :type  directory: string (path)
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    """
+
+    TAG = "CheckpointStore"
+
+    EXTENSION = ".json"
+    """ Extension of the checkpoint files """
+
+    def __init__(self, directory, logger=None):
+        self.directory = directory
+        self.logger = logger
+        if self.logger == None:
+            self.logger = Logger()
+        self.keys = dict()
+        if not os.path.isdir(self.directory):
+            self._log("Creating directory '%s'" % self.directory)
+            os.makedirs(self.directory)
+
+    def _log(self, message, severity=Logger.DEBUG):
+        self.logger.log(message, severity, self.TAG)
+
+    def _key_components(self, task):
+        """
+        Return the list of strings identifying the given task.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: list of strings
+        """
+        config_string = ""
+        if task.configuration != None:
+            config_string = task.configuration.config_string()
+        return [
+            config_string,
+            self._hash(task.audio_file_path_absolute, task.audio_file_data),
+            self._hash(task.text_file_path_absolute, task.text_file_data)
+        ]
+
+    def _hash(self, path, data):
+        """
+        Return the SHA-1 hex digest of the given contents,
+        if not ``None`` (i.e., the file is held in memory),
+        or of the contents of the file at ``path``.
+
+        :param path: the path of the file
+        :type  path: string (path)
+        :param data: the contents of the file
+        :type  data: string
+        :rtype: string
+        """
+        if data != None:
+            return hashlib.sha1(data).hexdigest()
+        return str(gf.hash_file(path))
+
+    def task_key(self, task):
+        """
+        Return the key of the given task,
+        that is, the SHA-1 hex digest of its configuration
+        and of the contents of its audio and text files.
+
+        The key is computed once per task,
+        and then cached in this object.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: string
+        """
+        if not task.identifier in self.keys:
+            hasher = hashlib.sha1()
+            for component in self._key_components(task):
+                if isinstance(component, unicode):
+                    component = component.encode("utf-8")
+                hasher.update(component)
+                hasher.update("\n")
+            self.keys[task.identifier] = hasher.hexdigest()
+        return self.keys[task.identifier]
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.EXTENSION)
+
+    def load(self, task):
+        """
+        Load the checkpoint of the given task.
+
+        Return the checkpointed sync map,
+        or ``None`` if there is no valid checkpoint.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: :class:`aeneas.syncmap.SyncMap`
+        """
+        if task.text_file == None:
+            return None
+        path = self._path(self.task_key(task))
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "rb") as checkpoint_file:
+                contents = json.load(checkpoint_file)
+            fragments = task.text_file.fragments
+            if len(contents["fragments"]) != len(fragments):
+                self._log("Checkpoint '%s' has a wrong number of fragments" % path, Logger.WARNING)
+                return None
+            sync_map = SyncMap()
+            for fragment, (identifier, begin, end) in zip(fragments, contents["fragments"]):
+                if identifier != fragment.identifier:
+                    self._log("Checkpoint '%s' does not match the text" % path, Logger.WARNING)
+                    return None
+                sync_map.append(SyncMapFragment(fragment, begin, end))
+            self._log("Loaded checkpoint '%s'" % path)
+            return sync_map
+        except:
+            self._log("Checkpoint '%s' cannot be read" % path, Logger.WARNING)
+            return None
+
+    def save(self, task):
+        """
+        Save the sync map of the given task as its checkpoint.
+
+        The checkpoint is written to a temporary file first,
+        and then renamed, so that an interrupted write
+        does not leave a corrupted checkpoint.
+
+        Return ``True`` if the checkpoint has been saved.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: bool
+        """
+        if task.sync_map == None:
+            return False
+        key = self.task_key(task)
+        contents = {
+            "key": key,
+            "fragments": [
+                [fragment.text_fragment.identifier, fragment.begin, fragment.end]
+                for fragment in task.sync_map.fragments
+            ]
+        }
+        handler, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(handler, "wb") as checkpoint_file:
+                json.dump(contents, checkpoint_file)
+            os.rename(tmp_path, self._path(key))
+            self._log("Saved checkpoint '%s'" % self._path(key))
+            return True
+        except:
+            self._log("Checkpoint for task '%s' cannot be saved" % task.identifier, Logger.WARNING)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def clean(self, tasks):
+        """
+        Remove the stale checkpoints, that is,
+        those not belonging to any of the given tasks,
+        and any leftover temporary file.
+
+        Return the number of removed files.
+
+        :param tasks: the tasks whose checkpoints must be kept
+        :type  tasks: list of :class:`aeneas.task.Task`
+        :rtype: int
+        """
+        valid = set([self.task_key(task) + self.EXTENSION for task in tasks])
+        removed = 0
+        for file_name in os.listdir(self.directory):
+            if file_name in valid:
+                continue
+            if not (file_name.endswith(self.EXTENSION) or file_name.endswith(".tmp")):
+                continue
+            path = os.path.join(self.directory, file_name)
+            try:
+                os.remove(path)
+                self._log("Removed stale checkpoint '%s'" % path)
+                removed += 1
+            except OSError:
+                self._log("Cannot remove stale checkpoint '%s'" % path, Logger.WARNING)
+        return removed
+
+
+
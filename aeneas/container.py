@@ -6,7 +6,7 @@ A container is an abstraction for a group of files (entries)
 compressed into an archive file (e.g., ZIP or TAR)
 or uncompressed inside a directory.
 
-This module contains two main classes.
+This module contains three main classes.
 
 1. :class:`aeneas.container.Container`
    is the main class, exposing functions
@@ -14,11 +14,22 @@ This module contains two main classes.
    listing the entries in the container, etc.
 2. :class:`aeneas.container.ContainerFormat`
    is an enumeration of the supported container formats.
+3. :class:`aeneas.container.ContainerWriter`
+   writes a new container, one entry at a time.
 """
 
+from multiprocessing.pool import ThreadPool
 import os
+import shutil
+import StringIO
+import struct
+import sys
 import tarfile
+import tempfile
+import threading
+import time
 import zipfile
+import zlib
 
 import aeneas.globalconstants as gc
 import aeneas.globalfunctions as gf
@@ -60,6 +71,32 @@ class ContainerFormat(object):
     ALLOWED_VALUES = [EPUB, TAR, TAR_GZ, TAR_BZ2, UNPACKED, ZIP]
     """ List of all the allowed values """
 
+def compression_level(container_format, level=None):
+    """
+    Return the compression level to be used
+    for the given container format.
+
+    If ``level`` is not ``None``, it is returned unchanged,
+    otherwise the default level of the format is returned,
+    read from :mod:`aeneas.globalconstants`.
+    Formats without compression (TAR and UNPACKED) have level ``None``.
+
+    :param container_format: the format of the container
+    :type  container_format: :class:`aeneas.container.ContainerFormat`
+    :param level: the requested compression level
+    :type  level: int
+    :rtype: int
+    """
+    if level != None:
+        return level
+    if container_format in [ContainerFormat.ZIP, ContainerFormat.EPUB]:
+        return gc.CONTAINER_ZIP_COMPRESSION_LEVEL
+    if container_format == ContainerFormat.TAR_GZ:
+        return gc.CONTAINER_TAR_GZ_COMPRESSION_LEVEL
+    if container_format == ContainerFormat.TAR_BZ2:
+        return gc.CONTAINER_TAR_BZ2_COMPRESSION_LEVEL
+    return None
+
 class Container(object):
     """
     An abstraction for different archive formats like ZIP or TAR,
@@ -67,21 +104,71 @@ class Container(object):
     a single file, listing the files, etc.
 
     An (uncompressed) directory can be used in lieu of a compressed file.
+    A compressed container can also be held in memory,
+    passing its contents as ``data``: ::
+
+        with Container(None, data=uploaded_bytes) as container:
+            contents = container.read_entry("config.txt")
+
+    In this case ``file_path`` is ignored,
+    the format is inferred from the contents, if not specified,
+    and the container cannot be modified by ``compress``.
+
+    The list of entries is read once, and indexed,
+    so that looking for an entry does not rescan the container;
+    the archive file is opened once as well,
+    and kept open until ``close`` is called.
+    A container can be used as a context manager: ::
+
+        with Container("/path/to/container.zip") as container:
+            contents = container.read_entry("config.txt")
 
     :param file_path: the path to the container file (or directory)
     :type  file_path: string (path)
     :param container_format: the format of the container
     :type  container_format: :class:`aeneas.container.ContainerFormat`
+    :param compression_level: the compression level used by ``compress``;
+                              if ``None``, use the default level
+                              of the container format
+                              (see :func:`aeneas.container.compression_level`)
+    :type  compression_level: int
+    :param compression_workers: the number of threads used by ``compress``
+    :type  compression_workers: int
+    :param decompression_workers: the number of threads used by ``decompress``
+                                  (ZIP and EPUB containers only)
+    :type  decompression_workers: int
+    :param data: the contents of the container, if held in memory
+    :type  data: string
     :param logger: the logger object
     :type  logger: :class:`aeneas.logger.Logger`
+    :raise ValueError: if ``data`` is given for an unpacked container
     """
 
     TAG = "Container"
 
-    def __init__(self, file_path, container_format=None, logger=None):
+    def __init__(
+            self,
+            file_path,
+            container_format=None,
+            compression_level=None,
+            compression_workers=gc.CONTAINER_COMPRESSION_WORKERS,
+            decompression_workers=gc.CONTAINER_DECOMPRESSION_WORKERS,
+            data=None,
+            logger=None
+        ):
         self.file_path = file_path
         self.container_format = container_format
+        self.compression_level = compression_level
+        self.compression_workers = compression_workers
+        self.decompression_workers = decompression_workers
+        self.data = data
         self.actual_container = None
+        self.indexed = False
+        self.entry_list = None
+        self.entry_set = None
+        self.entry_basenames = None
+        self.entry_normalized = None
+        self.safe = None
         self.logger = logger
         if self.logger == None:
             self.logger = Logger()
@@ -91,6 +178,22 @@ class Container(object):
     def _log(self, message, severity=Logger.DEBUG):
         self.logger.log(message, severity, self.TAG)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close the archive file of this container, if open.
+
+        The container can still be used afterwards:
+        the archive file will be opened again, if needed.
+        """
+        if self.actual_container != None:
+            self.actual_container.close()
+
     @property
     def file_path(self):
         """
@@ -166,13 +269,17 @@ class Container(object):
         :rtype: bool
         """
         self._log("Checking if this container is safe")
-        entries = self.entries()
-        for entry in entries:
-            if not self.is_entry_safe(entry):
-                self._log("This container is not safe: found unsafe entry '%s'" % entry)
-                return False
-        self._log("This container is safe")
-        return True
+        self._build_index()
+        if (self.safe == None) or (not self.indexed):
+            self.safe = True
+            for entry in self.entry_list:
+                if not self.is_entry_safe(entry):
+                    self._log("This container is not safe: found unsafe entry '%s'" % entry)
+                    self.safe = False
+                    break
+        if self.safe:
+            self._log("This container is safe")
+        return self.safe
 
     def is_entry_safe(self, entry):
         """
@@ -197,12 +304,46 @@ class Container(object):
         :rtype: list of strings (path)
         """
         self._log("Getting entries")
+        self._build_index()
+        return list(self.entry_list)
+
+    def _build_index(self):
+        """
+        Read the entries of this container, if not read yet,
+        and index them by full path and by file name.
+
+        If the entries cannot be read, the index is empty,
+        and it will be built again at the next call.
+        """
+        if self.indexed:
+            return
+        entries = []
         if (self.actual_container != None) and (self.exists()):
             try:
-                return self.actual_container.entries()
+                entries = self.actual_container.entries()
+                self.indexed = True
             except:
                 self._log("An error occurred while getting entries")
-        return []
+        self.entry_list = entries
+        self.entry_set = set(entries)
+        self.entry_basenames = dict()
+        self.entry_normalized = dict()
+        for entry in entries:
+            # entries are sorted: keep the first one with each file name
+            self.entry_basenames.setdefault(os.path.basename(entry), entry)
+            self.entry_normalized.setdefault(os.path.normpath(entry), entry)
+        self._log("Indexed %d entries" % len(entries))
+
+    def _reset_index(self):
+        """
+        Discard the index of the entries of this container.
+        """
+        self.indexed = False
+        self.entry_list = None
+        self.entry_set = None
+        self.entry_basenames = None
+        self.entry_normalized = None
+        self.safe = None
 
     def find_entry(self, entry, exact=True):
         """
@@ -230,17 +371,17 @@ class Container(object):
         :type  exact: bool
         :rtype: string (path)
         """
+        self._build_index()
         if exact:
             self._log("Finding entry '%s' with exact=True" % entry)
-            if entry in self.entries():
+            if entry in self.entry_set:
                 self._log("Found entry '%s'" % entry)
                 return entry
         else:
             self._log("Finding entry '%s' with exact=False" % entry)
-            for ent in self.entries():
-                if os.path.basename(ent) == entry:
-                    self._log("Found entry '%s'" % ent)
-                    return ent
+            if entry in self.entry_basenames:
+                self._log("Found entry '%s'" % self.entry_basenames[entry])
+                return self.entry_basenames[entry]
         self._log("Entry '%s' not found" % entry)
         return None
 
@@ -258,7 +399,8 @@ class Container(object):
             self._log("Accessing entry '%s' is not safe" % entry)
             return None
 
-        if not entry in self.entries():
+        self._build_index()
+        if not entry in self.entry_set:
             self._log("Entry '%s' not found in this container" % entry)
             return None
 
@@ -269,12 +411,20 @@ class Container(object):
             self._log("An error occurred while reading the contents of '%s'" % entry)
             return None
 
-    def decompress(self, output_path):
+    def decompress(self, output_path, entries=None):
         """
         Decompress the entire container into the given directory.
 
+        If ``entries`` is not ``None``, decompress only
+        the given entries, ignoring the ones not in this container.
+        Entries are compared after path normalization,
+        so that, for example, ``./foo/bar.txt``
+        matches the entry ``foo/bar.txt``.
+
         :param output_path: path of the destination directory
         :type  output_path: string (path)
+        :param entries: the entries to be decompressed
+        :type  entries: list of strings (path)
         """
         self._log("Decompressing the container into '%s'" % output_path)
 
@@ -291,7 +441,18 @@ class Container(object):
             return
 
         try:
-            self.actual_container.decompress(output_path)
+            if entries == None:
+                self.actual_container.decompress(output_path)
+            else:
+                selected = set()
+                for entry in entries:
+                    normalized = os.path.normpath(entry)
+                    if normalized in self.entry_normalized:
+                        selected.add(self.entry_normalized[normalized])
+                    else:
+                        self._log("Entry '%s' not found in this container" % entry)
+                self._log("Decompressing %d entries" % len(selected))
+                self.actual_container.decompress_entries(output_path, sorted(selected))
             self._log("Decompressing the container into '%s': succeeded" % output_path)
         except:
             self._log("Decompressing the container into '%s': failed" % output_path)
@@ -309,6 +470,10 @@ class Container(object):
             self._log("Actual container not set, aborting")
             return
 
+        if self.data != None:
+            self._log("The container is held in memory, aborting")
+            return
+
         if self.file_path == None:
             self._log("The container path is not set, aborting")
             return
@@ -317,6 +482,7 @@ class Container(object):
             self._log("The input path '%s' is not a directory, aborting")
             return
 
+        self._reset_index()
         try:
             self.actual_container.compress(input_path)
             self._log("Compressing '%s' into this container: succeeded" % input_path)
@@ -325,19 +491,70 @@ class Container(object):
 
     def exists(self):
         """
-        Return ``True`` if the container has its path set and it exists,
+        Return ``True`` if the container is held in memory,
+        or if it has its path set and it exists,
         ``False`` otherwise.
 
         :rtype: boolean
         """
+        if self.data != None:
+            return True
         return (self.file_path != None) and os.path.exists(self.file_path)
 
+    @classmethod
+    def infer_format(cls, file_path):
+        """
+        Infer the format of a container
+        from the (lowercased) extension of its file path.
+        If the format cannot be inferred, it is assumed to be
+        of type :class:`aeneas.container.ContainerFormat.UNPACKED`
+        (unpacked directory).
+
+        :param file_path: the path to the container file (or directory)
+        :type  file_path: string (path)
+        :rtype: :class:`aeneas.container.ContainerFormat`
+        """
+        path_lowercased = file_path.lower()
+        if path_lowercased.endswith(ContainerFormat.ZIP):
+            return ContainerFormat.ZIP
+        elif path_lowercased.endswith(ContainerFormat.EPUB):
+            return ContainerFormat.EPUB
+        elif path_lowercased.endswith(ContainerFormat.TAR):
+            return ContainerFormat.TAR
+        elif path_lowercased.endswith(ContainerFormat.TAR_GZ):
+            return ContainerFormat.TAR_GZ
+        elif path_lowercased.endswith(ContainerFormat.TAR_BZ2):
+            return ContainerFormat.TAR_BZ2
+        return ContainerFormat.UNPACKED
+
+    @classmethod
+    def infer_format_from_data(cls, data):
+        """
+        Infer the format of a container
+        from the signature at the beginning of its contents.
+        If the format cannot be inferred, it is assumed to be
+        of type :class:`aeneas.container.ContainerFormat.TAR`
+        (uncompressed TAR file).
+
+        :param data: the contents of the container
+        :type  data: string
+        :rtype: :class:`aeneas.container.ContainerFormat`
+        """
+        if data.startswith("PK\x03\x04") or data.startswith("PK\x05\x06"):
+            return ContainerFormat.ZIP
+        elif data.startswith("\x1f\x8b"):
+            return ContainerFormat.TAR_GZ
+        elif data.startswith("BZh"):
+            return ContainerFormat.TAR_BZ2
+        return ContainerFormat.TAR
+
     def _set_actual_container(self):
         """
         Set the actual container, based on the specified container format.
 
         If the container format is not specified,
-        infer it from the (lowercased) extension of the file path.
+        infer it from the (lowercased) extension of the file path,
+        or from the contents of the container, if held in memory.
         If the format cannot be inferred, it is assumed to be
         of type :class:`aeneas.container.ContainerFormat.UNPACKED`
         (unpacked directory).
@@ -347,34 +564,36 @@ class Container(object):
         # infer container format
         if self.container_format == None:
             self._log("Inferring actual container format")
-            path_lowercased = self.file_path.lower()
-            self._log("Lowercased file path: '%s'" % path_lowercased)
-            if path_lowercased.endswith(ContainerFormat.ZIP):
-                self.container_format = ContainerFormat.ZIP
-            elif path_lowercased.endswith(ContainerFormat.EPUB):
-                self.container_format = ContainerFormat.EPUB
-            elif path_lowercased.endswith(ContainerFormat.TAR):
-                self.container_format = ContainerFormat.TAR
-            elif path_lowercased.endswith(ContainerFormat.TAR_GZ):
-                self.container_format = ContainerFormat.TAR_GZ
-            elif path_lowercased.endswith(ContainerFormat.TAR_BZ2):
-                self.container_format = ContainerFormat.TAR_BZ2
+            if self.data != None:
+                self.container_format = self.infer_format_from_data(self.data)
             else:
-                self.container_format = ContainerFormat.UNPACKED
+                self.container_format = self.infer_format(self.file_path)
             self._log("Inferred format: '%s'" % self.container_format)
+        if (self.data != None) and (self.container_format == ContainerFormat.UNPACKED):
+            msg = "An unpacked container cannot be held in memory"
+            self._log(msg, Logger.CRITICAL)
+            raise ValueError(msg)
 
         # set the actual container
         self._log("Setting actual container")
-        if self.container_format == ContainerFormat.ZIP:
-            self.actual_container = _ContainerZIP(self.file_path)
-        elif self.container_format == ContainerFormat.EPUB:
-            self.actual_container = _ContainerZIP(self.file_path)
-        elif self.container_format == ContainerFormat.TAR:
-            self.actual_container = _ContainerTAR(self.file_path, "")
-        elif self.container_format == ContainerFormat.TAR_GZ:
-            self.actual_container = _ContainerTAR(self.file_path, ":gz")
-        elif self.container_format == ContainerFormat.TAR_BZ2:
-            self.actual_container = _ContainerTAR(self.file_path, ":bz2")
+        level = compression_level(self.container_format, self.compression_level)
+        workers = self.compression_workers
+        if self.container_format in [ContainerFormat.ZIP, ContainerFormat.EPUB]:
+            self.actual_container = _ContainerZIP(
+                self.file_path,
+                level,
+                workers,
+                self.decompression_workers,
+                data=self.data
+            )
+        elif self.container_format in ContainerWriter.TAR_VARIANTS:
+            self.actual_container = _ContainerTAR(
+                self.file_path,
+                ContainerWriter.TAR_VARIANTS[self.container_format],
+                level,
+                workers,
+                data=self.data
+            )
         elif self.container_format == ContainerFormat.UNPACKED:
             self.actual_container = _ContainerUnpacked(self.file_path)
         self._log("Actual container format: '%s'" % self.container_format)
@@ -382,45 +601,519 @@ class Container(object):
 
 
 
+class ContainerWriter(object):
+    """
+    Write a new container, adding one entry at a time,
+    with its contents given as a string,
+    without creating the entries as files first.
+
+    The archive file is created when the writer is created,
+    and it is complete only after ``close`` has been called.
+    A writer can be used as a context manager: ::
+
+        with ContainerWriter("/path/to/output.zip") as writer:
+            writer.add_entry("foo/bar.txt", contents)
+
+    If ``file_path`` is ``None``, the container is written in memory
+    (ZIP, if the format is not specified),
+    and its contents are available in ``data``
+    after ``close`` has been called.
+
+    :param file_path: the path to the container file (or directory),
+                      or ``None`` to write the container in memory
+    :type  file_path: string (path)
+    :param container_format: the format of the container;
+                             if ``None``, it is inferred from ``file_path``
+    :type  container_format: :class:`aeneas.container.ContainerFormat`
+    :param compression_level: the compression level;
+                              if ``None``, use the default level
+                              of the container format
+                              (see :func:`aeneas.container.compression_level`)
+    :type  compression_level: int
+    :param compression_workers: the number of threads compressing the entries
+    :type  compression_workers: int
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    :raise ValueError: if an unpacked container is to be written in memory
+    """
+
+    TAG = "ContainerWriter"
+
+    TAR_VARIANTS = {
+        ContainerFormat.TAR: "",
+        ContainerFormat.TAR_GZ: ":gz",
+        ContainerFormat.TAR_BZ2: ":bz2"
+    }
+    """ Mode suffixes of the TAR formats """
+
+    ENTRY_MODE = 0644
+    """ Permissions of the written entries """
+
+    def __init__(
+            self,
+            file_path,
+            container_format=None,
+            compression_level=None,
+            compression_workers=gc.CONTAINER_COMPRESSION_WORKERS,
+            logger=None
+        ):
+        self.file_path = file_path
+        self.container_format = container_format
+        self.compression_level = compression_level
+        self.compression_workers = compression_workers
+        self.logger = logger
+        if self.logger == None:
+            self.logger = Logger()
+        self.buffer = None
+        self.data = None
+        if self.file_path == None:
+            if self.container_format == None:
+                self.container_format = ContainerFormat.ZIP
+            if self.container_format == ContainerFormat.UNPACKED:
+                msg = "An unpacked container cannot be written in memory"
+                self._log(msg, Logger.CRITICAL)
+                raise ValueError(msg)
+            self.buffer = StringIO.StringIO()
+        elif self.container_format == None:
+            self.container_format = Container.infer_format(self.file_path)
+        self.entries = []
+        self.pending = []
+        self.archive = None
+        self.compressor = None
+        self.tar_container = None
+        self.created = (self.buffer != None) or (not os.path.exists(self.file_path))
+        self._open_archive()
+        self._log("Writing container '%s' with format '%s'" % (self.file_path, self.container_format))
+
+    def _open_archive(self):
+        """
+        Create the archive file, or the directory, of the container.
+        """
+        level = compression_level(self.container_format, self.compression_level)
+        if self.container_format in [ContainerFormat.ZIP, ContainerFormat.EPUB]:
+            self.compressor = _Compressor(level, self.compression_workers, self.logger)
+            if self.buffer != None:
+                self.archive = zipfile.ZipFile(self.buffer, "w")
+            else:
+                self.archive = zipfile.ZipFile(self.file_path, "w")
+        elif self.container_format in self.TAR_VARIANTS:
+            self.tar_container = _ContainerTAR(
+                self.file_path,
+                self.TAR_VARIANTS[self.container_format],
+                level,
+                self.compression_workers,
+                self.logger
+            )
+            self.archive, self.compressor = self.tar_container._open_for_writing(self.buffer)
+        elif not os.path.isdir(self.file_path):
+            os.makedirs(self.file_path)
+
+    def _log(self, message, severity=Logger.DEBUG):
+        self.logger.log(message, severity, self.TAG)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_entry(self, entry, contents):
+        """
+        Add an entry with the given contents.
+
+        :param entry: the path of the entry inside the container
+        :type  entry: string (path)
+        :param contents: the contents of the entry
+        :type  contents: string
+        """
+        entry = os.path.normpath(entry).lstrip("/")
+        self._log("Adding entry '%s'" % entry)
+        if self.container_format in [ContainerFormat.ZIP, ContainerFormat.EPUB]:
+            self.pending.append((_zip_info(entry), contents))
+            if len(self.pending) >= self._batch_size():
+                self._write_pending()
+        elif self.container_format in self.TAR_VARIANTS:
+            info = tarfile.TarInfo(entry)
+            info.size = len(contents)
+            info.mtime = time.time()
+            info.mode = self.ENTRY_MODE
+            self.archive.addfile(info, StringIO.StringIO(contents))
+        else:
+            path = os.path.join(self.file_path, entry)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, "wb") as entry_file:
+                entry_file.write(contents)
+        self.entries.append(entry)
+
+    def _batch_size(self):
+        """
+        Return the number of ZIP entries compressed together.
+        """
+        if self.compressor.workers > 1:
+            return self.compressor.workers * _ContainerZIP.BATCH_SIZE
+        return 1
+
+    def _write_pending(self):
+        """
+        Compress and write the ZIP entries added but not written yet.
+        """
+        if len(self.pending) > 0:
+            self.compressor.write_zip_members(self.archive, self.pending)
+            self.pending = []
+
+    def close(self):
+        """
+        Complete the container, closing its archive file.
+
+        If the container is written in memory,
+        store its contents in ``data``.
+        """
+        if self.archive != None:
+            try:
+                if self.tar_container != None:
+                    self.tar_container._close_for_writing(
+                        self.archive,
+                        self.compressor,
+                        self.buffer
+                    )
+                else:
+                    self._write_pending()
+                    self.compressor.close()
+                    self.archive.close()
+                if self.buffer != None:
+                    self.data = self.buffer.getvalue()
+                    self.buffer.close()
+            finally:
+                self.archive = None
+                self.compressor = None
+            self._log("Closed container '%s' with %d entries" % (self.file_path, len(self.entries)))
+
+    def abort(self):
+        """
+        Close the container, and remove it,
+        or, if it is a directory existing before this writer
+        was created, remove the entries written into it.
+        """
+        self._log("Aborting container '%s'" % self.file_path)
+        self.pending = []
+        if (self.tar_container != None) and (self.compressor != None):
+            # do not gzip the temporary tar, just discard it
+            self.archive.close()
+            self.archive.fileobj.close()
+            self.compressor.close()
+            self.archive = None
+            self.compressor = None
+        try:
+            self.close()
+        except:
+            self.archive = None
+        if self.buffer != None:
+            self.buffer = None
+            self.data = None
+        elif os.path.isfile(self.file_path):
+            os.remove(self.file_path)
+        elif os.path.isdir(self.file_path):
+            if self.created:
+                shutil.rmtree(self.file_path, ignore_errors=True)
+            else:
+                for entry in self.entries:
+                    path = os.path.join(self.file_path, entry)
+                    if os.path.isfile(path):
+                        os.remove(path)
+        self.entries = []
+
+
+
+class _Compressor(object):
+    """
+    Compress ZIP members and GZIP streams
+    at the given level, using the given number of threads.
+
+    ZIP members are deflated independently of each other,
+    and written in order; a GZIP stream is cut into blocks,
+    each deflated independently and ended on a byte boundary,
+    so that their concatenation is a single, standard deflate stream.
+    ``zlib`` releases the GIL while compressing,
+    hence threads actually run in parallel.
+    """
+
+    TAG = "Compressor"
+
+    GZIP_BLOCK_SIZE = 1048576
+    """ Size, in bytes, of the blocks of a GZIP stream """
+
+    def __init__(self, level, workers=1, logger=None):
+        self.level = level
+        self.workers = max(1, workers)
+        self.pool = None
+        self.logger = logger
+        if self.logger == None:
+            self.logger = Logger()
+
+    def _log(self, message, severity=Logger.DEBUG):
+        self.logger.log(message, severity, self.TAG)
+
+    def _map(self, function, items):
+        if (self.workers > 1) and (len(items) > 1):
+            if self.pool == None:
+                self._log("Starting %d compression threads" % self.workers)
+                self.pool = ThreadPool(self.workers)
+            return self.pool.map(function, items)
+        return [function(item) for item in items]
+
+    def close(self):
+        """
+        Stop the compression threads, if any.
+        """
+        if self.pool != None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def _deflate(self, item):
+        data, finish = item
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        if finish:
+            return compressor.compress(data) + compressor.flush()
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def write_zip_members(self, zip_file, members):
+        """
+        Write the given members into the given (open) ZIP file,
+        storing them if the level is ``0``, or deflating them.
+
+        The members are written with ``ZipFile.writestr``,
+        unless they must be deflated at a level other than
+        the default one of ``zipfile``, or in parallel:
+        in that case, they are deflated by the compression threads,
+        and written by ``_write_deflated_zip_member``.
+
+        :param zip_file: the ZIP file
+        :type  zip_file: :class:`zipfile.ZipFile`
+        :param members: the members, as ``(info, data)`` pairs
+        :type  members: list of (:class:`zipfile.ZipInfo`, string)
+        """
+        if self.level == 0:
+            for info, data in members:
+                info.compress_type = zipfile.ZIP_STORED
+                zip_file.writestr(info, data)
+            return
+        if (
+                (not _DEFLATED_ZIP_MEMBERS) or
+                ((self.level in [zlib.Z_DEFAULT_COMPRESSION, 6]) and (self.workers == 1))
+            ):
+            for info, data in members:
+                info.compress_type = zipfile.ZIP_DEFLATED
+                zip_file.writestr(info, data)
+            return
+        compressed = self._map(self._deflate, [(data, True) for info, data in members])
+        for (info, data), deflated in zip(members, compressed):
+            _write_deflated_zip_member(zip_file, info, data, deflated)
+
+    def _read_blocks(self, input_file):
+        blocks = []
+        while len(blocks) < self.workers:
+            block = input_file.read(self.GZIP_BLOCK_SIZE)
+            if len(block) == 0:
+                break
+            blocks.append(block)
+        return blocks
+
+    def write_gzip(self, input_file, output_file):
+        """
+        Compress the contents of ``input_file``
+        into ``output_file`` as a (single member) GZIP stream,
+        deflating its blocks in parallel.
+
+        :param input_file: the file to be compressed
+        :type  input_file: file
+        :param output_file: the file to write the GZIP stream into
+        :type  output_file: file
+        """
+        extra_flags = 0
+        if self.level == 9:
+            extra_flags = 2
+        elif self.level == 1:
+            extra_flags = 4
+        output_file.write(struct.pack(
+            "<BBBBLBB", 0x1f, 0x8b, 8, 0, int(time.time()), extra_flags, 255
+        ))
+        crc = 0
+        size = 0
+        blocks = self._read_blocks(input_file)
+        if len(blocks) == 0:
+            output_file.write(self._deflate(("", True)))
+        while len(blocks) > 0:
+            next_blocks = self._read_blocks(input_file)
+            last = len(next_blocks) == 0
+            items = []
+            for i in range(len(blocks)):
+                crc = zlib.crc32(blocks[i], crc)
+                size += len(blocks[i])
+                items.append((blocks[i], last and (i == len(blocks) - 1)))
+            for deflated in self._map(self._deflate, items):
+                output_file.write(deflated)
+            blocks = next_blocks
+        output_file.write(struct.pack("<LL", crc & 0xffffffff, size & 0xffffffff))
+
+_DEFLATED_ZIP_MEMBERS = (
+    (sys.version_info[0:2] == (2, 7)) and
+    hasattr(zipfile.ZipFile, "_writecheck") and
+    hasattr(zipfile.ZipInfo, "FileHeader")
+)
+""" ``True`` if ``_write_deflated_zip_member`` can be used
+with the ``zipfile`` module of this Python version """
+
+def _write_deflated_zip_member(zip_file, info, data, deflated):
+    """
+    Write the given member into the given (open) ZIP file,
+    as the given raw deflate stream of its data.
+
+    ``zipfile`` has no public way to write an already deflated member
+    (``writestr`` always deflates at the default level, in the caller),
+    hence this function relies on the internals
+    of ``zipfile.ZipFile`` of Python 2.7,
+    and it must be used only if ``_DEFLATED_ZIP_MEMBERS`` is ``True``.
+    It mirrors what ``writestr`` does, except for the compression.
+    """
+    info.CRC = zlib.crc32(data) & 0xffffffff
+    info.file_size = len(data)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.compress_size = len(deflated)
+    info.header_offset = zip_file.fp.tell()
+    zip_file._writecheck(info)
+    zip_file._didModify = True
+    zip_file.fp.write(info.FileHeader())
+    zip_file.fp.write(deflated)
+    zip_file.filelist.append(info)
+    zip_file.NameToInfo[info.filename] = info
+
+def _zip_info(archive_name, path=None):
+    """
+    Return a ZipInfo for the given archive name,
+    with date and permissions read from the given file,
+    or set to now and ``ContainerWriter.ENTRY_MODE``
+    if ``path`` is ``None``.
+    """
+    if path == None:
+        info = zipfile.ZipInfo(archive_name, time.localtime()[0:6])
+        info.external_attr = ContainerWriter.ENTRY_MODE << 16
+        return info
+    stat = os.stat(path)
+    date_time = time.localtime(stat.st_mtime)[0:6]
+    if date_time[0] < 1980:
+        date_time = (1980, 1, 1, 0, 0, 0)
+    info = zipfile.ZipInfo(archive_name, date_time)
+    info.external_attr = (stat.st_mode & 0xFFFF) << 16
+    return info
+
 class _ContainerTAR(object):
     """
     A TAR container. 
+
+    The archive file (or the contents held in memory) is opened
+    (and its members read) at the first access,
+    and kept open until ``close`` is called.
     """
 
     TAG = "ContainerTAR"
 
-    def __init__(self, file_path, variant, logger=None):
+    def __init__(self, file_path, variant, level=None, workers=1, logger=None, data=None):
         self.file_path = file_path
         self.variant = variant
+        self.level = level
+        self.workers = workers
+        self.data = data
+        self.tar_file = None
+        self.members = None
         self.logger = logger
         if self.logger == None:
             self.logger = Logger()
 
+    def _archive(self):
+        if self.tar_file == None:
+            argument = "r" + self.variant
+            if self.data != None:
+                self.tar_file = tarfile.open(fileobj=StringIO.StringIO(self.data), mode=argument)
+            else:
+                self.tar_file = tarfile.open(self.file_path, argument)
+            self.members = dict([
+                (e.name, e) for e in self.tar_file.getmembers() if e.isfile()
+            ])
+        return self.tar_file
+
+    def close(self):
+        if self.tar_file != None:
+            self.tar_file.close()
+            self.tar_file = None
+            self.members = None
+
     def entries(self):
-        argument = "r" + self.variant
-        tar_file = tarfile.open(self.file_path, argument)
-        result = [e.name for e in tar_file.getmembers() if e.isfile()]
-        tar_file.close()
-        return sorted(result)
+        self._archive()
+        return sorted(self.members.keys())
 
     def read_entry(self, entry):
-        argument = "r" + self.variant
-        tar_file = tarfile.open(self.file_path, argument)
-        tar_entry = tar_file.extractfile(entry)
+        tar_entry = self._archive().extractfile(self.members[entry])
         result = tar_entry.read()
         tar_entry.close()
-        tar_file.close()
         return result
 
     def decompress(self, output_path):
-        argument = "r" + self.variant
-        tar_file = tarfile.open(self.file_path, argument)
-        tar_file.extractall(output_path)
+        self._archive().extractall(output_path)
+
+    def decompress_entries(self, output_path, entries):
+        tar_file = self._archive()
+        for entry in entries:
+            tar_file.extract(self.members[entry], output_path)
+
+    def _open_for_writing(self, output_file=None):
+        """
+        Open the archive for writing, returning the tar file,
+        and the compressor which will gzip it on close,
+        if the blocks of a TAR.GZ are to be compressed in parallel.
+
+        If ``output_file`` is not ``None``, the archive is written
+        into it (e.g., into a buffer in memory),
+        instead of into the file at ``file_path``.
+        """
+        if (self.variant == ":gz") and (self.workers > 1):
+            compressor = _Compressor(self.level, self.workers, self.logger)
+            if output_file != None:
+                intermediate_file = StringIO.StringIO()
+            else:
+                intermediate_file = tempfile.TemporaryFile()
+            return tarfile.open(fileobj=intermediate_file, mode="w"), compressor
+        arguments = dict(mode="w" + self.variant)
+        if output_file != None:
+            arguments["fileobj"] = output_file
+        else:
+            arguments["name"] = self.file_path
+        if (self.variant != "") and (self.level != None):
+            arguments["compresslevel"] = self.level
+        return tarfile.open(**arguments), None
+
+    def _close_for_writing(self, tar_file, compressor, output_file=None):
+        """
+        Close the archive opened by ``_open_for_writing``.
+        """
         tar_file.close()
+        if compressor != None:
+            intermediate_file = tar_file.fileobj
+            intermediate_file.seek(0)
+            try:
+                if output_file != None:
+                    compressor.write_gzip(intermediate_file, output_file)
+                else:
+                    with open(self.file_path, "wb") as archive_file:
+                        compressor.write_gzip(intermediate_file, archive_file)
+            finally:
+                compressor.close()
+                intermediate_file.close()
 
     def compress(self, input_path):
-        argument = "w" + self.variant
-        tar_file = tarfile.open(self.file_path, argument)
+        self.close()
+        tar_file, compressor = self._open_for_writing()
         root_len = len(os.path.abspath(input_path))
         for root, dirs, files in os.walk(input_path):
             archive_root = os.path.abspath(root)[root_len:]
@@ -428,50 +1121,141 @@ class _ContainerTAR(object):
                 fullpath = os.path.join(root, f)
                 archive_name = os.path.join(archive_root, f)
                 tar_file.add(name=fullpath, arcname=archive_name)
-        tar_file.close()
+        self._close_for_writing(tar_file, compressor)
 
 class _ContainerZIP(object):
     """
     A ZIP container. 
+
+    The archive file (or the contents held in memory) is opened
+    (and its central directory read) at the first access,
+    and kept open until ``close`` is called.
     """
 
     TAG = "ContainerZIP"
 
-    def __init__(self, file_path, logger=None):
+    BATCH_SIZE = 4
+    """ Number of members compressed in parallel by each thread at a time """
+
+    def __init__(
+            self,
+            file_path,
+            level=0,
+            workers=1,
+            decompression_workers=1,
+            logger=None,
+            data=None
+        ):
         self.file_path = file_path
+        self.level = level
+        self.workers = workers
+        self.decompression_workers = decompression_workers
+        self.data = data
+        self.zip_file = None
         self.logger = logger
         if self.logger == None:
             self.logger = Logger()
 
+    def _open(self):
+        if self.data != None:
+            return zipfile.ZipFile(StringIO.StringIO(self.data))
+        return zipfile.ZipFile(self.file_path)
+
+    def _archive(self):
+        if self.zip_file == None:
+            self.zip_file = self._open()
+        return self.zip_file
+
+    def close(self):
+        if self.zip_file != None:
+            self.zip_file.close()
+            self.zip_file = None
+
     def entries(self):
-        zip_file = zipfile.ZipFile(self.file_path)
-        result = [e for e in zip_file.namelist() if not e.endswith("/")]
-        zip_file.close()
+        result = [e for e in self._archive().namelist() if not e.endswith("/")]
         return sorted(result)
 
     def read_entry(self, entry):
-        zip_file = zipfile.ZipFile(self.file_path)
-        zip_entry = zip_file.open(entry)
-        result = zip_entry.read()
-        zip_entry.close()
-        zip_file.close()
-        return result
+        return self._archive().read(entry)
+
+    def _extract(self, output_path, entries):
+        """
+        Extract the given entries into the given directory.
+
+        If more than one thread is allowed, the entries are
+        extracted concurrently, largest first, each thread
+        reading the archive through its own file handle.
+        """
+        zip_file = self._archive()
+        workers = min(self.decompression_workers, len(entries))
+        if workers <= 1:
+            for entry in entries:
+                zip_file.extract(entry, output_path)
+            return
+
+        # create the directories beforehand, so that threads do not race
+        for entry in entries:
+            directory = os.path.dirname(os.path.join(output_path, entry))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        entries = sorted(
+            entries,
+            key=lambda entry: zip_file.getinfo(entry).file_size,
+            reverse=True
+        )
+        handles = []
+        local = threading.local()
+        lock = threading.Lock()
+        def extract(entry):
+            if not hasattr(local, "zip_file"):
+                local.zip_file = self._open()
+                with lock:
+                    handles.append(local.zip_file)
+            local.zip_file.extract(entry, output_path)
+        pool = ThreadPool(workers)
+        try:
+            pool.map(extract, entries)
+        finally:
+            pool.close()
+            pool.join()
+            for handle in handles:
+                handle.close()
 
     def decompress(self, output_path):
-        zip_file = zipfile.ZipFile(self.file_path)
-        zip_file.extractall(output_path)
-        zip_file.close()
+        entries = []
+        for entry in self._archive().namelist():
+            if entry.endswith("/"):
+                directory = os.path.join(output_path, entry)
+                if not os.path.isdir(directory):
+                    os.makedirs(directory)
+            else:
+                entries.append(entry)
+        self._extract(output_path, entries)
+
+    def decompress_entries(self, output_path, entries):
+        self._extract(output_path, entries)
 
     def compress(self, input_path):
+        self.close()
+        compressor = _Compressor(self.level, self.workers, self.logger)
         zip_file = zipfile.ZipFile(self.file_path, "w")
-        root_len = len(os.path.abspath(input_path))
-        for root, dirs, files in os.walk(input_path):
-            archive_root = os.path.abspath(root)[root_len:]
-            for f in files:
-                fullpath = os.path.join(root, f)
-                archive_name = os.path.join(archive_root, f)
-                zip_file.write(fullpath, archive_name)
-        zip_file.close()
+        try:
+            members = []
+            root_len = len(os.path.abspath(input_path))
+            for root, dirs, files in os.walk(input_path):
+                archive_root = os.path.abspath(root)[root_len:]
+                for f in files:
+                    fullpath = os.path.join(root, f)
+                    archive_name = os.path.join(archive_root, f).lstrip("/")
+                    with open(fullpath, "rb") as member_file:
+                        members.append((_zip_info(archive_name, fullpath), member_file.read()))
+                    if len(members) >= self.BATCH_SIZE * compressor.workers:
+                        compressor.write_zip_members(zip_file, members)
+                        members = []
+            compressor.write_zip_members(zip_file, members)
+        finally:
+            compressor.close()
+            zip_file.close()
 
 class _ContainerUnpacked(object):
     """
@@ -486,6 +1270,9 @@ class _ContainerUnpacked(object):
         if self.logger == None:
             self.logger = Logger()
 
+    def close(self):
+        pass
+
     def entries(self):
         result = []
         root_len = len(os.path.abspath(self.file_path))
@@ -505,12 +1292,25 @@ class _ContainerUnpacked(object):
     def decompress(self, output_path):
         if os.path.abspath(output_path) == os.path.abspath(self.file_path):
             return
-        gf.copytree(self.file_path, output_path)
+        gf.copytree(self.file_path, output_path, link=gc.CONTAINER_UNPACKED_HARD_LINKS)
+
+    def decompress_entries(self, output_path, entries):
+        if os.path.abspath(output_path) == os.path.abspath(self.file_path):
+            return
+        for entry in entries:
+            destination = os.path.join(output_path, entry)
+            if not os.path.isdir(os.path.dirname(destination)):
+                os.makedirs(os.path.dirname(destination))
+            gf.copytree(
+                os.path.join(self.file_path, entry),
+                destination,
+                link=gc.CONTAINER_UNPACKED_HARD_LINKS
+            )
 
     def compress(self, input_path):
         if os.path.abspath(input_path) == os.path.abspath(self.file_path):
             return
-        gf.copytree(input_path, self.file_path)
+        gf.copytree(input_path, self.file_path, link=gc.CONTAINER_UNPACKED_HARD_LINKS)
 
 
 
@@ -7,11 +7,15 @@ of dynamic time warping (DTW) algorithms
 to align two audio waves, represented by their
 Mel-frequency cepstral coefficients (MFCCs).
 
-The two classes provided by this module are:
+The classes provided by this module are:
 
 1. :class:`aeneas.dtw.DTWAlgorithm`
    is an enumeration of the available algorithms.
-2. :class:`aeneas.dtw.DTWAligner`
+2. :class:`aeneas.dtw.WaveFeatures`
+   holds the MFCCs of a wave, which can be computed once
+   and shared (sliced) by several alignments,
+   possibly in different processes.
+3. :class:`aeneas.dtw.DTWAligner`
    is the actual feature extractor and aligner.
 
 To align two wave files:
@@ -25,8 +29,25 @@ To align two wave files:
    the MFCC representations of the two wave files;
 4. obtain the map between the two wave files by reading the
    ``computed_map`` property.
+
+When a striped algorithm is used, the width of the stripe
+can be sized automatically (see
+:class:`aeneas.globalconstants.ALIGNER_AUTO_MARGIN`):
+a coarse alignment is computed on downsampled MFCCs,
+the stripe is made just wide enough to contain it,
+and it is widened (and the path computed again)
+only if the min cost path touches the stripe boundary.
+
+Optionally, the leading and trailing non-speech portions
+of the real wave (silence, music, credits) can be detected
+and excluded from the alignment (see
+:class:`aeneas.globalconstants.ALIGNER_TRIM_NONSPEECH`),
+and the long interior pauses can be shortened (see
+:class:`aeneas.globalconstants.ALIGNER_COMPRESS_PAUSES`).
+The computed path is mapped back to the frames of the whole real wave.
 """
 
+import copy
 import numpy
 import os
 from scikits.audiolab import wavread
@@ -88,6 +109,143 @@ class DTWAlgorithm(object):
 
 
 
+class WaveFeatures(object):
+    """
+    The features of a wave, that is,
+    its MFCCs and the energy of each MFCC frame,
+    as computed by :class:`aeneas.dtw.DTWAligner`.
+
+    The features of a whole wave can be computed once,
+    and then sliced (without copying them)
+    for each time interval to be aligned.
+
+    The features can also be stored into ``.npy`` files
+    (see ``share``): from then on, they are memory-mapped
+    read-only, and pickling the object (or any of its slices),
+    e.g. to send it to a worker process, pickles only
+    the path of the files, so that all the processes
+    share the same pages.
+
+    :param mfcc: the MFCCs, one column per frame
+    :type  mfcc: numpy 2D array
+    :param length: the length of the wave, in seconds
+    :type  length: float
+    :param energy: the energy of each frame, in dB
+    :type  energy: numpy array
+    :param frame_rate: the MFCC frame rate, in frames per second
+    :type  frame_rate: int
+    """
+
+    MFCC_EXTENSION = ".mfcc.npy"
+    """ Extension of the file holding the shared MFCCs """
+
+    ENERGY_EXTENSION = ".energy.npy"
+    """ Extension of the file holding the shared frame energy """
+
+    def __init__(self, mfcc, length, energy, frame_rate=gc.ALIGNER_FRAME_RATE):
+        self.mfcc = mfcc
+        self.length = length
+        self.energy = energy
+        self.frame_rate = frame_rate
+        self.path = None
+        self.start = 0
+        self.end = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.path != None:
+            # the arrays are reloaded from the shared files
+            del state["mfcc"]
+            del state["energy"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.path != None:
+            self._load_shared()
+
+    def _load_shared(self):
+        mfcc = numpy.load(self.path + self.MFCC_EXTENSION, mmap_mode="r")
+        energy = numpy.load(self.path + self.ENERGY_EXTENSION, mmap_mode="r")
+        self.mfcc = mfcc[:, self.start:self.end]
+        self.energy = energy[self.start:self.end]
+
+    @classmethod
+    def from_file(cls, wave_path, frame_rate=gc.ALIGNER_FRAME_RATE, logger=None):
+        """
+        Compute the features of the given wave file.
+
+        :param wave_path: the path of the wave file
+        :type  wave_path: string (path)
+        :param frame_rate: the MFCC frame rate, in frames per second
+        :type  frame_rate: int
+        :param logger: the logger object
+        :type  logger: :class:`aeneas.logger.Logger`
+        :rtype: :class:`aeneas.dtw.WaveFeatures`
+        """
+        aligner = DTWAligner(wave_path, None, frame_rate=frame_rate, logger=logger)
+        mfcc, length, energy = aligner._compute_mfcc(wave_path)
+        return cls(mfcc, length, energy, frame_rate)
+
+    def share(self, path):
+        """
+        Store the features into ``.npy`` files,
+        whose paths start with the given path,
+        and memory-map them read-only.
+
+        The caller is responsible for removing the files
+        when the features are no longer needed.
+
+        :param path: the path prefix of the files
+        :type  path: string (path)
+        """
+        numpy.save(path + self.MFCC_EXTENSION, self.mfcc)
+        numpy.save(path + self.ENERGY_EXTENSION, self.energy)
+        self.path = path
+        self.start = 0
+        self.end = None
+        self._load_shared()
+
+    def slice(self, begin=None, length=None):
+        """
+        Return the features of the interval of the wave
+        starting at ``begin`` seconds (if ``None``, at the beginning)
+        and lasting ``length`` seconds (if ``None``, until the end),
+        with the same frames (up to one frame)
+        that would be computed on the interval alone.
+
+        The returned object shares the arrays of this one
+        (and its files, if it is shared).
+
+        :param begin: the begin of the interval, in seconds
+        :type  begin: float
+        :param length: the length of the interval, in seconds
+        :type  length: float
+        :rtype: :class:`aeneas.dtw.WaveFeatures`
+        """
+        frames = self.mfcc.shape[1]
+        if (begin == None) or (begin < 0):
+            begin = 0.0
+        begin = min(begin, self.length)
+        available = self.length - begin
+        if (length == None) or (length <= 0) or (length > available):
+            length = available
+        start = min(int(round(begin * self.frame_rate)), frames)
+        end = min(start + int(length * self.frame_rate) + 1, frames)
+        result = WaveFeatures(
+            self.mfcc[:, start:end],
+            length,
+            self.energy[start:end],
+            self.frame_rate
+        )
+        if self.path != None:
+            result.path = self.path
+            result.start = self.start + start
+            result.end = self.start + end
+        return result
+
+
+
 class DTWAligner(object):
     """
     The MFCC extractor and wave aligner.
@@ -104,12 +262,39 @@ class DTWAligner(object):
     :type  margin: int
     :param algorithm: the DTW algorithm to be used when aligning the waves
     :type  algorithm: :class:`aeneas.dtw.DTWAlgorithm`
+    :param auto_margin: if ``True``, size the stripe automatically,
+                        using ``margin`` as its upper bound. Default:
+                        :class:`aeneas.globalconstants.ALIGNER_AUTO_MARGIN`
+    :type  auto_margin: bool
+    :param trim_nonspeech: if ``True``, align only the speech interval
+                           of the real wave (see ``compute_speech_interval``).
+                           Default:
+                           :class:`aeneas.globalconstants.ALIGNER_TRIM_NONSPEECH`
+    :type  trim_nonspeech: bool
+    :param compress_pauses: if ``True``, shorten the long pauses
+                            of the real wave before aligning
+                            (see ``compute_kept_frames``).
+                            Default:
+                            :class:`aeneas.globalconstants.ALIGNER_COMPRESS_PAUSES`
+    :type  compress_pauses: bool
+    :param real_features: the precomputed features of the real wave;
+                          if not ``None``, ``wave_path_1`` is not read
+    :type  real_features: :class:`aeneas.dtw.WaveFeatures`
+    :param synt_features: the precomputed features of the synthesized wave;
+                          if not ``None``, ``wave_path_2`` is not read
+    :type  synt_features: :class:`aeneas.dtw.WaveFeatures`
     :param logger: the logger object
     :type  logger: :class:`aeneas.logger.Logger`
     """
 
     TAG = "DTWAligner"
 
+    MFCC_COMPUTERS = dict()
+    """ MFCC computers (holding the mel filterbank,
+    the Hamming window and the DCT matrices) built so far
+    in this process, keyed by ``(sample_frequency, frame_rate)``,
+    so that a long-running process builds them only once """
+
     def __init__(
             self,
             wave_path_1,
@@ -117,6 +302,11 @@ class DTWAligner(object):
             frame_rate=gc.ALIGNER_FRAME_RATE,
             margin=gc.ALIGNER_MARGIN,
             algorithm=DTWAlgorithm.STRIPE,
+            auto_margin=gc.ALIGNER_AUTO_MARGIN,
+            trim_nonspeech=gc.ALIGNER_TRIM_NONSPEECH,
+            compress_pauses=gc.ALIGNER_COMPRESS_PAUSES,
+            real_features=None,
+            synt_features=None,
             logger=None
         ):
         self.logger = logger
@@ -127,11 +317,19 @@ class DTWAligner(object):
         self.frame_rate = frame_rate
         self.margin = margin
         self.algorithm = algorithm
+        self.auto_margin = auto_margin
+        self.trim_nonspeech = trim_nonspeech
+        self.compress_pauses = compress_pauses
+        self.real_features = real_features
+        self.synt_features = synt_features
         self.wave_mfcc_1 = None
         self.wave_mfcc_2 = None
         self.wave_len_1 = None
         self.wave_len_2 = None
+        self.wave_energy_1 = None
         self.computed_path = None
+        self.computed_delta = None
+        self.speech_interval = None
 
     def _log(self, message, severity=Logger.DEBUG):
         self.logger.log(message, severity, self.TAG)
@@ -140,17 +338,29 @@ class DTWAligner(object):
         """
         Compute the MFCCs of the two waves,
         and store them internally.
+
+        If the features of the real (synthesized) wave were given
+        in the constructor, they are used instead.
         """
-        if (self.wave_path_1 != None) and (os.path.isfile(self.wave_path_1)):
+        if self.real_features != None:
+            self._log("Using precomputed MFCCs for wave 1")
+            self.wave_mfcc_1 = self.real_features.mfcc
+            self.wave_len_1 = self.real_features.length
+            self.wave_energy_1 = self.real_features.energy
+        elif (self.wave_path_1 != None) and (os.path.isfile(self.wave_path_1)):
             self._log("Computing MFCCs for wave 1")
-            self.wave_mfcc_1, self.wave_len_1 = self._compute_mfcc(self.wave_path_1)
+            self.wave_mfcc_1, self.wave_len_1, self.wave_energy_1 = self._compute_mfcc(self.wave_path_1)
         else:
             # TODO raise
             pass
 
-        if (self.wave_path_2 != None) and (os.path.isfile(self.wave_path_2)):
+        if self.synt_features != None:
+            self._log("Using precomputed MFCCs for wave 2")
+            self.wave_mfcc_2 = self.synt_features.mfcc
+            self.wave_len_2 = self.synt_features.length
+        elif (self.wave_path_2 != None) and (os.path.isfile(self.wave_path_2)):
             self._log("Computing MFCCs for wave 2")
-            self.wave_mfcc_2, self.wave_len_2 = self._compute_mfcc(self.wave_path_2)
+            self.wave_mfcc_2, self.wave_len_2, energy = self._compute_mfcc(self.wave_path_2)
         else:
             # TODO raise
             pass
@@ -164,18 +374,218 @@ class DTWAligner(object):
         self._log("Sample frequency: %f" % sample_frequency)
         self._log("Sample encoding:  %s" % encoding)
         self._log("Computing MFCCs")
-        computer = MFCC(samprate=sample_frequency, frate=self.frame_rate)
+        computer = self._mfcc_computer(sample_frequency, self.frame_rate)
         result = computer.sig2s2mfc(data).transpose()
+        self._log("Computing frame energy")
+        energy = self._compute_energy(data, sample_frequency, result.shape[1])
         self._log("Returning MFCCs")
-        return (result, length)
+        return (result, length, energy)
+
+    @classmethod
+    def _mfcc_computer(cls, sample_frequency, frame_rate):
+        """
+        Return an MFCC computer for the given sample frequency
+        and frame rate, reusing the filterbank of a previous one.
+
+        The computer holds the pre-emphasis state of the wave
+        being processed, hence each call returns a (shallow) copy
+        of the cached one.
+
+        :param sample_frequency: the sample frequency, in Hz
+        :type  sample_frequency: int
+        :param frame_rate: the MFCC frame rate, in frames per second
+        :type  frame_rate: int
+        :rtype: :class:`aeneas.mfcc.MFCC`
+        """
+        key = (sample_frequency, frame_rate)
+        computer = cls.MFCC_COMPUTERS.get(key, None)
+        if computer == None:
+            computer = MFCC(samprate=sample_frequency, frate=frame_rate)
+            cls.MFCC_COMPUTERS[key] = computer
+        return copy.copy(computer)
+
+    def _compute_energy(self, data, sample_frequency, frames):
+        """
+        Compute the energy, in dB, of each MFCC frame of the given samples.
+
+        :param data: the samples
+        :type  data: numpy array
+        :param sample_frequency: the sample frequency, in Hz
+        :type  sample_frequency: int
+        :param frames: the number of MFCC frames
+        :type  frames: int
+        :rtype: numpy array
+        """
+        if len(data.shape) > 1:
+            data = data.mean(axis=1)
+        shift = max(1, int(sample_frequency / self.frame_rate))
+        padded = numpy.zeros(frames * shift)
+        length = min(len(data), len(padded))
+        padded[:length] = data[:length]
+        power = numpy.mean(padded.reshape(frames, shift) ** 2, axis=1)
+        return 10 * numpy.log10(power + 1e-10)
+
+    def compute_speech_frames(self):
+        """
+        Detect the speech frames of the real wave,
+        and return them as a ``numpy`` bool array,
+        with one element for each MFCC frame.
+
+        A frame is considered speech if,
+        in a window of
+        :class:`aeneas.globalconstants.ALIGNER_TRIM_WINDOW` seconds
+        around it, more than half of the frames are:
+
+        1. not silent,
+           that is, their energy is at most
+           :class:`aeneas.globalconstants.ALIGNER_TRIM_SILENCE_THRESHOLD`
+           dB below the loud frames of the wave; and
+        2. modulated, that is, the standard deviation
+           of the first MFCC coefficient
+           (``c0``, a log-energy measure) around them
+           is at least
+           :class:`aeneas.globalconstants.ALIGNER_TRIM_MODULATION_THRESHOLD`,
+           as speech alternates syllables and short pauses,
+           while music and noise are more stationary.
+           Since ``c0`` is logarithmic, this does not depend
+           on the volume of the recording.
+
+        If the real wave is not longer than the window,
+        all its frames are considered speech.
+
+        :rtype: numpy array
+        """
+        n = self.wave_mfcc_1.shape[1]
+        window = max(1, int(gc.ALIGNER_TRIM_WINDOW * self.frame_rate))
+        speech = numpy.ones(n, dtype=bool)
+        if n <= window:
+            self._log("Real wave too short, assuming speech")
+            return speech
+        kernel = numpy.ones(window) / window
+
+        # condition 1: not silent
+        if self.wave_energy_1 is not None:
+            energy = self.wave_energy_1
+            threshold = numpy.percentile(energy, 95) - gc.ALIGNER_TRIM_SILENCE_THRESHOLD
+            speech &= (energy > threshold)
+
+        # condition 2: modulated c0
+        c0 = self.wave_mfcc_1[0, :]
+        mean = numpy.convolve(c0, kernel, mode="same")
+        mean_sq = numpy.convolve(c0 ** 2, kernel, mode="same")
+        std = numpy.sqrt(numpy.clip(mean_sq - mean ** 2, 0, numpy.inf))
+        speech &= (std >= gc.ALIGNER_TRIM_MODULATION_THRESHOLD)
+
+        # majority vote over the window, to fill short pauses
+        # and to discard the short spurious runs around
+        # the boundaries between silence and music
+        return (numpy.convolve(speech.astype(numpy.float64), kernel, mode="same") > 0.5)
+
+    def compute_speech_interval(self, speech=None):
+        """
+        Detect the speech interval of the real wave,
+        that is, the MFCC frames between the leading
+        and the trailing non-speech portions,
+        and store it in ``speech_interval``
+        as a pair ``(start, end)`` of frame indices
+        (``end`` excluded).
+
+        The speech frames are detected by ``compute_speech_frames``,
+        unless they are given in ``speech``.
+
+        If the detected interval is shorter than
+        :class:`aeneas.globalconstants.ALIGNER_TRIM_MIN_LENGTH_RATIO`
+        times the length of the synthesized wave,
+        the detection is considered unreliable,
+        and the whole real wave is used.
+
+        :param speech: the speech frames
+        :type  speech: numpy bool array
+        :rtype: pair of int
+        """
+        n = self.wave_mfcc_1.shape[1]
+        self.speech_interval = (0, n)
+        if speech is None:
+            speech = self.compute_speech_frames()
+        indices = numpy.nonzero(speech)[0]
+        if len(indices) == 0:
+            self._log("No speech detected, not trimming", Logger.WARNING)
+            return self.speech_interval
+        # extend by half window on each side, as the window is centered
+        window = max(1, int(gc.ALIGNER_TRIM_WINDOW * self.frame_rate))
+        start = max(0, int(indices[0]) - window / 2)
+        end = min(n, int(indices[-1]) + 1 + window / 2)
+        self._log("Detected speech interval: %d %d (of %d)" % (start, end, n))
+        min_length = gc.ALIGNER_TRIM_MIN_LENGTH_RATIO * self.wave_mfcc_2.shape[1]
+        if end - start < min_length:
+            self._log("Speech interval too short, not trimming", Logger.WARNING)
+            return self.speech_interval
+        self.speech_interval = (start, end)
+        return self.speech_interval
+
+    def compute_kept_frames(self, speech=None):
+        """
+        Return the indices of the frames of the real wave
+        to be aligned, as a sorted ``numpy`` int array.
+
+        If ``trim_nonspeech`` is ``True``, only the frames
+        in the speech interval are kept
+        (see ``compute_speech_interval``).
+
+        If ``compress_pauses`` is ``True``,
+        each run of non-speech frames longer than
+        :class:`aeneas.globalconstants.ALIGNER_PAUSE_MIN_LENGTH` seconds
+        is shortened to
+        :class:`aeneas.globalconstants.ALIGNER_PAUSE_KEEP_LENGTH` seconds,
+        keeping its first and last frames.
+
+        The speech frames are detected by ``compute_speech_frames``,
+        unless they are given in ``speech``.
+
+        :param speech: the speech frames
+        :type  speech: numpy bool array
+        :rtype: numpy array
+        """
+        n = self.wave_mfcc_1.shape[1]
+        if (not self.trim_nonspeech) and (not self.compress_pauses):
+            return numpy.arange(n)
+        if speech is None:
+            speech = self.compute_speech_frames()
+        start, end = 0, n
+        if self.trim_nonspeech:
+            start, end = self.compute_speech_interval(speech)
+        kept = numpy.ones(n, dtype=bool)
+        kept[:start] = False
+        kept[end:] = False
+        if self.compress_pauses:
+            min_length = max(1, int(gc.ALIGNER_PAUSE_MIN_LENGTH * self.frame_rate))
+            keep_half = max(1, int(gc.ALIGNER_PAUSE_KEEP_LENGTH * self.frame_rate) / 2)
+            # boundaries of the runs of non-speech frames in [start, end)
+            padded = numpy.concatenate(([True], speech[start:end], [True]))
+            changes = numpy.nonzero(numpy.diff(padded.astype(numpy.int8)))[0]
+            removed = 0
+            for run_start, run_end in zip(changes[0::2], changes[1::2]):
+                if run_end - run_start > max(min_length, 2 * keep_half):
+                    kept[start + run_start + keep_half:start + run_end - keep_half] = False
+                    removed += run_end - run_start - 2 * keep_half
+            self._log("Removed %d pause frames" % removed)
+        return numpy.nonzero(kept)[0]
 
     def compute_path(self):
         """
         Compute the min cost path between the two waves,
         and store it interally.
+
+        The number of MFCC frames of the stripe actually used
+        (if any) is stored in ``computed_delta``.
         """
         # setup
-        dtw = None
+        mfcc1 = self.wave_mfcc_1
+        kept = None
+        if self.trim_nonspeech or self.compress_pauses:
+            kept = self.compute_kept_frames()
+            self._log("Aligning %d of %d frames" % (len(kept), mfcc1.shape[1]))
+            mfcc1 = mfcc1[:, kept]
         algorithm = self.algorithm
         delta = self.frame_rate * (self.margin * 2)
         mfcc2_size = self.wave_mfcc_2.shape[1]
@@ -192,34 +602,161 @@ class DTWAligner(object):
                 self._log("Selecting EXACT algorithm disabled in gc")
 
         # execute the selected algorithm
-        if algorithm == DTWAlgorithm.STRIPE:
-            self._log("Computing with STRIPE algo")
-            dtw = DTWStripe(
-                self.wave_mfcc_1,
+        if algorithm == DTWAlgorithm.EXACT:
+            self.computed_delta = None
+            path = self._compute_path(
+                algorithm,
+                mfcc1,
+                self.wave_mfcc_2,
+                None
+            )[0]
+            self.computed_path = self._map_path(path, kept)
+            return
+
+        max_delta = delta
+        if self.auto_margin:
+            delta = self._estimate_delta(mfcc1, max_delta)
+        while True:
+            self._log("Computing path with delta = %d" % delta)
+            path, dtw = self._compute_path(
+                algorithm,
+                mfcc1,
                 self.wave_mfcc_2,
-                delta,
-                self.logger
+                delta
             )
+            if (delta >= max_delta) or (not dtw.touches_band_edge(path)):
+                break
+            # the path might have been clipped by the stripe: widen it
+            delta = min(2 * delta, max_delta)
+            self._log("Path touches the stripe boundary, widening to %d" % delta)
+        self.computed_delta = delta
+        self.computed_path = self._map_path(path, kept)
+
+    @classmethod
+    def _map_path(cls, path, kept):
+        """
+        Map the real wave indices of the given path,
+        computed on the kept frames only,
+        back to the frames of the whole real wave.
+
+        The removed frames between two kept frames
+        are added to the path, with the synthesized wave index
+        of the preceding point, so that the path stays connected.
+
+        :param path: the path, computed on the kept frames
+        :type  path: list of pairs of int
+        :param kept: the indices of the kept frames, or ``None``
+                     if all the frames were kept
+        :type  kept: numpy array
+        :rtype: list of pairs of int
+        """
+        if kept is None:
+            return path
+        result = []
+        previous = None
+        for (i, j) in path:
+            real_i = int(kept[i])
+            if (previous != None) and (real_i > previous[0] + 1):
+                for gap_i in range(previous[0] + 1, real_i):
+                    result.append((gap_i, previous[1]))
+            previous = (real_i, j)
+            result.append(previous)
+        return result
+
+    def _compute_path(self, algorithm, mfcc1, mfcc2, delta):
+        """
+        Compute the min cost path between the two given MFCC matrices,
+        with the given algorithm and stripe width.
+
+        Return a pair ``(path, dtw)``,
+        where ``dtw`` is the object used to compute ``path``.
+        """
+        dtw = None
+        if algorithm == DTWAlgorithm.STRIPE:
+            self._log("Computing with STRIPE algo")
+            dtw = DTWStripe(mfcc1, mfcc2, delta, self.logger)
         if algorithm == DTWAlgorithm.STRIPE_NOT_OPTIMIZED:
             self._log("Computing with STRIPE_NOT_OPTIMIZED algo")
-            dtw = DTWStripeNotOptimized(
-                self.wave_mfcc_1,
-                self.wave_mfcc_2,
-                delta,
-                self.logger
-            )
+            dtw = DTWStripeNotOptimized(mfcc1, mfcc2, delta, self.logger)
         if algorithm == DTWAlgorithm.EXACT:
             self._log("Computing with EXACT algo")
-            dtw = DTWExact(
-                self.wave_mfcc_1,
-                self.wave_mfcc_2,
-                self.logger
-            )
+            dtw = DTWExact(mfcc1, mfcc2, self.logger)
 
         # compute the map between the two waves
         self._log("Computing path...")
-        self.computed_path = dtw.compute_path()
+        path = dtw.compute_path()
         self._log("Computing path... done")
+        return (path, dtw)
+
+    def _estimate_delta(self, mfcc1, max_delta):
+        """
+        Estimate the (total) width of the stripe, in MFCC frames,
+        which contains the min cost path.
+
+        The MFCCs of both waves are downsampled by
+        :class:`aeneas.globalconstants.ALIGNER_AUTO_MARGIN_COARSE_FACTOR`,
+        a coarse min cost path is computed on them,
+        and its max deviation from the diagonal
+        is scaled back to the original frame rate.
+
+        The result is at least twice
+        :class:`aeneas.globalconstants.ALIGNER_AUTO_MARGIN_MIN`,
+        and at most ``max_delta``.
+
+        :param mfcc1: the MFCCs of the (portion of the) real wave to align
+        :type  mfcc1: numpy 2D array
+        :param max_delta: the maximum width of the stripe, in MFCC frames
+        :type  max_delta: int
+        :rtype: int
+        """
+        factor = gc.ALIGNER_AUTO_MARGIN_COARSE_FACTOR
+        n = mfcc1.shape[1]
+        m = self.wave_mfcc_2.shape[1]
+        self._log("n/m ratio: %f" % (float(n) / m))
+        coarse_1 = self._downsample(mfcc1, factor)
+        coarse_2 = self._downsample(self.wave_mfcc_2, factor)
+        coarse_n = coarse_1.shape[1]
+        coarse_m = coarse_2.shape[1]
+        coarse_delta = max(2, max_delta / factor)
+        algorithm = DTWAlgorithm.STRIPE
+        if coarse_m <= coarse_delta:
+            algorithm = DTWAlgorithm.EXACT
+        self._log("Computing coarse path (n m: %d %d)" % (coarse_n, coarse_m))
+        coarse_path = self._compute_path(
+            algorithm,
+            coarse_1,
+            coarse_2,
+            coarse_delta
+        )[0]
+        deviation = max([
+            abs(j - (coarse_m * i) / coarse_n) for (i, j) in coarse_path
+        ])
+        self._log("Coarse path max deviation: %d" % deviation)
+        # one more coarse frame for the rounding errors,
+        # and enough frames to keep consecutive rows connected
+        # when one wave is much longer than the other
+        half_delta = (deviation + 1) * factor
+        half_delta += 2 * (m / n + 1)
+        half_delta = max(half_delta, gc.ALIGNER_AUTO_MARGIN_MIN * self.frame_rate)
+        delta = min(2 * half_delta, max_delta)
+        self._log("Estimated delta: %d" % delta)
+        return delta
+
+    @classmethod
+    def _downsample(cls, mfcc, factor):
+        """
+        Average the columns (frames) of the given MFCC matrix
+        in consecutive blocks of ``factor`` columns.
+
+        :param mfcc: the MFCC matrix
+        :type  mfcc: numpy 2D array
+        :param factor: the downsampling factor
+        :type  factor: int
+        :rtype: numpy 2D array
+        """
+        starts = numpy.arange(0, mfcc.shape[1], factor)
+        counts = numpy.diff(numpy.append(starts, mfcc.shape[1]))
+        return numpy.add.reduceat(mfcc, starts, axis=1) / counts
 
     @property
     def computed_map(self):
@@ -254,13 +791,29 @@ class DTWStripe(object):
         self.m2 = m2
         self.delta = delta
         self.logger = logger
+        self.centers = None
 
     def _log(self, message, severity=Logger.DEBUG):
         self.logger.log(message, severity, self.TAG)
 
+    def touches_band_edge(self, path):
+        """
+        Return ``True`` if the given path (computed by this object)
+        touches the boundary of the stripe,
+        except where the boundary is the boundary of the whole matrix.
+        """
+        m = self.m2.shape[1]
+        delta = min(self.delta, m)
+        for (i, j) in path:
+            start = self.centers[i]
+            if ((j == start) and (start > 0)) or ((j == start + delta - 1) and (start + delta < m)):
+                return True
+        return False
+
     def compute_path(self):
         self._log("Computing cost matrix")
         cost_matrix, centers = self.compute_cost_matrix()
+        self.centers = centers
         self._log("Computing accumulated cost matrix")
         accumulated_cost_matrix = self.compute_accumulated_cost_matrix(cost_matrix, centers)
         self._log("Computing best path")
@@ -282,7 +835,7 @@ class DTWStripe(object):
             self._log("Limiting delta to m")
             delta = m
         cost_matrix = numpy.zeros((n, delta))
-        centers = numpy.zeros(n)
+        centers = numpy.zeros(n, dtype=int)
         for i in range(n):
             # center j at row i
             center_j = (m * i) / n
@@ -390,6 +943,22 @@ class DTWStripeNotOptimized(object):
     def _log(self, message, severity=Logger.DEBUG):
         self.logger.log(message, severity, self.TAG)
 
+    def touches_band_edge(self, path):
+        """
+        Return ``True`` if the given path (computed by this object)
+        touches the boundary of the stripe,
+        except where the boundary is the boundary of the whole matrix.
+        """
+        n = self.m1.shape[1]
+        m = self.m2.shape[1]
+        for (i, j) in path:
+            center_j = (m * i) / n
+            range_start = max(0, center_j - (self.delta / 2))
+            range_end = min(m, center_j + (self.delta / 2))
+            if ((j == range_start) and (range_start > 0)) or ((j == range_end - 1) and (range_end < m)):
+                return True
+        return False
+
     def compute_path(self):
         self._log("Computing cost matrix")
         cost_matrix = self.compute_cost_matrix()
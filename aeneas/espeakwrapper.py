@@ -29,7 +29,7 @@ class ESPEAKWrapper(object):
 
     It will perform a call like ::
 
-        $ espeak -v language_code -w /tmp/output_file.wav < text
+        $ espeak -v language_code [-s speed] -w /tmp/output_file.wav < text
 
     :param logger: the logger object
     :type  logger: :class:`aeneas.logger.Logger`
@@ -37,6 +37,15 @@ class ESPEAKWrapper(object):
 
     TAG = "ESPEAKWrapper"
 
+    DEFAULT_SPEED = 175
+    """ Default speed of ``espeak``, in words per minute """
+
+    MIN_SPEED = 80
+    """ Minimum speed accepted by ``espeak``, in words per minute """
+
+    MAX_SPEED = 450
+    """ Maximum speed accepted by ``espeak``, in words per minute """
+
     def __init__(self, logger=None):
         self.logger = logger
         if self.logger == None:
@@ -59,7 +68,7 @@ class ESPEAKWrapper(object):
             return Language.RU
         return language
 
-    def synthesize(self, text, language, output_file_path):
+    def synthesize(self, text, language, output_file_path, speed=None):
         """
         Create a ``wav`` audio file containing the synthesized text.
 
@@ -74,6 +83,11 @@ class ESPEAKWrapper(object):
         :type  language: string (from :class:`aeneas.language.Language` enumeration)
         :param output_file_path: the path of the output audio file
         :type  output_file_path: string
+        :param speed: the speed, in words per minute;
+                      if ``None``, use the ``espeak`` default speed.
+                      It will be clamped to
+                      [``MIN_SPEED``, ``MAX_SPEED``].
+        :type  speed: int
         :rtype: float
         """
         self._log("Synthesizing text: '%s'" % text)
@@ -92,6 +106,10 @@ class ESPEAKWrapper(object):
         arguments = []
         arguments += [gc.ESPEAK_PATH]
         arguments += ["-v", language]
+        if speed != None:
+            speed = min(max(int(speed), self.MIN_SPEED), self.MAX_SPEED)
+            self._log("Using speed: %d" % speed)
+            arguments += ["-s", str(speed)]
         arguments += ["-w", output_file_path]
         self._log("Calling with arguments '%s'" % " ".join(arguments))
         self._log("Calling with text '%s'" % text)
@@ -7,16 +7,24 @@ and generate the output container
 holding the generated sync maps.
 """
 
+import errno
+import heapq
+import multiprocessing
 import os
+import Queue
 import shutil
 import tempfile
+import threading
+import time
 
 import aeneas.globalconstants as gc
 import aeneas.globalfunctions as gf
-from aeneas.analyzecontainer import AnalyzeContainer
-from aeneas.container import Container, ContainerFormat
+from aeneas.checkpoint import CheckpointStore
+from aeneas.container import Container, ContainerFormat, ContainerWriter
+from aeneas.dtw import DTWAlgorithm
 from aeneas.executetask import ExecuteTask
 from aeneas.logger import Logger
+from aeneas.memorygovernor import MemoryGovernor
 from aeneas.validator import Validator
 
 __author__ = "Alberto Pettarin"
@@ -55,17 +63,135 @@ class ExecuteJob(object):
     :type  job: :class:`aeneas.job.Job`
     :param logger: the logger object
     :type  logger: :class:`aeneas.logger.Logger`
+    :param tts_backend: the TTS backend used to synthesize the text
+                        of each task; if ``None``, use the default one
+    :type  tts_backend: :class:`aeneas.ttsbackend.TTSBackend`
+    :param workers: the number of worker processes executing the tasks;
+                    if ``1``, execute them sequentially in this process.
+                    Default:
+                    :class:`aeneas.globalconstants.EXECUTE_JOB_WORKERS`
+    :type  workers: int
+    :param stop_on_failure: if ``True``, stop as soon as a task fails.
+                            Default:
+                            :class:`aeneas.globalconstants.EXECUTE_JOB_STOP_ON_FAILURE`
+    :type  stop_on_failure: bool
+    :param pipeline: if ``True``, execute the tasks
+                     as a staged pipeline in this process
+                     (see ``_execute_pipeline``),
+                     ignoring ``workers``.
+                     Default:
+                     :class:`aeneas.globalconstants.EXECUTE_JOB_PIPELINE`
+    :type  pipeline: bool
+    :param memory_budget: the memory budget, in bytes, for the tasks
+                          executed at the same time
+                          (see :class:`aeneas.memorygovernor.MemoryGovernor`);
+                          if ``None``, the memory is not limited.
+                          Default:
+                          :class:`aeneas.globalconstants.EXECUTE_JOB_MEMORY_BUDGET`
+    :type  memory_budget: int
+    :param governor: the memory governor shared with other jobs;
+                     if ``None``, create one for this job,
+                     with the given ``memory_budget``
+    :type  governor: :class:`aeneas.memorygovernor.MemoryGovernor`
+    :param checkpoint_directory: the directory where a checkpoint
+                                 of each completed task is stored
+                                 (see :class:`aeneas.checkpoint.CheckpointStore`),
+                                 so that an interrupted job can be resumed;
+                                 if ``None``, no checkpoint is stored.
+                                 Default:
+                                 :class:`aeneas.globalconstants.EXECUTE_JOB_CHECKPOINT_DIRECTORY`
+    :type  checkpoint_directory: string (path)
+    :param cache_directory: the directory of the persistent
+                            sync map cache used by each task
+                            (see :class:`aeneas.syncmapcache.SyncMapCache`);
+                            if ``None``, the cache is not used.
+                            Default:
+                            :class:`aeneas.globalconstants.EXECUTE_TASK_CACHE_DIRECTORY`
+    :type  cache_directory: string (path)
+    :param share_audio: if ``True``, decode each audio file
+                        shared by several tasks only once
+                        (see ``_share_audio``).
+                        Default:
+                        :class:`aeneas.globalconstants.EXECUTE_JOB_SHARE_AUDIO`
+    :type  share_audio: bool
+    :param share_synthesis: if ``True``, synthesize each text
+                            shared by several tasks only once
+                            (see ``_share_synthesis``).
+                            Default:
+                            :class:`aeneas.globalconstants.EXECUTE_JOB_SHARE_SYNTHESIS`
+    :type  share_synthesis: bool
+    :param task_timeout: the maximum time, in seconds, to wait
+                         for the result of a task executed
+                         by a worker process,
+                         from the moment the worker starts it;
+                         if ``None``, wait forever.
+                         Default:
+                         :class:`aeneas.globalconstants.EXECUTE_JOB_TASK_TIMEOUT`
+    :type  task_timeout: float
+    :param pool: the pool of worker processes shared with other jobs,
+                 used (and not terminated) instead of creating one
+                 for this job, if ``workers`` is greater than ``1``
+    :type  pool: :class:`multiprocessing.pool.Pool`
+    :param slots: the semaphore shared with other jobs,
+                  limiting the tasks executed at the same time:
+                  each task holds one slot while it is executed;
+                  if ``None``, the tasks are not limited
+    :type  slots: :class:`threading.Semaphore`
     """
 
     TAG = "ExecuteJob"
 
-    def __init__(self, job=None, logger=None):
+    POLL_INTERVAL = 0.1
+    """ Interval, in seconds, between two checks of the results
+    of the tasks executed by the worker processes """
+
+    def __init__(
+            self,
+            job=None,
+            logger=None,
+            tts_backend=None,
+            workers=gc.EXECUTE_JOB_WORKERS,
+            stop_on_failure=gc.EXECUTE_JOB_STOP_ON_FAILURE,
+            pipeline=gc.EXECUTE_JOB_PIPELINE,
+            memory_budget=gc.EXECUTE_JOB_MEMORY_BUDGET,
+            checkpoint_directory=gc.EXECUTE_JOB_CHECKPOINT_DIRECTORY,
+            cache_directory=gc.EXECUTE_TASK_CACHE_DIRECTORY,
+            share_audio=gc.EXECUTE_JOB_SHARE_AUDIO,
+            share_synthesis=gc.EXECUTE_JOB_SHARE_SYNTHESIS,
+            task_timeout=gc.EXECUTE_JOB_TASK_TIMEOUT,
+            governor=None,
+            pool=None,
+            slots=None
+        ):
         self.job = job
         self.working_directory = None
         self.tmp_directory = None
+        self.output_writer = None
+        self.output_tasks = set()
+        self.output_container_data = None
         self.logger = logger
         if self.logger == None:
             self.logger = Logger()
+        self.tts_backend = tts_backend
+        self.workers = workers
+        self.stop_on_failure = stop_on_failure
+        self.pipeline = pipeline
+        self.cache_directory = cache_directory
+        self.share_audio = share_audio
+        self.share_synthesis = share_synthesis
+        self.task_timeout = task_timeout
+        self.pool = pool
+        self.slots = slots
+        self.shared_features = dict()
+        self.shared_synthesis = dict()
+        self.shared_directory = None
+        self.shared_files = 0
+        self.governor = governor
+        if self.governor == None:
+            self.governor = MemoryGovernor(budget=memory_budget, logger=self.logger)
+        self.checkpoints = None
+        if checkpoint_directory != None:
+            self.checkpoints = CheckpointStore(checkpoint_directory, logger=self.logger)
 
     def _log(self, message, severity=Logger.DEBUG):
         """ Log """
@@ -85,7 +211,7 @@ class ExecuteJob(object):
         self.job = job
         return True
 
-    def load_job_from_container(self, container_path, config_string=None):
+    def load_job_from_container(self, container_path, config_string=None, container_data=None):
         """
         Validate the given container, and, if it is well formed,
         load the job from it.
@@ -95,6 +221,18 @@ class ExecuteJob(object):
         otherwise use the provided config string
         (i.e., the wizard case).
 
+        The job is the one created by the validator,
+        analyzing the container in place,
+        and only the text and audio files of its tasks
+        are decompressed into the working directory.
+
+        If ``container_data`` is not ``None``,
+        the container is held in memory,
+        and so are the text and audio files of its tasks,
+        which are read from it without creating a working directory
+        (see ``_load_task_entries``).
+        This is meant for small jobs, e.g. uploaded through the Web.
+
         Return ``True`` if the job has been loaded successfully,
         ``False`` otherwise.
 
@@ -102,6 +240,8 @@ class ExecuteJob(object):
         :type  container_path: string (path)
         :param config_string: the configuration string (from wizard)
         :type  config_string: string
+        :param container_data: the contents of the input container
+        :type  container_data: string
         :rtype: bool
         """
         self._log("Loading job from container...")
@@ -110,11 +250,15 @@ class ExecuteJob(object):
         self._log("Validating container...")
         validator = Validator(logger=self.logger)
         if config_string == None:
-            validator_result = validator.check_container(container_path)
+            validator_result = validator.check_container(
+                container_path,
+                container_data=container_data
+            )
         else:
             validator_result = validator.check_container_from_wizard(
                 container_path,
-                config_string
+                config_string,
+                container_data=container_data
             )
         if not validator_result.passed:
             self._log("Validating container: failed")
@@ -122,30 +266,31 @@ class ExecuteJob(object):
             return False
         self._log("Validating container: succeeded")
 
+        if container_data != None:
+            return self._load_task_entries(validator_result)
+
         try:
             # create working directory where the input container
             # will be decompressed
             self.working_directory = tempfile.mkdtemp(dir=gf.custom_tmp_dir())
             self._log("Created working directory '%s'" % self.working_directory)
 
-            # decompress
-            self._log("Decompressing input container...")
-            input_container = Container(container_path, logger=self.logger)
-            input_container.decompress(self.working_directory)
-            self._log("Decompressing input container... done")
+            # the job has been created by the validator,
+            # analyzing the input container in place
+            self.job = validator_result.job
 
-            # create job from the working directory
-            self._log("Creating job from working directory...")
-            working_container = Container(
-                self.working_directory,
-                logger=self.logger
-            )
-            analyzer = AnalyzeContainer(working_container, logger=self.logger)
-            if config_string == None:
-                self.job = analyzer.analyze()
-            else:
-                self.job = analyzer.analyze_from_wizard(config_string)
-            self._log("Creating job from working directory... done")
+            # decompress only the text and audio files of the tasks
+            self._log("Decompressing task entries of input container...")
+            entries = set()
+            for task in self.job.tasks:
+                entries.add(task.text_file_path)
+                entries.add(task.audio_file_path)
+            with validator_result.container as input_container:
+                input_container.decompress(
+                    self.working_directory,
+                    entries=sorted(entries)
+                )
+            self._log("Decompressing task entries of input container... done")
 
             # set absolute path for text file and audio file
             # for each task in the job
@@ -170,53 +315,77 @@ class ExecuteJob(object):
             self._log("Loading job from container: failed")
             return False
 
-    def write_output_container(self, output_directory_path):
+    def _load_task_entries(self, validator_result):
         """
-        Write the output container for this job.
+        Load the job analyzed by the validator
+        from a container held in memory,
+        reading the text and audio files of its tasks
+        into the tasks themselves.
 
-        Return a pair ``(bool, string)``, where the bool
-        indicates whether the execution succeeded,
-        and the string is the path to output container.
+        Each entry is read once, even if shared by several tasks.
+        The audio files are later passed to ``ffprobe`` and ``ffmpeg``
+        through their standard input.
+
+        :param validator_result: the result of the validation
+        :type  validator_result: :class:`aeneas.validator.ValidatorResult`
+        :rtype: bool
+        """
+        try:
+            self.job = validator_result.job
+            self._log("Reading task entries of input container in memory...")
+            contents = dict()
+            with validator_result.container as input_container:
+                for task in self.job.tasks:
+                    for entry in [task.text_file_path, task.audio_file_path]:
+                        if not entry in contents:
+                            contents[entry] = input_container.read_entry(entry)
+                        if contents[entry] == None:
+                            raise ValueError("Entry '%s' cannot be read" % entry)
+            for task in self.job.tasks:
+                task.text_file_data = contents[task.text_file_path]
+                task.audio_file_data = contents[task.audio_file_path]
+            self._log("Reading task entries of input container in memory... done")
+            self._log("Loading job from container: succeeded")
+            return True
+        except:
+            self.job = None
+            self._log("Loading job from container: failed")
+            return False
+
+    def open_output_container(self, output_directory_path):
+        """
+        Create the output container for this job
+        in the given directory, and keep it open,
+        so that the sync map of each task is written into it
+        as soon as the task is completed by ``execute``,
+        while the other tasks are still being executed.
+
+        The output container is completed
+        by ``write_output_container``.
+
+        If ``output_directory_path`` is ``None``,
+        the output container is written in memory
+        (this is not possible for unpacked output containers).
+
+        Return ``True`` if the output container has been created.
 
         :param output_directory_path: the path to a directory where
-                                      the output container must be created
+                                      the output container must be created,
+                                      or ``None``
         :type  output_directory_path: string (path)
-        :rtype: (bool, string)
+        :rtype: bool
         """
-        self._log("Writing output container for this job")
+        self._log("Opening output container for this job")
 
         # check if the job has tasks
         if self.job == None:
             self._log("job is None")
-            return (False, None)
+            return False
         if len(self.job) == 0:
             self._log("The job has no tasks")
-            return (False, None)
+            return False
 
         try:
-            # create temporary directory where the sync map files
-            # will be created
-            # this temporary directory will be compressed into
-            # the output container
-            self.tmp_directory = tempfile.mkdtemp(dir=gf.custom_tmp_dir())
-            self._log("Created temporary directory '%s'" % self.tmp_directory)
-
-            for task in self.job.tasks:
-                custom_id = task.configuration.custom_id
-
-                # check if the task has sync map and sync map file path
-                if task.sync_map_file_path == None:
-                    self._log("Task '%s' has sync_map_file_path not set" % custom_id)
-                    return (False, None)
-                if task.sync_map == None:
-                    self._log("Task '%s' has sync_map not set" % custom_id)
-                    return (False, None)
-
-                # output sync map
-                self._log("Outputting sync map for task '%s'..." % custom_id)
-                task.output_sync_map_file(self.tmp_directory)
-                self._log("Outputting sync map for task '%s'... done" % custom_id)
-
             # get output container info
             output_container_format = self.job.configuration.os_container_format
             self._log("Output container format: '%s'" % output_container_format)
@@ -226,30 +395,115 @@ class ExecuteJob(object):
                 self._log("Adding extension to output_file_name")
                 output_file_name += "." + output_container_format
             self._log("Output file name: '%s'" % output_file_name)
-            output_file_path = gf.norm_join(
-                output_directory_path,
-                output_file_name
-            )
+            output_file_path = None
+            if output_directory_path != None:
+                output_file_path = gf.norm_join(
+                    output_directory_path,
+                    output_file_name
+                )
             self._log("Output file path: '%s'" % output_file_path)
 
             # create output container
-            self._log("Compressing...")
-            container = Container(
+            self.output_writer = ContainerWriter(
                 output_file_path,
                 output_container_format,
                 logger=self.logger
             )
-            container.compress(self.tmp_directory)
-            self._log("Compressing... done")
-            self._log("Created output file: '%s'" % output_file_path)
+            self.output_tasks = set()
+            self.output_container_data = None
+            return True
+        except:
+            self._log("Opening output container: failed")
+            self.output_writer = None
+            return False
+
+    def write_output_container(self, output_directory_path):
+        """
+        Write the output container for this job.
+
+        The sync map of each task is serialized
+        directly into the output container.
+        If the output container has been opened by ``open_output_container``,
+        only the sync maps not written yet are added,
+        and ``output_directory_path`` is ignored.
+
+        Return a pair ``(bool, string)``, where the bool
+        indicates whether the execution succeeded,
+        and the string is the path to output container.
+        If the output container has been written in memory,
+        the path is ``None``, and the contents of the container
+        are stored in ``output_container_data``.
+
+        :param output_directory_path: the path to a directory where
+                                      the output container must be created
+        :type  output_directory_path: string (path)
+        :rtype: (bool, string)
+        """
+        self._log("Writing output container for this job")
+
+        if self.output_writer == None:
+            if not self.open_output_container(output_directory_path):
+                return (False, None)
 
-            # clean and return
-            self.clean(False)
+        try:
+            for task in self.job.tasks:
+                if task.identifier in self.output_tasks:
+                    continue
+                if not self._output_task(task):
+                    self._abort_output_container()
+                    return (False, None)
+
+            # close output container and return
+            output_file_path = self.output_writer.file_path
+            self.output_writer.close()
+            self.output_container_data = self.output_writer.data
+            self.output_writer = None
+            self._log("Created output file: '%s'" % output_file_path)
             return (True, output_file_path)
         except:
-            self.clean(False)
+            self._abort_output_container()
             return (False, None)
 
+    def _output_task(self, task):
+        """
+        Write the sync map of the given task
+        into the open output container.
+
+        Return ``True`` if the sync map has been written.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: bool
+        """
+        custom_id = task.configuration.custom_id
+
+        # check if the task has sync map and sync map file path
+        if task.sync_map_file_path == None:
+            self._log("Task '%s' has sync_map_file_path not set" % custom_id)
+            return False
+        if task.sync_map == None:
+            self._log("Task '%s' has sync_map not set" % custom_id)
+            return False
+
+        # output sync map
+        self._log("Outputting sync map for task '%s'..." % custom_id)
+        contents = task.output_sync_map_string()
+        if contents == None:
+            self._log("Outputting sync map for task '%s'... failed" % custom_id)
+            return False
+        self.output_writer.add_entry(task.sync_map_file_path, contents)
+        self.output_tasks.add(task.identifier)
+        self._log("Outputting sync map for task '%s'... done" % custom_id)
+        return True
+
+    def _abort_output_container(self):
+        """
+        Remove the partially written output container, if any.
+        """
+        if self.output_writer != None:
+            self.output_writer.abort()
+            self.output_writer = None
+
     def execute(self):
         """
         Execute the job, that is, execute all of its tasks.
@@ -257,6 +511,11 @@ class ExecuteJob(object):
         Each produced sync map will be stored
         inside the corresponding task object.
 
+        If checkpoints are enabled, the tasks
+        completed by a previous (interrupted) run
+        are not executed again: their sync maps
+        are loaded from their checkpoints.
+
         Return ``True`` if the execution succeeded,
         ``False`` otherwise.
 
@@ -273,21 +532,886 @@ class ExecuteJob(object):
             return False
         self._log("Number of tasks: '%s'" % len(self.job))
 
+        # skip the tasks completed by a previous run
+        tasks = self._resume_tasks()
+
+        # decode the audio files and synthesize the texts
+        # shared by several tasks once,
+        # but only for the tasks not found in the cache
+        if self.share_audio or self.share_synthesis:
+            tasks = self._lookup_cache(tasks)
+        self.shared_features = dict()
+        if self.share_audio:
+            self.shared_features = self._share_audio(tasks)
+        self.shared_synthesis = dict()
+        if self.share_synthesis:
+            self.shared_synthesis = self._share_synthesis(tasks)
+
         # execute tasks
+        if len(tasks) == 0:
+            result = True
+        elif self.pipeline:
+            result = self._execute_pipeline(tasks)
+        elif self.workers > 1:
+            result = self._execute_parallel(tasks)
+        else:
+            result = self._execute_sequential(tasks)
+        self.shared_features = dict()
+        self.shared_synthesis = dict()
+        self._clean(self.shared_directory)
+        self.shared_directory = None
+        if not result:
+            self._log("Executing job: failed")
+            return False
+
+        # return
+        self._log("Executing job: succeeded")
+        return True
+
+    def _resume_tasks(self):
+        """
+        Load the sync maps of the tasks having a valid checkpoint,
+        remove the stale checkpoints,
+        and return the list of the tasks still to be executed.
+
+        If checkpoints are disabled, return all the tasks of the job.
+
+        :rtype: list of :class:`aeneas.task.Task`
+        """
+        if self.checkpoints == None:
+            return self.job.tasks
+        tasks = []
         for task in self.job.tasks:
+            sync_map = self.checkpoints.load(task)
+            if sync_map != None:
+                self._log("Task '%s': resumed from checkpoint" % task.configuration.custom_id)
+                task.sync_map = sync_map
+            else:
+                tasks.append(task)
+        self.checkpoints.clean(self.job.tasks)
+        self._log("Resumed %d tasks, %d to be executed" % (
+            len(self.job) - len(tasks),
+            len(tasks)
+        ), Logger.INFO)
+        return tasks
+
+    def _lookup_cache(self, tasks):
+        """
+        Load the sync maps of the tasks found
+        in the sync map cache, if it is used,
+        and return the list of the tasks still to be executed.
+
+        :param tasks: the tasks to be executed
+        :type  tasks: list of :class:`aeneas.task.Task`
+        :rtype: list of :class:`aeneas.task.Task`
+        """
+        if self.cache_directory == None:
+            return tasks
+        remaining = []
+        for task in tasks:
+            executor = ExecuteTask(
+                task,
+                logger=self.logger,
+                tts_backend=self.tts_backend,
+                cache_directory=self.cache_directory
+            )
+            if executor.execute_cached():
+                self._log("Task '%s': found in the cache" % task.configuration.custom_id)
+                self._complete_task(task)
+            else:
+                remaining.append(task)
+        self._log("Found %d tasks in the cache, %d to be executed" % (
+            len(tasks) - len(remaining),
+            len(remaining)
+        ), Logger.INFO)
+        return remaining
+
+    def _share_audio(self, tasks):
+        """
+        Group the given tasks by audio file, and,
+        for each audio file shared by two or more tasks,
+        decode it and compute its features once.
+
+        Return a dictionary mapping the identifier of each
+        of those tasks to the slice of the features
+        corresponding to its head/process window
+        (see :class:`aeneas.dtw.WaveFeatures`).
+        The other tasks will convert their audio file as usual.
+
+        :param tasks: the tasks to be executed
+        :type  tasks: list of :class:`aeneas.task.Task`
+        :rtype: dict
+        """
+        groups = dict()
+        paths = []
+        for task in tasks:
+            path = task.audio_file_path_absolute
+            if path == None:
+                continue
+            path = os.path.realpath(path)
+            if not path in groups:
+                groups[path] = []
+                paths.append(path)
+            groups[path].append(task)
+        features = dict()
+        for path in paths:
+            group = groups[path]
+            if len(group) < 2:
+                continue
+            self._log("Audio file '%s' is shared by %d tasks" % (path, len(group)))
+            whole = self._decode_audio(path)
+            if whole == None:
+                continue
+            self._share_with_workers(whole)
+            for task in group:
+                features[task.identifier] = whole.slice(
+                    gf.safe_float(task.configuration.is_audio_file_head_length, None),
+                    gf.safe_float(task.configuration.is_audio_file_process_length, None)
+                )
+        return features
+
+    def _share_synthesis(self, tasks):
+        """
+        Group the given tasks by text, that is,
+        by their list of text fragments (identifier, language, text),
+        and, for each text shared by two or more tasks,
+        synthesize it and compute its features once.
+
+        Return a dictionary mapping the identifier of each
+        of those tasks to the pair ``(features, anchors)``
+        of the synthesized text
+        (see :class:`aeneas.dtw.WaveFeatures`).
+        The other tasks will synthesize their text as usual.
+
+        :param tasks: the tasks to be executed
+        :type  tasks: list of :class:`aeneas.task.Task`
+        :rtype: dict
+        """
+        if gc.SYNTHESIZER_MATCH_SPEECH_RATE:
+            self._log("Matching the speech rate, not sharing the synthesis")
+            return dict()
+        groups = dict()
+        keys = []
+        for task in tasks:
+            if (task.text_file == None) or (len(task.text_file) == 0):
+                continue
+            key = ExecuteTask.synthesis_key(task.text_file)
+            if not key in groups:
+                groups[key] = []
+                keys.append(key)
+            groups[key].append(task)
+        synthesis = dict()
+        for key in keys:
+            group = groups[key]
+            if len(group) < 2:
+                continue
+            self._log("Text of task '%s' is shared by %d tasks" % (
+                group[0].configuration.custom_id,
+                len(group)
+            ))
+            result = ExecuteTask.precompute_synthesis(
+                group[0].text_file,
+                tts_backend=self.tts_backend,
+                logger=self.logger
+            )
+            if result == None:
+                continue
+            self._share_with_workers(result[0])
+            for task in group:
+                synthesis[task.identifier] = result
+        return synthesis
+
+    def _shared_parameters(self, task):
+        """
+        Return the dictionary of the shared features
+        of the given task, to be passed to
+        :class:`aeneas.executetask.ExecuteTask`.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: dict
+        """
+        parameters = dict()
+        if task.identifier in self.shared_features:
+            parameters["real_features"] = self.shared_features[task.identifier]
+        if task.identifier in self.shared_synthesis:
+            features, anchors = self.shared_synthesis[task.identifier]
+            parameters["synt_features"] = features
+            parameters["synt_anchors"] = anchors
+        return parameters
+
+    def _share_with_workers(self, features):
+        """
+        If the tasks will be executed by worker processes,
+        store the given features in the shared directory
+        of this job, so that the workers memory-map them
+        instead of receiving a copy.
+
+        :param features: the features
+        :type  features: :class:`aeneas.dtw.WaveFeatures`
+        """
+        if self.pipeline or (self.workers <= 1):
+            return
+        if self.shared_directory == None:
+            self.shared_directory = tempfile.mkdtemp(dir=gf.custom_tmp_dir())
+        path = os.path.join(self.shared_directory, "%06d" % self.shared_files)
+        self.shared_files += 1
+        try:
+            features.share(path)
+            self._log("Shared features in '%s'" % path)
+        except:
+            self._log("Cannot share features in '%s'" % path, Logger.WARNING)
+
+    def _decode_audio(self, path):
+        """
+        Convert the given audio file into a temporary ``wav`` file,
+        and return its features,
+        or ``None`` if an error occurred.
+
+        :param path: the path of the audio file
+        :type  path: string (path)
+        :rtype: :class:`aeneas.dtw.WaveFeatures`
+        """
+        return ExecuteTask.precompute_audio(path, logger=self.logger)
+
+    def _complete_task(self, task):
+        """
+        Store the checkpoint of the given (completed) task,
+        if checkpoints are enabled,
+        and write its sync map into the output container,
+        if it has been opened by ``open_output_container``.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        """
+        if self.checkpoints != None:
+            self.checkpoints.save(task)
+        if self.output_writer != None:
+            try:
+                # if it fails, write_output_container will try again
+                self._output_task(task)
+            except:
+                self._log("Cannot write the sync map of the task into the output container", Logger.WARNING)
+
+    def _execute_sequential(self, tasks):
+        """
+        Execute the given tasks one by one, in this process.
+
+        Return ``True`` if all the tasks succeeded.
+
+        :param tasks: the tasks to be executed
+        :type  tasks: list of :class:`aeneas.task.Task`
+        :rtype: bool
+        """
+        success = True
+        for task in tasks:
             custom_id = task.configuration.custom_id
             self._log("Executing task '%s'..." % custom_id)
-            executor = ExecuteTask(task, logger=self.logger)
-            result = executor.execute()
+            algorithm, margin, memory = self._plan_task(task)
+            executor = ExecuteTask(
+                task,
+                logger=self.logger,
+                tts_backend=self.tts_backend,
+                algorithm=algorithm,
+                margin=margin,
+                cache_directory=self.cache_directory,
+                **self._shared_parameters(task)
+            )
+            self._acquire_slot()
+            try:
+                result = executor.execute()
+            finally:
+                self._release_slot()
             self._log("Executing task '%s'... done" % custom_id)
             if not result:
                 self._log("Executing task: failed")
+                success = False
+                if self.stop_on_failure:
+                    return False
+            else:
+                self._log("Executing task: succeeded")
+                self._complete_task(task)
+        return success
+
+    def _execute_parallel(self, tasks):
+        """
+        Execute the given tasks in a pool of worker processes.
+
+        The tasks are dispatched longest first
+        (see ``estimate_task_cost``),
+        each one as soon as the memory governor admits it,
+        and the predicted and the actual makespan
+        (i.e., the wall time of the whole execution)
+        are logged.
+
+        Each worker executes a copy of the task it receives,
+        and it sends back the computed sync map,
+        which is stored in the original task,
+        and its log entries,
+        which are added to the log of this job.
+
+        If a pool has been given in the constructor,
+        its workers are shared with other jobs,
+        each dispatched task holds one of the given slots,
+        and the pool is not terminated when the tasks are over
+        (the tasks already dispatched are waited for instead);
+        otherwise, a pool is created for this job.
+
+        At most one task per worker is dispatched at a time,
+        and a task whose result does not arrive within
+        ``task_timeout`` seconds from the moment
+        a worker starts executing it
+        (e.g., because its worker process has been killed),
+        or whose arguments or result cannot be pickled,
+        is considered failed.
+        A task not started yet counts from its dispatch instead,
+        unless the pool is shared and no slots have been given,
+        since then it might be waiting for a worker.
+
+        A failed task whose worker is still running
+        keeps its memory and its slot booked
+        until the worker returns (or dies).
+        If the pool has been created for this job,
+        and no other task is running,
+        the pool is recycled instead,
+        terminating the workers still running.
+        If the pool is shared, the bookings still held
+        when the tasks are over are released
+        by a background thread, as soon as their workers return.
+
+        Return ``True`` if all the tasks succeeded.
+
+        :param tasks: the tasks to be executed
+        :type  tasks: list of :class:`aeneas.task.Task`
+        :rtype: bool
+        """
+        workers = min(self.workers, len(tasks))
+        self._log("Executing tasks with %d workers" % workers)
+        costs = [self.estimate_task_cost(task) for task in tasks]
+        order = self.longest_first(costs)
+        predicted = self.predict_makespan([costs[index] for index in order], workers)
+        plans = [self._plan_task(task) for task in tasks]
+        # the dispatched tasks, and the timed out tasks
+        # whose worker might still be running
+        pending = []
+        stalled = []
+        success = [True]
+        start = time.time()
+        pool = [self.pool]
+        if self.pool == None:
+            pool[0] = multiprocessing.Pool(processes=workers)
+        # each worker writes its pid in a marker file
+        # when it starts executing a task
+        markers = tempfile.mkdtemp(dir=gf.custom_tmp_dir())
+
+        def busy():
+            return len(pending) + len(stalled)
+
+        def release(item):
+            self.governor.release(plans[item["index"]][2])
+            self._release_slot()
+
+        def dispatch(item):
+            try:
+                os.remove(item["marker"])
+            except OSError:
+                pass
+            item["pid"] = None
+            item["started"] = None
+            item["dispatched"] = time.time()
+            item["handle"] = pool[0].apply_async(_execute_task_worker, (item["arguments"],))
+
+        def expired(item, now):
+            if self.task_timeout == None:
                 return False
-            self._log("Executing task: succeeded")
+            begin = item["started"]
+            if begin == None:
+                if (self.pool != None) and (self.slots == None):
+                    return False
+                begin = item["dispatched"]
+            return now >= begin + self.task_timeout
 
-        # return
-        self._log("Executing job: succeeded")
-        return True
+        def recycle():
+            self._log("Recycling the workers", Logger.WARNING)
+            pool[0].terminate()
+            pool[0].join()
+            for item in stalled:
+                release(item)
+            del stalled[:]
+            pool[0] = multiprocessing.Pool(processes=workers)
+            for item in pending:
+                dispatch(item)
+
+        def poll():
+            # process a result, an expired deadline, or a stalled worker returning,
+            # and return True, or wait a bit, and return False
+            now = time.time()
+            for item in stalled:
+                self._read_task_marker(item)
+                if self._task_worker_returned(item):
+                    stalled.remove(item)
+                    release(item)
+                    return True
+            for item in pending:
+                self._read_task_marker(item)
+                if item["handle"].ready():
+                    pending.remove(item)
+                    release(item)
+                    process(item)
+                    return True
+                if expired(item, now):
+                    pending.remove(item)
+                    stalled.append(item)
+                    process(item)
+                    return True
+            if (
+                    (self.pool == None) and
+                    (len(stalled) > 0) and
+                    (len([item for item in pending if item["started"] != None]) == 0)
+                ):
+                recycle()
+                return True
+            (pending + stalled)[0]["handle"].wait(self.POLL_INTERVAL)
+            return False
+
+        def collect():
+            while not poll():
+                pass
+
+        def waiting(memory):
+            # wait for a running task before dispatching the next one
+            if (not success[0]) and self.stop_on_failure:
+                return len(pending) > 0
+            return (busy() > 0) and (
+                (busy() >= workers) or
+                (not self.governor.admits(memory))
+            )
+
+        def process(item):
+            index = item["index"]
+            task = tasks[index]
+            custom_id = task.configuration.custom_id
+            result = False
+            try:
+                index, result, sync_map, entries, elapsed = item["handle"].get(0)
+                self.logger.add_entries(entries)
+                self._log("Executing task '%s'... done" % custom_id)
+                self._log("Task '%s': predicted %.3f s, actual %.3f s" % (
+                    custom_id,
+                    costs[index],
+                    elapsed
+                ))
+            except multiprocessing.TimeoutError:
+                self._log("Task '%s': no result after %.3f s" % (custom_id, self.task_timeout), Logger.WARNING)
+            except Exception as exc:
+                self._log("Task '%s': error in the worker: %s" % (custom_id, exc), Logger.WARNING)
+            if not result:
+                self._log("Executing task: failed")
+                success[0] = False
+            else:
+                task.sync_map = sync_map
+                self._log("Executing task: succeeded")
+                self._complete_task(task)
+
+        try:
+            for index in order:
+                algorithm, margin, memory = plans[index]
+                # dispatch only when a worker is idle
+                # and the memory budget admits the task
+                while waiting(memory):
+                    collect()
+                if (not success[0]) and self.stop_on_failure:
+                    break
+                # hold a slot, processing results while waiting for it
+                acquired = False
+                while (not acquired) and (busy() > 0):
+                    acquired = self._acquire_slot(False)
+                    if not acquired:
+                        poll()
+                if not acquired:
+                    self._acquire_slot()
+                self.governor.acquire(memory)
+                marker = os.path.join(markers, "%06d" % index)
+                item = {
+                    "index": index,
+                    "marker": marker,
+                    "arguments": (
+                        index,
+                        tasks[index],
+                        self.tts_backend,
+                        algorithm,
+                        margin,
+                        self.cache_directory,
+                        self._shared_parameters(tasks[index]),
+                        marker
+                    )
+                }
+                dispatch(item)
+                pending.append(item)
+            while len(pending) > 0:
+                if (not success[0]) and self.stop_on_failure and (self.pool == None):
+                    self._log("Terminating the workers")
+                    break
+                collect()
+        except:
+            self._log("Executing tasks with workers: failed", Logger.WARNING)
+            success[0] = False
+        finally:
+            if self.pool == None:
+                pool[0].terminate()
+                pool[0].join()
+                for item in pending + stalled:
+                    release(item)
+                self._clean(markers)
+            elif busy() > 0:
+                # keep the bookings of the workers still running
+                # (not the ones of other jobs) until they return
+                thread = threading.Thread(
+                    target=self._release_returned_tasks,
+                    args=(pending + stalled, release, markers)
+                )
+                thread.daemon = True
+                thread.start()
+            else:
+                self._clean(markers)
+        self._log("Makespan: predicted %.3f s, actual %.3f s" % (
+            predicted,
+            time.time() - start
+        ), Logger.INFO)
+        return success[0]
+
+    def _release_returned_tasks(self, items, release, markers):
+        """
+        Wait until the worker of each of the given dispatched tasks
+        returns (or dies), and release the bookings of the task,
+        then remove the directory of the marker files.
+
+        :param items: the dispatched tasks
+        :type  items: list of dict
+        :param release: the function releasing the bookings of a task
+        :type  release: function
+        :param markers: the path of the directory of the marker files
+        :type  markers: string (path)
+        """
+        items = list(items)
+        while len(items) > 0:
+            for item in list(items):
+                self._read_task_marker(item)
+                if self._task_worker_returned(item):
+                    items.remove(item)
+                    release(item)
+            if len(items) > 0:
+                items[0]["handle"].wait(self.POLL_INTERVAL)
+        self._clean(markers)
+
+    @classmethod
+    def _read_task_marker(cls, item):
+        """
+        If the worker of the given dispatched task
+        has started executing it, store its pid
+        and the time it has been noticed, if not done yet.
+
+        :param item: the dispatched task
+        :type  item: dict
+        """
+        if item["pid"] != None:
+            return
+        try:
+            with open(item["marker"], "r") as marker_file:
+                item["pid"] = int(marker_file.read())
+            item["started"] = time.time()
+        except (IOError, ValueError):
+            pass
+
+    @classmethod
+    def _task_worker_returned(cls, item):
+        """
+        Return ``True`` if the worker of the given dispatched task
+        has returned, or if it has died.
+
+        :param item: the dispatched task
+        :type  item: dict
+        :rtype: bool
+        """
+        if item["handle"].ready():
+            return True
+        if item["pid"] == None:
+            return False
+        try:
+            os.kill(item["pid"], 0)
+        except OSError as exc:
+            # EPERM means that the process exists
+            return exc.errno != errno.EPERM
+        return False
+
+    def _acquire_slot(self, blocking=True):
+        """
+        Acquire one of the slots given in the constructor, if any.
+
+        Return ``True`` if the slot has been acquired,
+        or if there are no slots.
+
+        :param blocking: if ``False``, do not wait for a free slot
+        :type  blocking: bool
+        :rtype: bool
+        """
+        if self.slots == None:
+            return True
+        return self.slots.acquire(blocking)
+
+    def _release_slot(self):
+        """
+        Release one of the slots given in the constructor, if any.
+        """
+        if self.slots != None:
+            self.slots.release()
+
+    def _plan_task(self, task):
+        """
+        Plan the alignment of the given task
+        with the memory governor of this job.
+
+        Return a triple ``(algorithm, margin, memory)``,
+        where ``algorithm`` and ``margin`` are ``None``
+        if the default ones can be used.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: tuple
+        """
+        # only the head/process window of the audio file is aligned
+        audio_length = ExecuteTask.processed_audio_length(task)
+        algorithm, margin, memory = self.governor.plan(audio_length)
+        self._log("Task '%s': predicted peak memory %d bytes" % (
+            task.configuration.custom_id,
+            memory
+        ))
+        if (algorithm == DTWAlgorithm.STRIPE) and (margin == gc.ALIGNER_MARGIN):
+            return (None, None, memory)
+        return (algorithm, margin, memory)
+
+    def _execute_pipeline(self, tasks):
+        """
+        Execute the given tasks as a staged pipeline:
+
+        1. decode: convert the audio file (external process, I/O bound);
+        2. synthesize: synthesize the text (external process, I/O bound);
+        3. align: compute MFCCs, DTW and sync map (CPU bound).
+
+        Each stage is run by its own threads
+        (see :class:`aeneas.globalconstants.EXECUTE_JOB_PIPELINE_DECODE_WORKERS`,
+        :class:`aeneas.globalconstants.EXECUTE_JOB_PIPELINE_SYNTHESIZE_WORKERS`,
+        and :class:`aeneas.globalconstants.EXECUTE_JOB_PIPELINE_ALIGN_WORKERS`),
+        and the stages are connected by bounded queues
+        (see :class:`aeneas.globalconstants.EXECUTE_JOB_PIPELINE_QUEUE_SIZE`),
+        so that a task is decoded and synthesized
+        while the previous one is being aligned.
+
+        Each task logs to its own logger, whose entries are
+        added to the log of this job when the task ends.
+
+        A task raising an unexpected error in any stage is failed,
+        without stopping the threads of that stage.
+        When the tasks are over, the last thread of each stage
+        to stop passes the end of the stream to the next stage.
+
+        The memory governor (and the slots, if any)
+        limit the alignments executed at the same time.
+
+        Return ``True`` if all the tasks succeeded.
+
+        :param tasks: the tasks to be executed
+        :type  tasks: list of :class:`aeneas.task.Task`
+        :rtype: bool
+        """
+        memories = dict()
+
+        def align(executor):
+            # the memory governor limits the concurrent alignments
+            memory = memories[executor.task.identifier]
+            self._acquire_slot()
+            self.governor.acquire(memory)
+            try:
+                return executor.execute_align()
+            finally:
+                self.governor.release(memory)
+                self._release_slot()
+
+        stages = [
+            ("decode", gc.EXECUTE_JOB_PIPELINE_DECODE_WORKERS, lambda executor: executor.execute_convert()),
+            ("synthesize", gc.EXECUTE_JOB_PIPELINE_SYNTHESIZE_WORKERS, lambda executor: executor.execute_synthesize()),
+            ("align", gc.EXECUTE_JOB_PIPELINE_ALIGN_WORKERS, align),
+        ]
+        self._log("Executing tasks with a staged pipeline")
+        queues = [Queue.Queue(gc.EXECUTE_JOB_PIPELINE_QUEUE_SIZE) for stage in stages]
+        queues.append(None)
+        lock = threading.Lock()
+        failed = threading.Event()
+
+        def finish(executor, result):
+            # called once per task, at the end of its last executed stage
+            with lock:
+                custom_id = executor.task.configuration.custom_id
+                try:
+                    self.logger.add_entries(executor.logger.entries)
+                    self._log("Executing task '%s'... done" % custom_id)
+                    if result:
+                        self._complete_task(executor.task)
+                except Exception as exc:
+                    self._log("Task '%s': unexpected error: %s" % (custom_id, exc), Logger.WARNING)
+                    result = False
+                if result:
+                    self._log("Executing task: succeeded")
+                else:
+                    self._log("Executing task: failed")
+                    failed.set()
+
+        def fail(executor, exc):
+            # a stage raised an unexpected error
+            self._log("Task '%s': unexpected error: %s" % (
+                executor.task.configuration.custom_id,
+                exc
+            ), Logger.WARNING)
+            try:
+                executor.cleanup()
+            except:
+                pass
+            finish(executor, False)
+
+        def run_stage(index, function):
+            try:
+                while True:
+                    executor = queues[index].get()
+                    if executor == None:
+                        return
+                    try:
+                        if failed.is_set() and self.stop_on_failure:
+                            # skip the remaining stages
+                            executor.cleanup()
+                            finish(executor, False)
+                        elif not function(executor):
+                            finish(executor, False)
+                        elif queues[index + 1] == None:
+                            finish(executor, True)
+                        else:
+                            queues[index + 1].put(executor)
+                    except Exception as exc:
+                        fail(executor, exc)
+            finally:
+                # the last thread of this stage to stop
+                # passes the end of the stream to the next stage
+                with lock:
+                    running[index] -= 1
+                    last = (running[index] == 0)
+                if last and (queues[index + 1] != None):
+                    for i in range(running[index + 1]):
+                        queues[index + 1].put(None)
+
+        threads = []
+        running = []
+        for index, (name, workers, function) in enumerate(stages):
+            self._log("Starting %d threads for stage '%s'" % (workers, name))
+            running.append(max(1, workers))
+            for i in range(running[index]):
+                thread = threading.Thread(target=run_stage, args=(index, function))
+                thread.daemon = True
+                threads.append(thread)
+        for thread in threads:
+            thread.start()
+
+        # feed the first stage, then end its stream
+        try:
+            for task in tasks:
+                if failed.is_set() and self.stop_on_failure:
+                    self._log("A task failed, not starting the remaining ones")
+                    break
+                algorithm, margin, memories[task.identifier] = self._plan_task(task)
+                executor = ExecuteTask(
+                    task,
+                    logger=Logger(),
+                    tts_backend=self.tts_backend,
+                    algorithm=algorithm,
+                    margin=margin,
+                    cache_directory=self.cache_directory,
+                    **self._shared_parameters(task)
+                )
+                self._log("Executing task '%s'..." % task.configuration.custom_id)
+                try:
+                    if not executor.check_input():
+                        finish(executor, False)
+                    elif executor.execute_cached():
+                        finish(executor, True)
+                    else:
+                        queues[0].put(executor)
+                except Exception as exc:
+                    fail(executor, exc)
+        finally:
+            for i in range(running[0]):
+                queues[0].put(None)
+            for thread in threads:
+                thread.join()
+        return not failed.is_set()
+
+    def estimate_task_cost(self, task):
+        """
+        Estimate the processing time, in seconds, of the given task,
+        from the length of the aligned portion of its audio file
+        (see :func:`aeneas.executetask.ExecuteTask.processed_audio_length`)
+        and the number of its text fragments, as known after the analysis.
+
+        The estimate is
+        ``audio_length * EXECUTE_JOB_COST_AUDIO_SECOND
+        + fragments * EXECUTE_JOB_COST_FRAGMENT``
+        (see :class:`aeneas.globalconstants.EXECUTE_JOB_COST_AUDIO_SECOND`
+        and :class:`aeneas.globalconstants.EXECUTE_JOB_COST_FRAGMENT`),
+        where an unknown quantity counts as zero.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: float
+        """
+        audio_length = ExecuteTask.processed_audio_length(task)
+        if audio_length == None:
+            audio_length = 0.0
+        fragments = 0
+        if task.text_file != None:
+            fragments = len(task.text_file)
+        return (
+            audio_length * gc.EXECUTE_JOB_COST_AUDIO_SECOND +
+            fragments * gc.EXECUTE_JOB_COST_FRAGMENT
+        )
+
+    @classmethod
+    def longest_first(cls, costs):
+        """
+        Return the indices of the given costs,
+        sorted by decreasing cost
+        (ties are broken by the original order).
+
+        :param costs: the estimated cost of each task
+        :type  costs: list of floats
+        :rtype: list of int
+        """
+        return sorted(range(len(costs)), key=lambda index: (-costs[index], index))
+
+    @classmethod
+    def predict_makespan(cls, costs, workers):
+        """
+        Predict the makespan of executing tasks
+        with the given costs, in the given order,
+        with the given number of workers,
+        each task being assigned to the first worker that becomes idle.
+
+        :param costs: the estimated cost of each task, in dispatch order
+        :type  costs: list of floats
+        :param workers: the number of workers
+        :type  workers: int
+        :rtype: float
+        """
+        finish_times = [0.0] * max(1, workers)
+        for cost in costs:
+            heapq.heappush(finish_times, heapq.heappop(finish_times) + cost)
+        return max(finish_times)
 
     def clean(self, remove_working_directory=True):
         """
@@ -296,10 +1420,15 @@ class ExecuteJob(object):
         remove the working directory as well,
         otherwise just remove the temporary directory.
 
+        If the output container has been opened
+        by ``open_output_container``, but not completed
+        by ``write_output_container``, remove it.
+
         :param remove_working_directory: if ``True``, remove
                                          the working directory as well
         :type  remove_working_directory: bool
         """
+        self._abort_output_container()
         if remove_working_directory:
             self._log("Removing working directory... ")
             self._clean(self.working_directory)
@@ -327,3 +1456,49 @@ class ExecuteJob(object):
 
 
 
+def _execute_task_worker(arguments):
+    """
+    Execute a task in a worker process.
+
+    It is a module-level function, as it must be pickled
+    to be sent to the worker processes.
+
+    Before executing the task, it writes its pid
+    in the marker file, atomically,
+    so that the job knows when the task started.
+
+    :param arguments: a tuple ``(index, task, tts_backend, algorithm, margin, cache_directory, shared, marker)``,
+                      where ``shared`` is a dictionary
+                      of the shared features of the task,
+                      and ``marker`` is the path of the marker file
+    :type  arguments: tuple
+    :rtype: tuple ``(index, success, sync_map, log_entries, elapsed)``
+    """
+    index, task, tts_backend, algorithm, margin, cache_directory, shared, marker = arguments
+    try:
+        with open(marker + ".tmp", "w") as marker_file:
+            marker_file.write("%d" % os.getpid())
+        os.rename(marker + ".tmp", marker)
+    except (IOError, OSError):
+        pass
+    logger = Logger()
+    result = False
+    start = time.time()
+    try:
+        logger.log("Executing task '%s'..." % task.configuration.custom_id, Logger.DEBUG, ExecuteJob.TAG)
+        executor = ExecuteTask(
+            task,
+            logger=logger,
+            tts_backend=tts_backend,
+            algorithm=algorithm,
+            margin=margin,
+            cache_directory=cache_directory,
+            **shared
+        )
+        result = executor.execute()
+    except:
+        logger.log("Unexpected error while executing the task", Logger.WARNING, ExecuteJob.TAG)
+    return (index, result, task.sync_map, logger.entries, time.time() - start)
+
+
+
@@ -11,12 +11,14 @@ import tempfile
 
 import aeneas.globalconstants as gc
 import aeneas.globalfunctions as gf
-from aeneas.dtw import DTWAligner
+from aeneas.dtw import DTWAligner, DTWAlgorithm, WaveFeatures
 from aeneas.ffmpegwrapper import FFMPEGWrapper
 from aeneas.logger import Logger
 from aeneas.syncmap import SyncMap, SyncMapFragment
+from aeneas.syncmapcache import SyncMapCache
 from aeneas.synthesizer import Synthesizer
 from aeneas.task import Task
+from aeneas.ttsbackend import create_tts_backend
 
 __author__ = "Alberto Pettarin"
 __copyright__ = """
@@ -36,16 +38,66 @@ class ExecuteTask(object):
     :type  task: :class:`aeneas.task.Task`
     :param logger: the logger object
     :type  logger: :class:`aeneas.logger.Logger`
+    :param tts_backend: the TTS backend used to synthesize the text;
+                        if ``None``, use the default one
+    :type  tts_backend: :class:`aeneas.ttsbackend.TTSBackend`
+    :param algorithm: the DTW algorithm used to align the waves;
+                      if ``None``, use the default one
+    :type  algorithm: string (from :class:`aeneas.dtw.DTWAlgorithm` enumeration)
+    :param margin: the DTW margin, in seconds;
+                   if ``None``, use the default one
+    :type  margin: int
+    :param cache_directory: the directory of the persistent
+                            sync map cache
+                            (see :class:`aeneas.syncmapcache.SyncMapCache`);
+                            if ``None``, the cache is not used.
+                            Default:
+                            :class:`aeneas.globalconstants.EXECUTE_TASK_CACHE_DIRECTORY`
+    :type  cache_directory: string (path)
+    :param real_features: the precomputed features
+                          of the (head/process window of the) audio file;
+                          if not ``None``, the audio file is not converted
+    :type  real_features: :class:`aeneas.dtw.WaveFeatures`
+    :param synt_features: the precomputed features
+                          of the synthesized text;
+                          if not ``None`` (and ``synt_anchors``
+                          is not ``None``), the text is not synthesized
+    :type  synt_features: :class:`aeneas.dtw.WaveFeatures`
+    :param synt_anchors: the anchors of the precomputed synthesized text
+                         (see ``_synthesize``)
+    :type  synt_anchors: list
     """
 
     TAG = "ExecuteTask"
 
-    def __init__(self, task, logger=None):
+    def __init__(
+            self,
+            task,
+            logger=None,
+            tts_backend=None,
+            algorithm=None,
+            margin=None,
+            cache_directory=gc.EXECUTE_TASK_CACHE_DIRECTORY,
+            real_features=None,
+            synt_features=None,
+            synt_anchors=None
+        ):
         self.task = task
         self.cleanup_info = []
         self.logger = logger
         if self.logger == None:
             self.logger = Logger()
+        self.tts_backend = tts_backend
+        self.algorithm = algorithm
+        self.margin = margin
+        self.cache_directory = cache_directory
+        self.cache = None
+        self.real_features = real_features
+        self.synt_features = synt_features
+        self.shared_synt_anchors = synt_anchors
+        self.real_path = None
+        self.synt_path = None
+        self.synt_anchors = None
 
     def _log(self, message, severity=Logger.DEBUG):
         """ Log """
@@ -56,13 +108,42 @@ class ExecuteTask(object):
         Execute the task.
         The sync map produced will be stored inside the task object.
 
+        This is equivalent to calling ``check_input``,
+        ``execute_cached``, ``execute_convert``,
+        ``execute_synthesize``, and ``execute_align``, in this order,
+        stopping at the first failure,
+        or after ``execute_cached`` if the sync map was cached.
+
         Return ``True`` if the execution succeeded,
         ``False`` if an error occurred.
 
         :rtype: bool
         """
         self._log("Executing task")
+        if not self.check_input():
+            return False
+        if self.execute_cached():
+            self._log("Execution completed (cached)")
+            return True
+        for step in [
+                self.execute_convert,
+                self.execute_synthesize,
+                self.execute_align
+            ]:
+            if not step():
+                return False
+        self._log("Execution completed")
+        return True
 
+    def check_input(self):
+        """
+        Check that the task has its audio and text files set,
+        and prepare the task for the execution of its steps.
+
+        Return ``True`` if the task can be executed.
+
+        :rtype: bool
+        """
         # check that we have the AudioFile object
         if self.task.audio_file == None:
             self._log("The task does not seem to have its audio file set", Logger.WARNING)
@@ -81,30 +162,102 @@ class ExecuteTask(object):
 
         self._log("Both audio and text input file are present")
         self.cleanup_info = []
+        self.real_path = None
+        self.synt_path = None
+        self.synt_anchors = None
+        return True
+
+    def execute_cached(self):
+        """
+        Look up the sync map of the task in the cache,
+        and, if found, store it inside the task object.
+
+        Return ``True`` on a cache hit, that is,
+        if the other steps must not be executed.
+
+        :rtype: bool
+        """
+        cache = self._cache()
+        if cache == None:
+            return False
+        sync_map = cache.load(self.task)
+        if sync_map == None:
+            self._log("Sync map not found in the cache")
+            return False
+        self._log("Sync map found in the cache")
+        self.task.sync_map = sync_map
+        return True
+
+    def execute_convert(self):
+        """
+        Execute the first step of the task,
+        that is, convert the audio file into a ``wav`` file.
+
+        The step is skipped if the features of the audio file
+        were given in the constructor.
+
+        On failure, the temporary files are removed.
 
+        :rtype: bool
+        """
         # STEP 1 : convert (real) audio to wave
         self._log("STEP 1 BEGIN")
-        result, real_handler, real_path = self._convert()
-        self.cleanup_info.append([real_handler, real_path])
+        if self.real_features != None:
+            self._log("Using the shared features of the audio file")
+            self._log("STEP 1 END")
+            return True
+        result, real_handler, self.real_path = self._convert()
+        self.cleanup_info.append([real_handler, self.real_path])
         if not result:
             self._log("STEP 1 FAILURE")
             self._cleanup()
             return False
         self._log("STEP 1 END")
+        return True
 
+    def execute_synthesize(self):
+        """
+        Execute the second step of the task,
+        that is, synthesize the text into a ``wav`` file.
+
+        The step is skipped if the features and the anchors
+        of the synthesized text were given in the constructor.
+
+        On failure, the temporary files are removed.
+
+        :rtype: bool
+        """
         # STEP 2 : synthesize text to wave
         self._log("STEP 2 BEGIN")
-        result, synt_handler, synt_path, synt_anchors = self._synthesize()
-        self.cleanup_info.append([synt_handler, synt_path])
+        if (self.synt_features != None) and (self.shared_synt_anchors != None):
+            self._log("Using the shared synthesis of the text")
+            self.synt_anchors = self.shared_synt_anchors
+            self._log("STEP 2 END")
+            return True
+        result, synt_handler, self.synt_path, self.synt_anchors = self._synthesize()
+        self.cleanup_info.append([synt_handler, self.synt_path])
         if not result:
             self._log("STEP 2 FAILURE")
             self._cleanup()
             return False
         self._log("STEP 2 END")
+        return True
+
+    def execute_align(self):
+        """
+        Execute the last steps of the task,
+        that is, align the real and the synthesized waves,
+        align the text, create the sync map,
+        and remove the temporary files.
 
+        It must be called after
+        ``execute_convert`` and ``execute_synthesize`` have succeeded.
+
+        :rtype: bool
+        """
         # STEP 3 : align waves
         self._log("STEP 3 BEGIN")
-        result, wave_map = self._align_waves(real_path, synt_path)
+        result, wave_map = self._align_waves(self.real_path, self.synt_path)
         if not result:
             self._log("STEP 3 FAILURE")
             self._cleanup()
@@ -113,7 +266,7 @@ class ExecuteTask(object):
 
         # STEP 4 : align text
         self._log("STEP 4 BEGIN")
-        result, text_map = self._align_text(wave_map, synt_anchors)
+        result, text_map = self._align_text(wave_map, self.synt_anchors)
         if not result:
             self._log("STEP 4 FAILURE")
             self._cleanup()
@@ -133,9 +286,157 @@ class ExecuteTask(object):
         self._log("STEP 6 BEGIN")
         self._cleanup()
         self._log("STEP 6 END")
-        self._log("Execution completed")
+
+        # store the sync map in the cache
+        cache = self._cache()
+        if cache != None:
+            cache.save(self.task)
         return True
 
+    @classmethod
+    def synthesis_key(cls, text_file):
+        """
+        Return a key identifying the synthesis of the given text file,
+        that is, the tuple of the identifier, language and text
+        of its fragments: two text files with the same key
+        produce the same synthesized wave and anchors.
+
+        :param text_file: the text file
+        :type  text_file: :class:`aeneas.textfile.TextFile`
+        :rtype: tuple
+        """
+        return tuple([
+            (fragment.identifier, fragment.language, fragment.text)
+            for fragment in text_file.fragments
+        ])
+
+    @classmethod
+    def precompute_audio(cls, audio_file_path, logger=None):
+        """
+        Convert the given (whole) audio file
+        into a temporary ``wav`` file, and return its features,
+        to be sliced and passed as ``real_features``
+        to the tasks having the same audio file,
+        or ``None`` if an error occurred.
+
+        :param audio_file_path: the path of the audio file
+        :type  audio_file_path: string (path)
+        :param logger: the logger object
+        :type  logger: :class:`aeneas.logger.Logger`
+        :rtype: :class:`aeneas.dtw.WaveFeatures`
+        """
+        if logger == None:
+            logger = Logger()
+        handler, wave_path = tempfile.mkstemp(
+            suffix=".wav",
+            dir=gf.custom_tmp_dir()
+        )
+        try:
+            logger.log("Decoding audio file '%s'..." % audio_file_path, Logger.DEBUG, cls.TAG)
+            ffmpeg = FFMPEGWrapper(logger=logger)
+            ffmpeg.convert(input_file_path=audio_file_path, output_file_path=wave_path)
+            features = WaveFeatures.from_file(wave_path, logger=logger)
+            logger.log("Decoding audio file '%s'... done" % audio_file_path, Logger.DEBUG, cls.TAG)
+            return features
+        except:
+            logger.log("Decoding audio file '%s'... failed" % audio_file_path, Logger.WARNING, cls.TAG)
+            return None
+        finally:
+            os.close(handler)
+            if os.path.exists(wave_path):
+                os.remove(wave_path)
+
+    @classmethod
+    def precompute_synthesis(cls, text_file, tts_backend=None, logger=None):
+        """
+        Synthesize the given text file into a temporary ``wav`` file,
+        and return the pair ``(features, anchors)``,
+        to be passed as ``synt_features`` and ``synt_anchors``
+        to the tasks having the same text,
+        or ``None`` if an error occurred.
+
+        :param text_file: the text file
+        :type  text_file: :class:`aeneas.textfile.TextFile`
+        :param tts_backend: the TTS backend used to synthesize the text;
+                            if ``None``, use the default one
+        :type  tts_backend: :class:`aeneas.ttsbackend.TTSBackend`
+        :param logger: the logger object
+        :type  logger: :class:`aeneas.logger.Logger`
+        :rtype: tuple
+        """
+        if logger == None:
+            logger = Logger()
+        handler, wave_path = tempfile.mkstemp(
+            suffix=".wav",
+            dir=gf.custom_tmp_dir()
+        )
+        try:
+            logger.log("Synthesizing shared text...", Logger.DEBUG, cls.TAG)
+            synt = Synthesizer(logger=logger, tts_backend=tts_backend)
+            anchors = synt.synthesize(text_file, wave_path)
+            features = WaveFeatures.from_file(wave_path, logger=logger)
+            logger.log("Synthesizing shared text... done", Logger.DEBUG, cls.TAG)
+            return (features, anchors)
+        except:
+            logger.log("Synthesizing shared text... failed", Logger.WARNING, cls.TAG)
+            return None
+        finally:
+            os.close(handler)
+            if os.path.exists(wave_path):
+                os.remove(wave_path)
+
+    def _cache(self):
+        """
+        Return the sync map cache for this task,
+        or ``None`` if the cache is not used.
+
+        The key of the task includes the TTS backend
+        and all its parameters, and the DTW algorithm and margin
+        given to this object, if they differ from the default ones
+        (e.g., because a caller requested them, or because
+        the memory governor of the job planned them,
+        see :class:`aeneas.memorygovernor.MemoryGovernor`),
+        so that a sync map computed with different settings
+        is never served.
+        The default ones depend on the ``ALIGNER_*`` constants,
+        which are included by :class:`aeneas.syncmapcache.SyncMapCache`.
+        The cache object is created once,
+        so that the key of the task is computed once.
+
+        :rtype: :class:`aeneas.syncmapcache.SyncMapCache`
+        """
+        if self.cache_directory == None:
+            return None
+        if self.cache != None:
+            return self.cache
+        tts_backend = self.tts_backend
+        if tts_backend == None:
+            tts_backend = create_tts_backend()
+        parameters = ["tts_backend=%s" % type(tts_backend).__name__]
+        parameters.extend([
+            "tts_backend.%s" % parameter
+            for parameter in tts_backend.parameters()
+        ])
+        if (self.algorithm != None) and (self.algorithm != DTWAlgorithm.STRIPE):
+            parameters.append("algorithm=%s" % self.algorithm)
+        if (self.margin != None) and (self.margin != gc.ALIGNER_MARGIN):
+            parameters.append("margin=%s" % self.margin)
+        try:
+            self.cache = SyncMapCache(self.cache_directory, parameters=parameters, logger=self.logger)
+            return self.cache
+        except OSError:
+            self._log("Cannot use the cache directory '%s'" % self.cache_directory, Logger.WARNING)
+            return None
+
+    def cleanup(self):
+        """
+        Remove all the temporary files created so far.
+
+        Call it if the execution of the task is abandoned
+        after some of its steps have been executed.
+        """
+        self._cleanup()
+
     def _cleanup(self):
         """
         Remove all temporary files.
@@ -184,7 +485,8 @@ class ExecuteTask(object):
                 input_file_path=self.task.audio_file_path_absolute,
                 output_file_path=path,
                 head_length=self.task.configuration.is_audio_file_head_length,
-                process_length=self.task.configuration.is_audio_file_process_length)
+                process_length=self.task.configuration.is_audio_file_process_length,
+                input_data=self.task.audio_file_data)
             self._log("Converting... done")
             self._log("Converting real audio to wav: succeeded")
             return (True, handler, path)
@@ -217,9 +519,20 @@ class ExecuteTask(object):
                 dir=gf.custom_tmp_dir()
             )
             self._log("Creating Synthesizer object")
-            synt = Synthesizer(logger=self.logger)
+            synt = Synthesizer(
+                logger=self.logger,
+                tts_backend=self.tts_backend
+            )
+            target_duration = None
+            if gc.SYNTHESIZER_MATCH_SPEECH_RATE:
+                target_duration = self._target_duration()
+                self._log("Matching target duration: %s" % target_duration)
             self._log("Synthesizing...")
-            anchors = synt.synthesize(self.task.text_file, path)
+            anchors = synt.synthesize(
+                self.task.text_file,
+                path,
+                target_duration=target_duration
+            )
             self._log("Synthesizing... done")
             self._log("Synthesizing text: succeeded")
             return (True, handler, path, anchors)
@@ -227,6 +540,52 @@ class ExecuteTask(object):
             self._log("Synthesizing text: failed")
             return (False, handler, path, anchors)
 
+    def _target_duration(self):
+        """
+        Return the duration, in seconds, of the portion
+        of the real audio file which will be aligned
+        (see ``processed_audio_length``).
+
+        Return ``None`` if it cannot be computed.
+
+        :rtype: float
+        """
+        return self.processed_audio_length(self.task)
+
+    @classmethod
+    def processed_audio_length(cls, task):
+        """
+        Return the duration, in seconds, of the portion
+        of the audio file of the given task which will be aligned,
+        that is, its length minus the head length,
+        capped by the process length (if any).
+
+        Return ``None`` if it cannot be computed.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: float
+        """
+        if task.audio_file == None:
+            return None
+        audio_length = task.audio_file.audio_length
+        if audio_length == None:
+            return None
+        head_length = gf.safe_float(
+            task.configuration.is_audio_file_head_length,
+            0.0
+        )
+        duration = audio_length - head_length
+        process_length = gf.safe_float(
+            task.configuration.is_audio_file_process_length,
+            None
+        )
+        if (process_length != None) and (process_length > 0):
+            duration = min(duration, process_length)
+        if duration <= 0:
+            return None
+        return duration
+
     def _align_waves(self, real_path, synt_path):
         """
         Align two ``wav`` files.
@@ -243,7 +602,19 @@ class ExecuteTask(object):
         self._log("Aligning waves")
         try:
             self._log("Creating DTWAligner object")
-            aligner = DTWAligner(real_path, synt_path, logger=self.logger)
+            parameters = dict()
+            if self.algorithm != None:
+                parameters["algorithm"] = self.algorithm
+            if self.margin != None:
+                parameters["margin"] = self.margin
+            aligner = DTWAligner(
+                real_path,
+                synt_path,
+                real_features=self.real_features,
+                synt_features=self.synt_features,
+                logger=self.logger,
+                **parameters
+            )
             self._log("Computing MFCC...")
             aligner.compute_mfcc()
             self._log("Computing MFCC... done")
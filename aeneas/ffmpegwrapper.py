@@ -9,6 +9,7 @@ import os
 import subprocess
 
 import aeneas.globalconstants as gc
+import aeneas.globalfunctions as gf
 from aeneas.logger import Logger
 
 __author__ = "Alberto Pettarin"
@@ -69,6 +70,9 @@ class FFMPEGWrapper(object):
     (must be the second to last argument to ``ffmpeg``,
     just before path of the output file) """
 
+    FFMPEG_STDIN = "pipe:0"
+    """ Input for ``ffmpeg``: read the standard input """
+
     TAG = "FFMPEGWrapper"
 
     def __init__(self, parameters=None, logger=None):
@@ -104,7 +108,8 @@ class FFMPEGWrapper(object):
             input_file_path,
             output_file_path,
             head_length=None,
-            process_length=None
+            process_length=None,
+            input_data=None
         ):
         """
         Convert the audio file at ``input_file_path``
@@ -123,6 +128,14 @@ class FFMPEGWrapper(object):
         you can skip a portion at the beginning and at the end
         of the original input file.
 
+        If ``input_data`` is not ``None``, the audio file
+        is held in memory, and ``input_file_path``
+        is used only for its extension and in log messages:
+        its contents are passed to ``ffmpeg`` through its standard input,
+        if its format can be streamed
+        (see :func:`aeneas.globalfunctions.can_pipe_audio`),
+        otherwise they are written to a temporary file.
+
         :param input_file_path: the path of the audio file to convert
         :type  input_file_path: string
         :param output_file_path: the path of the converted audio file
@@ -132,17 +145,34 @@ class FFMPEGWrapper(object):
         :type  head_length: float
         :param process_length: process these many seconds of the audio file
         :type  process_length: float
+        :param input_data: the contents of the audio file to convert
+        :type  input_data: string
         """
         # test if we can read the input file
-        if not os.path.isfile(input_file_path):
+        if (input_data == None) and (not os.path.isfile(input_file_path)):
             msg = "Input file '%s' cannot be read" % input_file_path
             self._log(msg, Logger.CRITICAL)
             raise OSError(msg)
 
+        # write the in-memory audio file, if it cannot be streamed
+        tmp_path = None
+        if (input_data != None) and (not gf.can_pipe_audio(input_file_path)):
+            tmp_path = gf.write_tmp_file(
+                input_data,
+                suffix=os.path.splitext(input_file_path)[1]
+            )
+            self._log("Wrote input data to '%s'" % tmp_path)
+            input_data = None
+
         # call ffmpeg
         arguments = []
         arguments += [gc.FFMPEG_PATH]
-        arguments += ["-i", input_file_path]
+        if tmp_path != None:
+            arguments += ["-i", tmp_path]
+        elif input_data == None:
+            arguments += ["-i", input_file_path]
+        else:
+            arguments += ["-i", self.FFMPEG_STDIN]
         if head_length != None:
             arguments += ["-ss", head_length]
         if process_length != None:
@@ -153,15 +183,19 @@ class FFMPEGWrapper(object):
             arguments += self.parameters
         arguments += [output_file_path]
         self._log("Calling with arguments '%s'" % str(arguments))
-        proc = subprocess.Popen(
-            arguments,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.PIPE)
-        proc.communicate()
-        proc.stdout.close()
-        proc.stdin.close()
-        proc.stderr.close()
+        try:
+            proc = subprocess.Popen(
+                arguments,
+                stdout=subprocess.PIPE,
+                stdin=subprocess.PIPE,
+                stderr=subprocess.PIPE)
+            proc.communicate(input_data)
+            proc.stdout.close()
+            proc.stdin.close()
+            proc.stderr.close()
+        finally:
+            if tmp_path != None:
+                os.remove(tmp_path)
         self._log("Call completed")
 
         # check if the output file exists
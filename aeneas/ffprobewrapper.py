@@ -85,6 +85,9 @@ class FFPROBEWrapper(object):
     ]
     """ ``ffprobe`` parameters """
 
+    FFPROBE_STDIN = "pipe:0"
+    """ ``ffprobe`` input reading the standard input """
+
     STDERR_DURATION_REGEX = r"Duration: ([0-9]*):([0-9]*):([0-9]*)\.([0-9]*)"
     """ Regex to match ``ffprobe`` stderr duration values """
 
@@ -116,11 +119,19 @@ class FFPROBEWrapper(object):
     def _log(self, message, severity=Logger.DEBUG):
         self.logger.log(message, severity, self.TAG)
 
-    def read_properties(self, audio_file_path):
+    def read_properties(self, audio_file_path, audio_data=None):
         """
         Read the properties of an audio file
         and return them as a dictionary.
 
+        If ``audio_data`` is not ``None``, the audio file
+        is held in memory, and ``audio_file_path``
+        is used only for its extension and in log messages:
+        its contents are passed to ``ffprobe`` through its standard input,
+        if its format can be streamed
+        (see :func:`aeneas.globalfunctions.can_pipe_audio`),
+        otherwise they are written to a temporary file.
+
         Example: ::
 
             d["index"]=0
@@ -164,30 +175,51 @@ class FFPROBEWrapper(object):
 
         :param audio_file_path: the path of the audio file to analyze
         :type  audio_file_path: string (path)
+        :param audio_data: the contents of the audio file
+        :type  audio_data: string
         :rtype: dict
         """
 
         # test if we can read the file at audio_file_path
-        if not os.path.isfile(audio_file_path):
+        if (audio_data == None) and (not os.path.isfile(audio_file_path)):
             msg = "File '%s' cannot be read" % audio_file_path
             self._log(msg, Logger.CRITICAL)
             raise OSError(msg)
 
+        # write the in-memory audio file, if it cannot be streamed
+        tmp_path = None
+        if (audio_data != None) and (not gf.can_pipe_audio(audio_file_path)):
+            tmp_path = gf.write_tmp_file(
+                audio_data,
+                suffix=os.path.splitext(audio_file_path)[1]
+            )
+            self._log("Wrote audio data to '%s'" % tmp_path)
+            audio_data = None
+
         # call ffprobe
         arguments = []
         arguments += [gc.FFPROBE_PATH]
         arguments += self.FFPROBE_PARAMETERS
-        arguments += [audio_file_path]
+        if tmp_path != None:
+            arguments += [tmp_path]
+        elif audio_data == None:
+            arguments += [audio_file_path]
+        else:
+            arguments += [self.FFPROBE_STDIN]
         self._log("Calling with arguments '%s'" % str(arguments))
-        proc = subprocess.Popen(
-            arguments,
-            stdout=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            stderr=subprocess.PIPE)
-        (stdoutdata, stderrdata) = proc.communicate()
-        proc.stdout.close()
-        proc.stdin.close()
-        proc.stderr.close()
+        try:
+            proc = subprocess.Popen(
+                arguments,
+                stdout=subprocess.PIPE,
+                stdin=subprocess.PIPE,
+                stderr=subprocess.PIPE)
+            (stdoutdata, stderrdata) = proc.communicate(audio_data)
+            proc.stdout.close()
+            proc.stdin.close()
+            proc.stderr.close()
+        finally:
+            if tmp_path != None:
+                os.remove(tmp_path)
         self._log("Call completed")
 
         # if no output, raise error
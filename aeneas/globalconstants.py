@@ -37,6 +37,30 @@ TMP_PATH = "/tmp/"
 
 ### CONSTANTS ###
 
+ALIGNER_AUTO_MARGIN = False
+""" If ``True``, the width of the stripe used by striped DTW algorithms
+is estimated for each task from a coarse alignment,
+using :class:`aeneas.globalconstants.ALIGNER_MARGIN` as its upper bound,
+and widened only if the min cost path touches its boundary.
+Default: ``False``. """
+
+ALIGNER_AUTO_MARGIN_COARSE_FACTOR = 10
+""" Downsampling factor of the MFCCs used to compute
+the coarse alignment when sizing the stripe automatically.
+Default: ``10``, corresponding to steps of ``400ms`` length
+at the default frame rate. """
+
+ALIGNER_AUTO_MARGIN_MIN = 5
+""" Minimum margin, in seconds, when sizing the stripe automatically.
+Default: ``5``, corresponding to ``5s`` ahead and behind
+(i.e., ``10s`` total margin). """
+
+ALIGNER_COMPRESS_PAUSES = False
+""" If ``True``, shorten the long interior non-speech runs
+(pauses, sound effects, music beds) of the real wave
+before aligning it.
+Default: ``False``. """
+
 ALIGNER_FRAME_RATE = 25
 """ Aligner MFCC frame rate, in steps per second.
 Default: ``25``, corresponding to steps of ``40ms`` length. """
@@ -46,11 +70,56 @@ ALIGNER_MARGIN = 60
 Default: ``60``, corresponding to ``60s`` ahead and behind
 (i.e., ``120s`` total margin). """
 
+ALIGNER_PAUSE_KEEP_LENGTH = 0.4
+""" Length, in seconds, of a long pause after it has been shortened
+(half at its beginning, half at its end).
+Default: ``0.4``. """
+
+ALIGNER_PAUSE_MIN_LENGTH = 2.0
+""" Minimum length, in seconds, of a non-speech run
+to be shortened when compressing pauses.
+Default: ``2.0``. """
+
+ALIGNER_TRIM_MIN_LENGTH_RATIO = 0.5
+""" Minimum length of the detected speech interval of the real wave,
+relative to the length of the synthesized wave.
+If the detected interval is shorter, it is ignored.
+Default: ``0.5``. """
+
+ALIGNER_TRIM_MODULATION_THRESHOLD = 0.25
+""" Minimum standard deviation of the first MFCC coefficient
+in a window around a speech frame.
+Default: ``0.25``. """
+
+ALIGNER_TRIM_NONSPEECH = False
+""" If ``True``, detect the leading and trailing non-speech portions
+(silence, music, credits) of the real wave,
+and align only the speech interval between them.
+Default: ``False``. """
+
+ALIGNER_TRIM_SILENCE_THRESHOLD = 30
+""" Frames whose energy is more than this number of dB
+below the loud frames of the real wave are considered silent.
+Default: ``30``. """
+
+ALIGNER_TRIM_WINDOW = 1.0
+""" Length, in seconds, of the window used to detect speech frames.
+Default: ``1.0``. """
+
 ALIGNER_USE_EXACT_ALGO_WHEN_MARGIN_TOO_LARGE = True
 """ Use the exact DTW algorithm, instead of a striped algorithm,
 if the aligner margin is larger than the synthesized audio file.
 Default ``True``. """
 
+AUDIO_PIPE_EXTENSIONS = ["flac", "mp3", "oga", "ogg", "wav"]
+""" Extensions of the audio formats that ``ffmpeg`` and ``ffprobe``
+read from their standard input, if the audio file is held in memory.
+An audio file in another format (e.g., ``m4a``,
+whose index might be at the end of the file)
+is written to a temporary file first,
+since it cannot be read from a stream that cannot seek.
+Default: ``["flac", "mp3", "oga", "ogg", "wav"]``. """
+
 CONFIG_TXT_FILE_NAME = "config.txt"
 """ File name for the TXT configuration file in containers """
 
@@ -72,9 +141,252 @@ CONFIG_STRING_SEPARATOR_SYMBOL = "|"
 CONFIG_STRING_ASSIGNMENT_SYMBOL = "="
 """ Assignment symbol in config string ``key=value`` pairs """
 
+CONTAINER_COMPRESSION_WORKERS = 1
+""" Number of threads used to compress the members
+of ZIP containers, and the blocks of TAR.GZ containers,
+written by :class:`aeneas.container.Container`
+and :class:`aeneas.container.ContainerWriter`.
+TAR.BZ2 containers are always compressed by one thread.
+Default: ``1``. """
+
+CONTAINER_DECOMPRESSION_WORKERS = 1
+""" Number of threads used to extract the members
+of ZIP (and EPUB) containers
+by :class:`aeneas.container.Container`.
+If ``1``, the members are extracted sequentially.
+More threads pay off only for large containers
+(e.g., several GB of audio files) on storage
+serving concurrent reads well.
+TAR containers are always extracted by one thread,
+since their members can only be read sequentially.
+Default: ``1``. """
+
+CONTAINER_TAR_BZ2_COMPRESSION_LEVEL = 9
+""" Compression level of TAR.BZ2 containers,
+from ``1`` (fastest) to ``9`` (best).
+Default: ``9``. """
+
+CONTAINER_TAR_GZ_COMPRESSION_LEVEL = 9
+""" Compression level of TAR.GZ containers,
+from ``1`` (fastest) to ``9`` (best).
+Default: ``9``. """
+
+CONTAINER_UNPACKED_HARD_LINKS = False
+""" If ``True``, the files of unpacked containers are hard linked,
+instead of being copied, when source and destination
+are on the same file system.
+Hard linked files share their contents (and inode)
+with the original files: set it to ``True``
+only if the original files are never modified in place
+while (or after) they are processed.
+If ``False``, the files are cloned copy-on-write,
+where the file system supports it, or copied.
+Default: ``False``. """
+
+CONTAINER_ZIP_COMPRESSION_LEVEL = 0
+""" Compression level of ZIP (and EPUB) containers,
+from ``1`` (fastest) to ``9`` (best),
+or ``0`` to store the members without compressing them.
+Default: ``0``. """
+
+EXECUTE_JOB_CHECKPOINT_DIRECTORY = None
+""" Directory where :class:`aeneas.executejob.ExecuteJob`
+stores a checkpoint of each completed task,
+so that an interrupted job can be resumed
+(see :class:`aeneas.checkpoint.CheckpointStore`).
+It must survive the interrupted run, hence
+it should not be inside a temporary working directory.
+If ``None``, no checkpoint is stored.
+Default: ``None``. """
+
+EXECUTE_JOB_COST_AUDIO_SECOND = 0.25
+""" Estimated processing time, in seconds,
+for each second of audio of a task.
+It is used to schedule the tasks of a job
+executed by several workers, longest first.
+Default: ``0.25``. """
+
+EXECUTE_JOB_COST_FRAGMENT = 0.05
+""" Estimated processing time, in seconds,
+for each text fragment of a task
+(mostly, the synthesis of the fragment).
+Default: ``0.05``. """
+
+EXECUTE_JOB_MEMORY_BUDGET = None
+""" Memory budget, in bytes, for the tasks of a job
+executed at the same time by :class:`aeneas.executejob.ExecuteJob`
+(see :class:`aeneas.memorygovernor.MemoryGovernor`).
+If ``None``, the memory is not limited.
+Default: ``None``. """
+
+EXECUTE_JOB_PIPELINE = False
+""" If ``True``, :class:`aeneas.executejob.ExecuteJob`
+executes the tasks of a job as a staged pipeline
+(decode, synthesize, align),
+so that the stages of different tasks overlap.
+Default: ``False``. """
+
+EXECUTE_JOB_PIPELINE_ALIGN_WORKERS = 1
+""" Number of threads running the align stage of the pipeline.
+Default: ``1``. """
+
+EXECUTE_JOB_PIPELINE_DECODE_WORKERS = 1
+""" Number of threads running the decode stage of the pipeline.
+Default: ``1``. """
+
+EXECUTE_JOB_PIPELINE_QUEUE_SIZE = 2
+""" Maximum number of tasks waiting between two stages of the pipeline.
+Default: ``2``. """
+
+EXECUTE_JOB_PIPELINE_SYNTHESIZE_WORKERS = 1
+""" Number of threads running the synthesize stage of the pipeline.
+Default: ``1``. """
+
+EXECUTE_JOB_SHARE_AUDIO = False
+""" If ``True``, :class:`aeneas.executejob.ExecuteJob`
+decodes each audio file shared by several tasks of a job only once,
+and it computes its MFCCs only once,
+giving each task the slice for its head/process window.
+The shared audio files are decoded one after another
+before executing the tasks, hence enable it only
+for jobs with many tasks sharing few audio files.
+Default: ``False``. """
+
+EXECUTE_JOB_SHARE_SYNTHESIS = False
+""" If ``True``, :class:`aeneas.executejob.ExecuteJob`
+synthesizes each text shared by several tasks of a job only once,
+and it computes the MFCCs of the synthesized wave only once.
+The shared texts are synthesized one after another
+before executing the tasks, hence enable it only
+for jobs with many tasks sharing few texts.
+The synthesis is not shared if
+:class:`aeneas.globalconstants.SYNTHESIZER_MATCH_SPEECH_RATE` is ``True``,
+since it depends on the length of the audio file of each task.
+Default: ``False``. """
+
+EXECUTE_JOB_STOP_ON_FAILURE = True
+""" If ``True``, :class:`aeneas.executejob.ExecuteJob`
+stops executing a job as soon as one of its tasks fails;
+otherwise, it executes all the tasks, and then reports the failure.
+Default: ``True``. """
+
+EXECUTE_JOB_TASK_TIMEOUT = 3600
+""" Maximum time, in seconds, that
+:class:`aeneas.executejob.ExecuteJob` waits for the result
+of a task sent to a worker process,
+from the moment the worker starts executing it,
+before considering it failed
+(e.g., because the worker process has been killed).
+If ``None``, wait forever.
+Default: ``3600``. """
+
+EXECUTE_JOB_WORKERS = 1
+""" Number of worker processes used by
+:class:`aeneas.executejob.ExecuteJob` to execute the tasks of a job.
+If ``1``, the tasks are executed sequentially, in the current process.
+Default: ``1``. """
+
+EXECUTE_TASK_CACHE_DIRECTORY = None
+""" Directory of the persistent cache of the sync maps
+computed by :class:`aeneas.executetask.ExecuteTask`
+(see :class:`aeneas.syncmapcache.SyncMapCache`):
+a task with the same audio file, text file and configuration
+of a cached one gets its sync map without being executed.
+If ``None``, the cache is not used.
+Default: ``None``. """
+
 PARSED_TEXT_SEPARATOR = "|"
 """ Separator for input text files in parsed format """
 
+SERVER_FEATURE_CACHE_SIZE = 16
+""" Maximum number of decoded audio files (features)
+kept in memory by :class:`aeneas.alignmentserver.AlignmentServer`,
+to be reused by later requests with the same audio file
+(same path, size and modification time).
+Default: ``16``. """
+
+SERVER_HOST = "127.0.0.1"
+""" Host (interface) where :class:`aeneas.alignmentserver.AlignmentServer`
+listens for requests. Default: ``127.0.0.1`` (localhost only). """
+
+SERVER_PORT = 8765
+""" Port where :class:`aeneas.alignmentserver.AlignmentServer`
+listens for requests. Default: ``8765``. """
+
+SERVER_SYNTHESIS_CACHE_SIZE = 16
+""" Maximum number of synthesized texts kept in memory
+by :class:`aeneas.alignmentserver.AlignmentServer`,
+to be reused by later requests with the same text.
+Default: ``16``. """
+
+SERVER_WORKERS = 1
+""" Number of tasks executed at the same time by
+:class:`aeneas.alignmentserver.AlignmentServer`.
+If greater than ``1``, the tasks are executed
+by a pool of worker processes, kept alive between requests.
+Default: ``1``. """
+
+SPOOL_POLL_INTERVAL = 5.0
+""" Time, in seconds, between two scans of the spool directory
+by :class:`aeneas.spoolrunner.SpoolRunner`.
+The runner also scans it as soon as a job is done.
+Default: ``5.0``. """
+
+SPOOL_WORKERS = 1
+""" Number of jobs executed at the same time by
+:class:`aeneas.spoolrunner.SpoolRunner`.
+Default: ``1``. """
+
+SYNTHESIZER_FAKE_CHARACTER_DURATION = 0.060
+""" Duration, in seconds, of each character synthesized by
+:class:`aeneas.ttsbackend.FakeTTSBackend`.
+Default: ``0.060``, roughly the pace of a ``espeak`` voice. """
+
+SYNTHESIZER_FAKE_SAMPLE_RATE = 22050
+""" Sample rate, in Hz, of the signal generated by
+:class:`aeneas.ttsbackend.FakeTTSBackend`.
+Default: ``22050``, the same of ``espeak``. """
+
+SYNTHESIZER_MATCH_SPEECH_RATE = False
+""" If ``True``, :class:`aeneas.executetask.ExecuteTask`
+asks the synthesizer to match the speech rate
+of the real audio file, so that the synthesized wave
+has (roughly) the same duration of the real one,
+and the DTW can work on a narrower band.
+Default: ``False``. """
+
+SYNTHESIZER_SPEECH_RATE_MAX = 2.0
+""" Maximum speed factor used when matching the speech rate.
+Default: ``2.0`` (twice as fast as the TTS natural speed). """
+
+SYNTHESIZER_SPEECH_RATE_MIN = 0.5
+""" Minimum speed factor used when matching the speech rate.
+Default: ``0.5`` (twice as slow as the TTS natural speed). """
+
+SYNTHESIZER_SPEECH_RATE_TOLERANCE = 0.10
+""" If the duration of the synthesized wave differs from the
+target duration by more than this fraction, synthesize
+again (once) with a corrected speed.
+Default: ``0.10`` (10%). """
+
+SYNTHESIZER_TTS_BACKEND = "espeak"
+""" TTS backend used by :class:`aeneas.synthesizer.Synthesizer`,
+if none is specified.
+Values: listed in :class:`aeneas.ttsbackend.TTSBackendType`.
+Default: ``espeak``. """
+
+WORK_QUEUE_LEASE_DURATION = 600.0
+""" Time, in seconds, after which the lease of a work item
+of :class:`aeneas.workqueue.WorkQueue` expires,
+if not renewed by the node holding it
+(which renews it every third of this time).
+Default: ``600.0``. """
+
+WORK_QUEUE_POLL_INTERVAL = 5.0
+""" Time, in seconds, between two checks for new work items
+by a waiting :class:`aeneas.workqueue.WorkQueueNode`.
+Default: ``5.0``. """
+
 # reserved parameter names (RPN)
 RPN_JOB_IDENTIFIER = "job_identifier"
 """
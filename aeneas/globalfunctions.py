@@ -5,11 +5,18 @@
 Global common functions. 
 """
 
+import errno
+import hashlib
 import math
 import os
 import shutil
 import sys
+import tempfile
 from lxml import etree
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 import aeneas.globalconstants as gc
 
@@ -23,6 +30,9 @@ __version__ = "1.0.0"
 __email__ = "aeneas@readbeyond.it"
 __status__ = "Production"
 
+FICLONE = 0x40049409
+""" ``ioctl`` request cloning a file (reflink), on Linux """
+
 def custom_tmp_dir():
     """
     Return the path of the temporary directory to use.
@@ -58,6 +68,40 @@ def file_name_without_extension(path):
         return None
     return os.path.splitext(os.path.basename(path))[0]
 
+def can_pipe_audio(path):
+    """
+    Return ``True`` if the audio file with the given path (or name)
+    can be read by ``ffmpeg`` and ``ffprobe``
+    from their standard input, according to its extension
+    (see :class:`aeneas.globalconstants.AUDIO_PIPE_EXTENSIONS`).
+
+    :param path: the path (or name) of the audio file
+    :type  path: string (path)
+    :rtype: bool
+    """
+    if path == None:
+        return False
+    extension = os.path.splitext(path)[1][1:].lower()
+    return extension in gc.AUDIO_PIPE_EXTENSIONS
+
+def write_tmp_file(data, suffix=""):
+    """
+    Write the given data into a new temporary file,
+    and return its path.
+    The caller must remove the file.
+
+    :param data: the data to be written
+    :type  data: string
+    :param suffix: the suffix of the file name (e.g., ``.m4a``)
+    :type  suffix: string
+    :rtype: string (path)
+    """
+    handler, path = tempfile.mkstemp(suffix=suffix, dir=custom_tmp_dir())
+    os.close(handler)
+    with open(path, "wb") as tmp_file:
+        tmp_file.write(data)
+    return path
+
 def safe_float(string, default=None):
     """
     Safely parse a string into a float.
@@ -266,12 +310,64 @@ def pairs_to_dict(pairs, result=None):
                 result.add_warning("Invalid key=value string: '%s'" % pair)
     return dictionary
 
-def copytree(source_directory, destination_directory, ignore=None):
+def copy_file(source_path, destination_path, link=False):
+    """
+    Copy the source file into the destination file,
+    overwriting the latter if it already exists.
+
+    If ``link`` is ``True``, first try to create a hard link,
+    which costs no I/O but shares the contents with the source file:
+    modifying one file in place modifies the other as well.
+    Then try to clone the source file (reflink),
+    which shares the data blocks copy-on-write,
+    on file systems supporting it (e.g., Btrfs or XFS on Linux).
+    If both fail, for example because the two paths are
+    on different file systems, copy the contents.
+
+    :param source_path: the source file
+    :type  source_path: string (path)
+    :param destination_path: the destination file
+    :type  destination_path: string (path)
+    :param link: if ``True``, try to create a hard link first
+    :type  link: bool
+    """
+    if os.path.exists(destination_path):
+        if os.path.samefile(source_path, destination_path):
+            return
+        os.remove(destination_path)
+    if link:
+        try:
+            os.link(source_path, destination_path)
+            return
+        except (AttributeError, OSError):
+            pass
+    with open(source_path, "rb") as source_file:
+        with open(destination_path, "wb") as destination_file:
+            if fcntl != None:
+                try:
+                    fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+                    return
+                except (IOError, OSError) as exc:
+                    if exc.errno not in [
+                            errno.EBADF,
+                            errno.EINVAL,
+                            errno.ENOTTY,
+                            errno.EOPNOTSUPP,
+                            errno.EXDEV
+                        ]:
+                        raise
+            shutil.copyfileobj(source_file, destination_file, 1048576)
+
+def copytree(source_directory, destination_directory, ignore=None, link=False):
     """
     Recursively copy the contents of a source directory
     into a destination directory.
     Both directories must exist.
 
+    Each file is copied with :func:`aeneas.globalfunctions.copy_file`,
+    hence it is hard linked (if ``link`` is ``True``) or cloned,
+    if possible.
+
     NOTE: this function does not copy the root directory ``source_directory``
     into ``destination_directory``.
 
@@ -284,6 +380,8 @@ def copytree(source_directory, destination_directory, ignore=None):
     :type  source_directory: string (path)
     :param destination_directory: the destination directory, already existing
     :type  destination_directory: string (path)
+    :param link: if ``True``, hard link the files, if possible
+    :type  link: bool
     """
     if os.path.isdir(source_directory):
         if not os.path.isdir(destination_directory):
@@ -298,10 +396,38 @@ def copytree(source_directory, destination_directory, ignore=None):
                 copytree(
                     os.path.join(source_directory, f),
                     os.path.join(destination_directory, f),
-                    ignore
+                    ignore,
+                    link
                 )
     else:
-        shutil.copyfile(source_directory, destination_directory)
+        copy_file(source_directory, destination_directory, link)
+
+def hash_file(path, block_size=1048576):
+    """
+    Return the SHA-1 hex digest of the contents of the given file,
+    reading it in blocks of ``block_size`` bytes.
+
+    Return ``None`` if the file cannot be read.
+
+    :param path: the path of the file
+    :type  path: string (path)
+    :param block_size: the size of each block, in bytes
+    :type  block_size: int
+    :rtype: string
+    """
+    if (path == None) or (not os.path.isfile(path)):
+        return None
+    hasher = hashlib.sha1()
+    try:
+        with open(path, "rb") as input_file:
+            while True:
+                block = input_file.read(block_size)
+                if len(block) == 0:
+                    break
+                hasher.update(block)
+    except IOError:
+        return None
+    return hasher.hexdigest()
 
 def time_to_ssmmm(time_value):
     """
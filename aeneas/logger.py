@@ -107,6 +107,25 @@ class Logger(object):
         if self.tee:
             print self._pretty_print(entry)
 
+    def add_entries(self, entries):
+        """
+        Append the given entries to the log,
+        for example those produced by a logger
+        living in another process.
+
+        The entries keep their own time and tag,
+        while their indentation is increased by
+        the current indentation of the log.
+
+        :param entries: the entries to be added
+        :type  entries: list of :class:`aeneas.logger._LogEntry`
+        """
+        for entry in entries:
+            entry.indentation += self.indentation
+            self.entries.append(entry)
+            if self.tee:
+                print self._pretty_print(entry)
+
     def clear(self):
         """
         Clear the contents of the log.
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+A memory governor, which predicts the peak memory
+needed to execute a task, and limits the tasks
+executed at the same time so that their total
+predicted memory stays under a given budget.
+
+If a single task does not fit the budget,
+the governor plans its alignment with a lower-memory
+DTW algorithm (or a narrower stripe) instead.
+"""
+
+import threading
+
+import aeneas.globalconstants as gc
+from aeneas.dtw import DTWAlgorithm
+from aeneas.logger import Logger
+
+__author__ = "Alberto Pettarin"
+__copyright__ = """
+    Copyright 2012-2013, Alberto Pettarin (www.albertopettarin.it)
+    Copyright 2013-2015, ReadBeyond Srl (www.readbeyond.it)
+    """
+__license__ = "GNU AGPL v3"
+__version__ = "1.0.0"
+__email__ = "aeneas@readbeyond.it"
+__status__ = "Production"
+
+class MemoryGovernor(object):
+    """
+    A memory governor for the execution of the tasks of a job.
+
+    The governor is thread-safe.
+
+    :param budget: the memory budget, in bytes;
+                   if ``None``, the memory is not limited. Default:
+                   :class:`aeneas.globalconstants.EXECUTE_JOB_MEMORY_BUDGET`
+    :type  budget: int
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    """
+
+    TAG = "MemoryGovernor"
+
+    FLOAT_SIZE = 8
+    """ Size, in bytes, of each element of the matrices and waves """
+
+    REAL_SAMPLE_RATE = 44100
+    """ Sample rate of the real wave produced by ``ffmpeg`` """
+
+    SYNT_SAMPLE_RATE = 22050
+    """ Sample rate of the synthesized wave """
+
+    def __init__(self, budget=gc.EXECUTE_JOB_MEMORY_BUDGET, logger=None):
+        self.budget = budget
+        self.logger = logger
+        if self.logger == None:
+            self.logger = Logger()
+        self.used = 0
+        self.condition = threading.Condition()
+
+    def _log(self, message, severity=Logger.DEBUG):
+        self.logger.log(message, severity, self.TAG)
+
+    @classmethod
+    def estimate_peak_memory(
+            cls,
+            audio_length,
+            algorithm=DTWAlgorithm.STRIPE,
+            margin=gc.ALIGNER_MARGIN,
+            frame_rate=gc.ALIGNER_FRAME_RATE
+        ):
+        """
+        Estimate the peak memory, in bytes, needed to align
+        an audio file of the given length, with the given
+        DTW algorithm and margin.
+
+        The length must be the one of the portion of the audio file
+        which is actually aligned (i.e., its head/process window,
+        see :func:`aeneas.executetask.ExecuteTask.processed_audio_length`).
+        The synthesized wave is assumed to be as long as the real wave,
+        so that ``n = m``, and the estimate is the memory
+        of the two waves plus the memory of the DTW matrices:
+
+        * ``EXACT``: ``3 n m`` floats
+          (cost matrix, its normalization, accumulated cost matrix);
+        * ``STRIPE``: ``2 n d`` floats
+          (cost and accumulated cost matrices on the stripe);
+        * ``STRIPE_NOT_OPTIMIZED``: ``3 n m`` floats,
+
+        where ``d = 2 * margin * frame_rate``.
+        As in :class:`aeneas.dtw.DTWAligner`,
+        ``EXACT`` is used if ``m <= d``.
+
+        :param audio_length: the length of the audio file, in seconds
+        :type  audio_length: float
+        :param algorithm: the DTW algorithm
+        :type  algorithm: string (from :class:`aeneas.dtw.DTWAlgorithm` enumeration)
+        :param margin: the margin, in seconds
+        :type  margin: int
+        :param frame_rate: the MFCC frame rate, in frames per second
+        :type  frame_rate: int
+        :rtype: int
+        """
+        if (audio_length == None) or (audio_length <= 0):
+            return 0
+        n = int(audio_length * frame_rate)
+        m = n
+        delta = frame_rate * (margin * 2)
+        if (m <= delta) and (gc.ALIGNER_USE_EXACT_ALGO_WHEN_MARGIN_TOO_LARGE):
+            algorithm = DTWAlgorithm.EXACT
+        if algorithm == DTWAlgorithm.STRIPE:
+            matrices = 2 * n * delta
+        else:
+            matrices = 3 * n * m
+        waves = int(audio_length * (cls.REAL_SAMPLE_RATE + cls.SYNT_SAMPLE_RATE))
+        return (matrices + waves) * cls.FLOAT_SIZE
+
+    def plan(self, audio_length, algorithm=DTWAlgorithm.STRIPE, margin=gc.ALIGNER_MARGIN):
+        """
+        Plan the alignment of an audio file of the given length,
+        so that it fits the budget.
+
+        Return a triple ``(algorithm, margin, memory)``,
+        where ``memory`` is the predicted peak memory, in bytes.
+
+        If the requested algorithm does not fit the budget,
+        ``STRIPE`` is used instead, halving the margin
+        until it fits or it reaches
+        :class:`aeneas.globalconstants.ALIGNER_AUTO_MARGIN_MIN`.
+        In the latter case, the plan might still exceed the budget,
+        and the task will be admitted only when no other task is running.
+
+        :param audio_length: the length of the audio file, in seconds
+        :type  audio_length: float
+        :param algorithm: the requested DTW algorithm
+        :type  algorithm: string (from :class:`aeneas.dtw.DTWAlgorithm` enumeration)
+        :param margin: the requested margin, in seconds
+        :type  margin: int
+        :rtype: tuple
+        """
+        memory = self.estimate_peak_memory(audio_length, algorithm, margin)
+        if (self.budget == None) or (memory <= self.budget):
+            return (algorithm, margin, memory)
+        self._log("Predicted memory %d exceeds the budget %d with '%s'" % (
+            memory,
+            self.budget,
+            algorithm
+        ), Logger.WARNING)
+        algorithm = DTWAlgorithm.STRIPE
+        memory = self.estimate_peak_memory(audio_length, algorithm, margin)
+        while (memory > self.budget) and (margin > gc.ALIGNER_AUTO_MARGIN_MIN):
+            margin = max(margin / 2, gc.ALIGNER_AUTO_MARGIN_MIN)
+            memory = self.estimate_peak_memory(audio_length, algorithm, margin)
+        self._log("Switched to '%s' with margin %d (memory %d)" % (
+            algorithm,
+            margin,
+            memory
+        ), Logger.WARNING)
+        return (algorithm, margin, memory)
+
+    def admits(self, memory):
+        """
+        Return ``True`` if a task needing the given memory
+        can be started now, that is,
+        if it fits the remaining budget,
+        or if no other task is running.
+
+        :param memory: the predicted memory of the task, in bytes
+        :type  memory: int
+        :rtype: bool
+        """
+        with self.condition:
+            return self._admits(memory)
+
+    def _admits(self, memory):
+        if self.budget == None:
+            return True
+        return (self.used == 0) or (self.used + memory <= self.budget)
+
+    def acquire(self, memory):
+        """
+        Wait until a task needing the given memory can be started,
+        and reserve the memory for it.
+
+        :param memory: the predicted memory of the task, in bytes
+        :type  memory: int
+        """
+        with self.condition:
+            while not self._admits(memory):
+                self.condition.wait()
+            self.used += memory
+            self._log("Acquired %d bytes (used %d)" % (memory, self.used))
+
+    def release(self, memory):
+        """
+        Release the memory reserved for a task.
+
+        :param memory: the predicted memory of the task, in bytes
+        :type  memory: int
+        """
+        with self.condition:
+            self.used = max(0, self.used - memory)
+            self._log("Released %d bytes (used %d)" % (memory, self.used))
+            self.condition.notify_all()
+
+
+
@@ -57,9 +57,9 @@ class MFCC(object):
 
         for whichfilt in range(0, nfilt):
             # Filter triangles, in DFT points
-            leftfr = round(filt_edge[whichfilt] / dfreq)
-            centerfr = round(filt_edge[whichfilt + 1] / dfreq)
-            rightfr = round(filt_edge[whichfilt + 2] / dfreq)
+            leftfr = int(round(filt_edge[whichfilt] / dfreq))
+            centerfr = int(round(filt_edge[whichfilt + 1] / dfreq))
+            rightfr = int(round(filt_edge[whichfilt + 2] / dfreq))
             # For some reason this is calculated in Hz, though I think
             # it doesn't really matter
             fwidth = (rightfr - leftfr) * dfreq
@@ -98,7 +98,7 @@ class MFCC(object):
         mfcc = numpy.zeros((nfr, self.ncep), 'd')
         fr = 0
         while fr < nfr:
-            start = round(fr * self.fshift)
+            start = int(round(fr * self.fshift))
             end = min(len(sig), start + self.wlen)
             frame = sig[start:end]
             if len(frame) < self.wlen:
@@ -113,7 +113,7 @@ class MFCC(object):
         mfcc = numpy.zeros((nfr, self.nfilt), 'd')
         fr = 0
         while fr < nfr:
-            start = round(fr * self.fshift)
+            start = int(round(fr * self.fshift))
             end = min(len(sig), start + self.wlen)
             frame = sig[start:end]
             if len(frame) < self.wlen:
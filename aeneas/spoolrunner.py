@@ -0,0 +1,634 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+A batch runner which watches a spool directory,
+and executes each container put in it as a job,
+writing the output containers and a status file
+for each job in an outbox directory.
+
+The spool directory is organized as follows: ::
+
+    spool/
+        container1.zip              # queued
+        container2.zip              # queued
+        .processing/
+            host-1234/              # claimed by the runner 1234 on host
+                .runner.lock        # locked while the runner is alive
+                container0.zip      # being processed
+        .checkpoints/
+            container0.zip/         # checkpoints of the tasks of container0.zip
+        .done/
+            containerA.zip          # processed, succeeded
+        .failed/
+            containerB.zip          # processed, failed
+
+and the outbox directory as follows: ::
+
+    outbox/
+        runner.status.json          # status of the runner(s)
+        containerA.zip/             # output container of containerA.zip
+            output.zip
+        containerA.zip.status.json  # status of the job of containerA.zip
+        containerB.zip.status.json  # status of the job of containerB.zip
+
+A container is claimed by renaming it into the ``.processing``
+subdirectory of the runner, which is atomic:
+several runners (in different processes) can share
+the same spool directory, and a container
+is processed by exactly one of them.
+Producers should create each container outside the spool directory
+(on the same filesystem), and then move it into the spool directory.
+
+The output container of a job is written
+into a temporary directory of the outbox directory.
+Then, the status file of the job is written (atomically),
+and only then the temporary directory is moved into place,
+and the container is moved to ``.done`` or ``.failed``.
+While running, a runner holds an exclusive lock
+(``flock``) on the lock file of its processing directory,
+which the operating system releases when the runner dies.
+When a runner starts, it recovers the containers
+claimed by runners no longer alive on the same host
+(i.e., whose lock file is not locked, or, without a lock file,
+whose pid is not alive), including the ones left
+in its own processing directory by a crashed runner
+with the same host name and pid (e.g., restarted in a container):
+the ones with a status file are moved to ``.done`` or ``.failed``,
+after moving their output container into place, if needed,
+while the others are queued again, and they resume
+from the checkpoints of their completed tasks
+(see :class:`aeneas.checkpoint.CheckpointStore`).
+Hence, a container is never processed twice
+after a crash.
+"""
+
+import errno
+import json
+import os
+import Queue
+import shutil
+import socket
+import tempfile
+import threading
+import time
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import aeneas.globalconstants as gc
+from aeneas.executejob import ExecuteJob
+from aeneas.logger import Logger
+
+__author__ = "Alberto Pettarin"
+__copyright__ = """
+    Copyright 2012-2013, Alberto Pettarin (www.albertopettarin.it)
+    Copyright 2013-2015, ReadBeyond Srl (www.readbeyond.it)
+    """
+__license__ = "GNU AGPL v3"
+__version__ = "1.0.0"
+__email__ = "aeneas@readbeyond.it"
+__status__ = "Production"
+
+class SpoolRunner(object):
+    """
+    A batch runner executing the containers
+    put in a spool directory.
+
+    :param spool_directory: the path of the spool directory
+    :type  spool_directory: string (path)
+    :param outbox_directory: the path of the outbox directory
+    :type  outbox_directory: string (path)
+    :param workers: the number of jobs executed at the same time. Default:
+                    :class:`aeneas.globalconstants.SPOOL_WORKERS`
+    :type  workers: int
+    :param poll_interval: the time, in seconds, between two scans
+                          of the spool directory. Default:
+                          :class:`aeneas.globalconstants.SPOOL_POLL_INTERVAL`
+    :type  poll_interval: float
+    :param config_string: the configuration string used for all the containers
+                          (i.e., the wizard case); if ``None``,
+                          each container must contain a configuration file
+    :type  config_string: string
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    """
+
+    TAG = "SpoolRunner"
+
+    PROCESSING_DIRECTORY_NAME = ".processing"
+    """ Name of the subdirectory of the claimed containers """
+
+    CHECKPOINTS_DIRECTORY_NAME = ".checkpoints"
+    """ Name of the subdirectory of the task checkpoints """
+
+    DONE_DIRECTORY_NAME = ".done"
+    """ Name of the subdirectory of the succeeded containers """
+
+    FAILED_DIRECTORY_NAME = ".failed"
+    """ Name of the subdirectory of the failed containers """
+
+    STATUS_EXTENSION = ".status.json"
+    """ Extension of the job status files """
+
+    RUNNER_STATUS_FILE_NAME = "runner.status.json"
+    """ Name of the runner status file, in the outbox directory """
+
+    LOCK_FILE_NAME = ".runner.lock"
+    """ Name of the lock file, in the processing directory of a runner """
+
+    def __init__(
+            self,
+            spool_directory,
+            outbox_directory,
+            workers=gc.SPOOL_WORKERS,
+            poll_interval=gc.SPOOL_POLL_INTERVAL,
+            config_string=None,
+            logger=None
+        ):
+        self.spool_directory = spool_directory
+        self.outbox_directory = outbox_directory
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.config_string = config_string
+        self.logger = logger
+        if self.logger == None:
+            self.logger = Logger()
+        self.runner_id = "%s-%d" % (socket.gethostname(), os.getpid())
+        self.processing_directory = os.path.join(
+            self.spool_directory,
+            self.PROCESSING_DIRECTORY_NAME,
+            self.runner_id
+        )
+        for directory in [
+                self.outbox_directory,
+                self.processing_directory,
+                self._spool_path(self.CHECKPOINTS_DIRECTORY_NAME),
+                self._spool_path(self.DONE_DIRECTORY_NAME),
+                self._spool_path(self.FAILED_DIRECTORY_NAME)
+            ]:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        self.lock = threading.Lock()
+        self.done = threading.Condition(self.lock)
+        self.publishing = threading.Lock()
+        self.stopped = threading.Event()
+        self.lock_file = None
+        self.claimed = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.elapsed = 0.0
+        self.start_time = time.time()
+
+    def _log(self, message, severity=Logger.DEBUG):
+        with self.lock:
+            self.logger.log(message, severity, self.TAG)
+
+    def _spool_path(self, *names):
+        return os.path.join(self.spool_directory, *names)
+
+    def queued(self):
+        """
+        Return the names of the containers queued in the spool directory,
+        oldest first.
+
+        :rtype: list of strings
+        """
+        entries = []
+        for name in os.listdir(self.spool_directory):
+            if name.startswith("."):
+                continue
+            try:
+                entries.append((os.path.getmtime(self._spool_path(name)), name))
+            except OSError:
+                # claimed by another runner in the meantime
+                pass
+        return [name for mtime, name in sorted(entries)]
+
+    def claim(self, name):
+        """
+        Claim the given queued container, moving it
+        into the processing directory of this runner.
+
+        Return the path of the claimed container,
+        or ``None`` if it was claimed by another runner.
+
+        :param name: the name of the container
+        :type  name: string
+        :rtype: string (path)
+        """
+        path = os.path.join(self.processing_directory, name)
+        try:
+            os.rename(self._spool_path(name), path)
+        except OSError:
+            return None
+        with self.lock:
+            self.claimed += 1
+        self._log("Claimed '%s'" % name)
+        return path
+
+    def recover(self):
+        """
+        Recover the containers claimed by the runners
+        no longer alive on this host.
+
+        The containers in the processing directory of this runner
+        are recovered as well, if this runner has not claimed
+        any container yet: they have been left there
+        by a crashed runner with the same identifier.
+
+        Return the number of recovered containers.
+
+        :rtype: int
+        """
+        processing = self._spool_path(self.PROCESSING_DIRECTORY_NAME)
+        hostname = socket.gethostname()
+        recovered = 0
+        for runner_id in os.listdir(processing):
+            host, separator, pid = runner_id.rpartition("-")
+            runner_directory = os.path.join(processing, runner_id)
+            own = (runner_id == self.runner_id)
+            # the lock is released by the operating system
+            # when its runner dies, whatever its pid
+            locked = (fcntl != None) and os.path.exists(os.path.join(runner_directory, self.LOCK_FILE_NAME))
+            lock_file = None
+            if own:
+                with self.lock:
+                    if self.claimed > 0:
+                        continue
+                if (self.lock_file == None) and locked:
+                    lock_file = self._lock(runner_directory)
+                    if lock_file == None:
+                        continue
+            elif (host != hostname) or (not pid.isdigit()):
+                continue
+            elif locked:
+                lock_file = self._lock(runner_directory)
+                if lock_file == None:
+                    continue
+            elif self._is_alive(int(pid)):
+                continue
+            try:
+                recovered += self._recover_directory(runner_id, runner_directory)
+            finally:
+                if lock_file != None:
+                    self._unlock(runner_directory, lock_file)
+            if runner_id != self.runner_id:
+                try:
+                    os.rmdir(runner_directory)
+                except OSError:
+                    pass
+        return recovered
+
+    def _recover_directory(self, runner_id, runner_directory):
+        """
+        Recover the containers claimed in the given processing directory
+        by the given (crashed) runner.
+
+        Return the number of recovered containers.
+
+        :rtype: int
+        """
+        statuses = self._read_statuses()
+        recovered = 0
+        for name in os.listdir(runner_directory):
+            if name.startswith("."):
+                continue
+            path = os.path.join(runner_directory, name)
+            if path in statuses:
+                self._log("Recovered '%s' (already processed)" % name, Logger.WARNING)
+                self._publish(statuses[path])
+                self._archive(path, statuses[path]["success"])
+            else:
+                self._log("Recovered '%s' (queued again)" % name, Logger.WARNING)
+                os.rename(path, self._unique_path(self.spool_directory, name))
+            recovered += 1
+        for name in os.listdir(self.outbox_directory):
+            if name.startswith(".%s." % runner_id):
+                shutil.rmtree(os.path.join(self.outbox_directory, name), ignore_errors=True)
+        return recovered
+
+    def _lock(self, runner_directory):
+        """
+        Lock the lock file in the given processing directory,
+        without waiting, creating it if needed.
+
+        Return the open lock file,
+        or ``None`` if it is locked by a live runner
+        (or if locking is not supported).
+
+        :rtype: file
+        """
+        if fcntl == None:
+            return None
+        lock_file = open(os.path.join(runner_directory, self.LOCK_FILE_NAME), "ab")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError as exc:
+            lock_file.close()
+            if exc.errno in [errno.EAGAIN, errno.EACCES]:
+                return None
+            raise
+        return lock_file
+
+    def _unlock(self, runner_directory, lock_file):
+        """
+        Remove and unlock the given lock file
+        of the given processing directory.
+        """
+        try:
+            os.remove(os.path.join(runner_directory, self.LOCK_FILE_NAME))
+        except OSError:
+            pass
+        lock_file.close()
+
+    @classmethod
+    def _is_alive(cls, pid):
+        try:
+            os.kill(pid, 0)
+        except OSError as exc:
+            # EPERM means that the process exists
+            return exc.errno == errno.EPERM
+        return True
+
+    def _read_statuses(self):
+        """
+        Return a dictionary mapping the claimed path
+        of each processed container to its job status.
+
+        :rtype: dict
+        """
+        statuses = dict()
+        for name in os.listdir(self.outbox_directory):
+            if name.endswith(self.STATUS_EXTENSION) and (name != self.RUNNER_STATUS_FILE_NAME):
+                try:
+                    with open(os.path.join(self.outbox_directory, name), "rb") as status_file:
+                        status = json.load(status_file)
+                    statuses[status["claim"]] = status
+                except (IOError, ValueError, KeyError):
+                    pass
+        return statuses
+
+    @classmethod
+    def _unique_path(cls, directory, name, extension=""):
+        """
+        Return the path of a new file or directory
+        in the given directory, named ``name`` (plus ``extension``),
+        possibly with a numeric suffix to avoid overwriting
+        an existing one.
+
+        :rtype: string (path)
+        """
+        path = os.path.join(directory, name + extension)
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(directory, "%s.%d%s" % (name, suffix, extension))
+            suffix += 1
+        return path
+
+    def _archive(self, path, success):
+        """
+        Move the given claimed container to ``.done`` or ``.failed``.
+        """
+        if success:
+            directory = self._spool_path(self.DONE_DIRECTORY_NAME)
+        else:
+            directory = self._spool_path(self.FAILED_DIRECTORY_NAME)
+        os.rename(path, self._unique_path(directory, os.path.basename(path)))
+
+    def _publish(self, status):
+        """
+        Move the output container of the given job status
+        from its temporary directory into place,
+        unless it has already been moved.
+        """
+        tmp_directory = status.get("tmp_directory", None)
+        output_path = status.get("output_path", None)
+        if (tmp_directory == None) or (output_path == None):
+            return
+        output_directory = os.path.dirname(output_path)
+        if (not os.path.exists(output_directory)) and (os.path.isdir(tmp_directory)):
+            os.rename(tmp_directory, output_directory)
+
+    def _write_json(self, path, contents):
+        """
+        Write the given contents as JSON into the given file, atomically.
+        """
+        handler, tmp_path = tempfile.mkstemp(
+            suffix=".tmp",
+            dir=os.path.dirname(path)
+        )
+        with os.fdopen(handler, "wb") as json_file:
+            json.dump(contents, json_file, indent=4, sort_keys=True)
+        os.rename(tmp_path, path)
+
+    def process(self, path):
+        """
+        Execute the job in the given claimed container,
+        write its output container and status file
+        into the outbox directory,
+        and move the container to ``.done`` or ``.failed``.
+
+        Return the status of the job.
+
+        :param path: the path of the claimed container
+        :type  path: string (path)
+        :rtype: dict
+        """
+        name = os.path.basename(path)
+        self._log("Processing '%s'..." % name, Logger.INFO)
+        start = time.time()
+        checkpoint_directory = self._spool_path(self.CHECKPOINTS_DIRECTORY_NAME, name)
+        executor = ExecuteJob(logger=Logger(), checkpoint_directory=checkpoint_directory)
+        tmp_directory = tempfile.mkdtemp(
+            prefix=".%s.%s." % (self.runner_id, name),
+            dir=self.outbox_directory
+        )
+        tmp_output_path = None
+        error = None
+        try:
+            if not executor.load_job_from_container(path, self.config_string):
+                error = "The job cannot be loaded from the container"
+            elif not executor.open_output_container(tmp_directory):
+                error = "The output container cannot be created"
+            elif not executor.execute():
+                error = "An error occurred while executing the job"
+            else:
+                result, tmp_output_path = executor.write_output_container(tmp_directory)
+                if not result:
+                    error = "An error occurred while writing the output container"
+        except Exception as exc:
+            error = "Unexpected error: %s" % exc
+        finally:
+            executor.clean(True)
+        success = (error == None)
+        status = {
+            "container": name,
+            "claim": path,
+            "runner": self.runner_id,
+            "success": success,
+            "error": error,
+            "output_path": None,
+            "tmp_directory": None,
+            "started": start,
+            "finished": time.time(),
+            "elapsed": time.time() - start
+        }
+        try:
+            # the status file is written before the output container
+            # is moved into place, so that, after a crash,
+            # the runner recovering the container completes the move
+            # (see ``recover``) instead of processing it again
+            with self.publishing:
+                if success:
+                    status["output_path"] = os.path.join(
+                        self._unique_path(self.outbox_directory, name),
+                        os.path.basename(tmp_output_path)
+                    )
+                    status["tmp_directory"] = tmp_directory
+                self._write_json(
+                    self._unique_path(self.outbox_directory, name, self.STATUS_EXTENSION),
+                    status
+                )
+                self._publish(status)
+        finally:
+            if os.path.isdir(tmp_directory):
+                shutil.rmtree(tmp_directory, ignore_errors=True)
+        self._archive(path, success)
+        if os.path.isdir(checkpoint_directory):
+            shutil.rmtree(checkpoint_directory, ignore_errors=True)
+        if success:
+            self._log("Processing '%s'... succeeded" % name, Logger.INFO)
+        else:
+            self._log("Processing '%s'... failed: %s" % (name, error), Logger.WARNING)
+        return status
+
+    def status(self):
+        """
+        Return the status of this runner,
+        including the queue depth and the throughput
+        (processed containers per hour).
+
+        :rtype: dict
+        """
+        queued = len(self.queued())
+        with self.lock:
+            uptime = time.time() - self.start_time
+            processed = self.completed + self.failed
+            throughput = 0.0
+            if uptime > 0:
+                throughput = processed * 3600.0 / uptime
+            average = None
+            if processed > 0:
+                average = self.elapsed / processed
+            return {
+                "runner": self.runner_id,
+                "workers": self.workers,
+                "queued": queued,
+                "processing": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "throughput": throughput,
+                "average_elapsed": average,
+                "uptime": uptime,
+                "updated": time.time()
+            }
+
+    def write_status(self):
+        """
+        Write the status of this runner into the runner status file.
+        """
+        try:
+            self._write_json(
+                os.path.join(self.outbox_directory, self.RUNNER_STATUS_FILE_NAME),
+                self.status()
+            )
+        except (IOError, OSError):
+            self._log("Cannot write the runner status file", Logger.WARNING)
+
+    def run(self, once=False):
+        """
+        Recover the containers of crashed runners,
+        then process the queued containers,
+        at most ``workers`` at the same time,
+        until ``stop`` is called
+        (or, if ``once`` is ``True``, until the spool directory is empty).
+
+        :param once: if ``True``, return when the spool directory is empty
+        :type  once: bool
+        """
+        if not os.path.isdir(self.processing_directory):
+            os.makedirs(self.processing_directory)
+        # held until this runner stops (or dies)
+        self.lock_file = self._lock(self.processing_directory)
+        self.recover()
+        claimed = Queue.Queue()
+        threads = []
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(claimed,))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        try:
+            while not self.stopped.is_set():
+                queued = self.queued()
+                for name in queued:
+                    with self.lock:
+                        if self.in_flight >= self.workers:
+                            break
+                    path = self.claim(name)
+                    if path != None:
+                        with self.lock:
+                            self.in_flight += 1
+                        claimed.put(path)
+                self.write_status()
+                with self.lock:
+                    if once and (self.in_flight == 0) and (len(queued) == 0):
+                        break
+                    # wake up when a job is done, or at the next poll
+                    self.done.wait(self.poll_interval)
+        finally:
+            for thread in threads:
+                claimed.put(None)
+            for thread in threads:
+                thread.join()
+            self.write_status()
+            if self.lock_file != None:
+                self._unlock(self.processing_directory, self.lock_file)
+                self.lock_file = None
+            try:
+                os.rmdir(self.processing_directory)
+            except OSError:
+                pass
+
+    def stop(self):
+        """
+        Stop the runner, after the jobs being processed are done.
+        """
+        self.stopped.set()
+        with self.lock:
+            self.done.notify_all()
+
+    def _work(self, claimed):
+        while True:
+            path = claimed.get()
+            if path == None:
+                return
+            try:
+                status = self.process(path)
+            except Exception as exc:
+                self._log("Cannot process '%s': %s" % (path, exc), Logger.WARNING)
+                status = {"success": False, "elapsed": 0.0}
+            with self.lock:
+                self.in_flight -= 1
+                if status["success"]:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.elapsed += status["elapsed"]
+                self.done.notify_all()
+
+
+
@@ -20,6 +20,7 @@ This module contains three classes:
 
 import codecs
 import os
+import StringIO
 
 import aeneas.globalconstants as gc
 import aeneas.globalfunctions as gf
@@ -115,15 +116,8 @@ class SyncMap(object):
             os.makedirs(parent_directory)
 
         # check required parameters
-        if sync_map_format == SyncMapFormat.SMIL:
-            if not gc.PPN_TASK_OS_FILE_SMIL_PAGE_REF in parameters:
-                return False
-            if not gc.PPN_TASK_OS_FILE_SMIL_AUDIO_REF in parameters:
-                return False
-            text_ref = parameters[gc.PPN_TASK_OS_FILE_SMIL_PAGE_REF]
-            audio_ref = parameters[gc.PPN_TASK_OS_FILE_SMIL_AUDIO_REF]
-            if (text_ref == None) or (audio_ref == None):
-                return False
+        if not self._check_parameters(sync_map_format, parameters):
+            return False
 
         try:
             # open file for writing
@@ -131,32 +125,84 @@ class SyncMap(object):
             output_file = codecs.open(output_file_path, "w", "utf-8")
 
             # output in the requested format
-            if sync_map_format == SyncMapFormat.CSV:
-                self._output_csv(output_file)
-            elif sync_map_format == SyncMapFormat.JSON:
-                self._output_json(output_file)
-            elif sync_map_format == SyncMapFormat.SMIL:
-                self._output_smil(output_file, parameters)
-            elif sync_map_format == SyncMapFormat.SRT:
-                self._output_srt(output_file)
-            elif sync_map_format == SyncMapFormat.TTML:
-                self._output_ttml(output_file, parameters)
-            elif sync_map_format == SyncMapFormat.TXT:
-                self._output_txt(output_file)
-            elif sync_map_format == SyncMapFormat.VTT:
-                self._output_vtt(output_file)
-            elif sync_map_format == SyncMapFormat.XML:
-                self._output_xml(output_file)
-            else:
-                output_file.close()
-                return False
+            result = self._output_format(output_file, sync_map_format, parameters)
 
             # close file and return
             output_file.close()
-            return True
+            return result
         except:
             return False
 
+    def output_string(self, sync_map_format, parameters=None):
+        """
+        Output the current sync map in the required format,
+        and return it as a (UTF-8 encoded) string,
+        without writing it to file.
+
+        Return ``None`` if an error occurred.
+
+        :param sync_map_format: the format of the sync map
+        :type  sync_map_format: string (from :class:`aeneas.syncmap.SyncMapFormat` enumeration)
+        :param parameters: additional parameters (e.g., for SMIL output)
+        :type  parameters: dict
+        :rtype: string
+        """
+        self._log("Output format: '%s'" % sync_map_format)
+        self._log("Output parameters: '%s'" % parameters)
+        if not self._check_parameters(sync_map_format, parameters):
+            return None
+        try:
+            output_buffer = StringIO.StringIO()
+            output_file = codecs.getwriter("utf-8")(output_buffer)
+            if not self._output_format(output_file, sync_map_format, parameters):
+                return None
+            return output_buffer.getvalue()
+        except:
+            return None
+
+    def _check_parameters(self, sync_map_format, parameters):
+        """
+        Return ``True`` if the given parameters contain
+        the ones required by the given format.
+        """
+        if sync_map_format == SyncMapFormat.SMIL:
+            if not gc.PPN_TASK_OS_FILE_SMIL_PAGE_REF in parameters:
+                return False
+            if not gc.PPN_TASK_OS_FILE_SMIL_AUDIO_REF in parameters:
+                return False
+            text_ref = parameters[gc.PPN_TASK_OS_FILE_SMIL_PAGE_REF]
+            audio_ref = parameters[gc.PPN_TASK_OS_FILE_SMIL_AUDIO_REF]
+            if (text_ref == None) or (audio_ref == None):
+                return False
+        return True
+
+    def _output_format(self, output_file, sync_map_format, parameters):
+        """
+        Write the current sync map into the given (open) file,
+        in the required format.
+
+        Return ``False`` if the format is not supported.
+        """
+        if sync_map_format == SyncMapFormat.CSV:
+            self._output_csv(output_file)
+        elif sync_map_format == SyncMapFormat.JSON:
+            self._output_json(output_file)
+        elif sync_map_format == SyncMapFormat.SMIL:
+            self._output_smil(output_file, parameters)
+        elif sync_map_format == SyncMapFormat.SRT:
+            self._output_srt(output_file)
+        elif sync_map_format == SyncMapFormat.TTML:
+            self._output_ttml(output_file, parameters)
+        elif sync_map_format == SyncMapFormat.TXT:
+            self._output_txt(output_file)
+        elif sync_map_format == SyncMapFormat.VTT:
+            self._output_vtt(output_file)
+        elif sync_map_format == SyncMapFormat.XML:
+            self._output_xml(output_file)
+        else:
+            return False
+        return True
+
     def _output_csv(self, output_file):
         """
         Output to CSV
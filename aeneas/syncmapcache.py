@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+A persistent cache of the sync maps computed for tasks,
+shared by all the jobs using the same cache directory.
+
+A task whose audio file, text file and configuration
+have already been aligned, with the same version of aeneas
+and the same aligner and synthesizer settings,
+gets its sync map from the cache,
+without converting, synthesizing or aligning anything.
+"""
+
+import aeneas
+import aeneas.globalconstants as gc
+from aeneas.checkpoint import CheckpointStore
+
+__author__ = "Alberto Pettarin"
+__copyright__ = """
+    Copyright 2012-2013, Alberto Pettarin (www.albertopettarin.it)
+    Copyright 2013-2015, ReadBeyond Srl (www.readbeyond.it)
+    """
+__license__ = "GNU AGPL v3"
+__version__ = "1.0.0"
+__email__ = "aeneas@readbeyond.it"
+__status__ = "Production"
+
+class SyncMapCache(CheckpointStore):
+    """
+    A directory holding cached sync maps.
+
+    The key of a task extends the one of
+    :class:`aeneas.checkpoint.CheckpointStore`
+    with the version of aeneas, the values of the
+    ``ALIGNER_*`` and ``SYNTHESIZER_*`` constants
+    in :mod:`aeneas.globalconstants`,
+    and the given execution parameters
+    (e.g., the TTS backend and its parameters):
+    if any of them changes, the cached sync maps are no longer used.
+
+    Since the directory is shared by several jobs,
+    do not call ``clean`` on it.
+
+    :param directory: the path of the cache directory
+    :type  directory: string (path)
+    :param parameters: the execution parameters, as strings
+    :type  parameters: list of strings
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    """
+
+    TAG = "SyncMapCache"
+
+    CONSTANT_PREFIXES = ["ALIGNER_", "SYNTHESIZER_"]
+    """ Prefixes of the global constants affecting the sync maps """
+
+    def __init__(self, directory, parameters=None, logger=None):
+        CheckpointStore.__init__(self, directory, logger=logger)
+        self.parameters = parameters
+        if self.parameters == None:
+            self.parameters = []
+
+    @classmethod
+    def constants(cls):
+        """
+        Return the sorted list of the ``NAME=value`` strings
+        of the global constants affecting the sync maps.
+
+        :rtype: list of strings
+        """
+        return sorted([
+            "%s=%s" % (name, getattr(gc, name))
+            for name in dir(gc)
+            if any([name.startswith(prefix) for prefix in cls.CONSTANT_PREFIXES])
+        ])
+
+    def _key_components(self, task):
+        components = CheckpointStore._key_components(self, task)
+        components.append("aeneas=%s" % aeneas.__version__)
+        components.extend(self.constants())
+        components.extend(self.parameters)
+        return components
+
+
+
@@ -7,17 +7,13 @@ a single ``wav`` file,
 along with the corresponding time anchors.
 """
 
-import numpy
-import os
-import tempfile
-from scikits.audiolab import wavread
 from scikits.audiolab import wavwrite
 
 import aeneas.globalconstants as gc
 import aeneas.globalfunctions as gf
-from aeneas.espeakwrapper import ESPEAKWrapper
 from aeneas.logger import Logger
 from aeneas.textfile import TextFile
+from aeneas.ttsbackend import create_tts_backend
 
 __author__ = "Alberto Pettarin"
 __copyright__ = """
@@ -35,93 +31,174 @@ class Synthesizer(object):
     a single ``wav`` file,
     along with the corresponding time anchors.
 
+    The actual synthesis is delegated to a TTS backend
+    (see :mod:`aeneas.ttsbackend`).
+    If no backend is given, the one specified by
+    :class:`aeneas.globalconstants.SYNTHESIZER_TTS_BACKEND`
+    will be used.
+
+    If a target duration is given, the synthesizer
+    estimates the speech rate of the real recording
+    and asks the backend to synthesize at a matching speed,
+    so that the synthesized wave has (roughly) the same length
+    of the real one.
+
     :param logger: the logger object
     :type  logger: :class:`aeneas.logger.Logger`
+    :param tts_backend: the TTS backend
+    :type  tts_backend: :class:`aeneas.ttsbackend.TTSBackend`
     """
 
     TAG = "Synthesizer"
 
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, tts_backend=None):
         self.logger = logger
         if self.logger == None:
             self.logger = Logger()
+        self.tts_backend = tts_backend
+        if self.tts_backend == None:
+            self.tts_backend = create_tts_backend(logger=self.logger)
+        self.speed = 1.0
+        self.duration_ratio = None
 
     def _log(self, message, severity=Logger.DEBUG):
         self.logger.log(message, severity, self.TAG)
 
-    def synthesize(self, text_file, audio_file_path):
+    @property
+    def speed(self):
+        """
+        The speed factor used in the last synthesis.
+
+        :rtype: float
+        """
+        return self.__speed
+    @speed.setter
+    def speed(self, speed):
+        self.__speed = speed
+
+    @property
+    def duration_ratio(self):
+        """
+        The ratio between the duration of the last synthesized wave
+        and the target duration, or ``None`` if no target duration
+        was given.
+
+        :rtype: float
+        """
+        return self.__duration_ratio
+    @duration_ratio.setter
+    def duration_ratio(self, duration_ratio):
+        self.__duration_ratio = duration_ratio
+
+    def synthesize(self, text_file, audio_file_path, target_duration=None):
         """
         Synthesize the text contained in the given fragment list
         into a ``wav`` file.
 
+        If ``target_duration`` is not ``None``,
+        try to match the duration of the synthesized wave to it
+        (see :func:`aeneas.synthesizer.Synthesizer.estimate_speed`).
+
         :param text_file: the text file to be synthesized
         :type  text_file: :class:`aeneas.textfile.TextFile`
         :param audio_file_path: the path to the output audio file
         :type  audio_file_path: string (path)
+        :param target_duration: the duration of the real audio, in seconds
+        :type  target_duration: float
         """
-        
-        # time anchors
-        anchors = []
 
-        # initialize time
+        # synthesize all the fragments with the TTS backend
+        self._log("Synthesizing %d fragments" % len(text_file.fragments))
+        self.speed = 1.0
+        self.duration_ratio = None
+        if (target_duration != None) and (target_duration > 0):
+            self.speed = self.estimate_speed(text_file, target_duration)
+        waves, sample_rate, durations = self.tts_backend.synthesize(
+            text_file.fragments,
+            speed=self.speed
+        )
+        if (target_duration != None) and (target_duration > 0):
+            self.duration_ratio = sum(durations) / target_duration
+            self._log("Duration ratio: %f" % self.duration_ratio)
+            if abs(self.duration_ratio - 1.0) > gc.SYNTHESIZER_SPEECH_RATE_TOLERANCE:
+                # the estimate was off: correct it once, using the actual ratio
+                speed = self._clamp_speed(self.speed * self.duration_ratio)
+                if speed != self.speed:
+                    self._log("Synthesizing again with speed %f" % speed)
+                    self.speed = speed
+                    waves, sample_rate, durations = self.tts_backend.synthesize(
+                        text_file.fragments,
+                        speed=self.speed
+                    )
+                    self.duration_ratio = sum(durations) / target_duration
+                    self._log("Duration ratio: %f" % self.duration_ratio)
+
+        # compute the time anchors
+        anchors = []
         current_time = 0.0
-
-        # waves is used to concatenate all the fragments WAV files
-        waves = numpy.array([])
-
-        # espeak wrapper
-        espeak = ESPEAKWrapper(logger=self.logger)
-
         num = 0
-        # for each fragment, synthesize it and concatenate it
-        for fragment in text_file.fragments:
-
-            # synthesize and get the duration of the output file
-            self._log("Synthesizing fragment %d" % num)
-            handler, tmp_destination = tempfile.mkstemp(
-                suffix=".wav",
-                dir=gf.custom_tmp_dir()
-            )
-            duration = espeak.synthesize(
-                text=fragment.text,
-                language=fragment.language,
-                output_file_path=tmp_destination
-            )
-
-            # store for later output
+        for fragment, duration in zip(text_file.fragments, durations):
             anchors.append([current_time, fragment.identifier, fragment.text])
-
-            # concatenate to buffer
             self._log("Fragment %d starts at: %f" % (num, current_time))
-            if duration > 0:
-                self._log("Fragment %d duration: %f" % (num, duration))
-                current_time += duration
-                data, sample_frequency, encoding = wavread(tmp_destination)
-                #
-                # TODO this might result in memory swapping
-                # if we have a large number of fragments
-                # is there a better way?
-                #
-                # waves = numpy.concatenate((waves, data))
-                #
-                # append seems faster than concatenate, as it should
-                waves = numpy.append(waves, data)
-            else:
-                self._log("Fragment %d has zero duration" % num)
-
-            # remove temporary file
-            self._log("Removing temporary file '%s'" % tmp_destination)
-            os.close(handler)
-            os.remove(tmp_destination)
+            current_time += duration
             num += 1
 
         # output WAV file, concatenation of synthesized fragments
         self._log("Writing audio file '%s'" % audio_file_path)
-        wavwrite(waves, audio_file_path, sample_frequency, encoding)
+        wavwrite(waves, audio_file_path, sample_rate)
 
         # return the time anchors
         self._log("Returning %d time anchors" % len(anchors))
         return anchors
 
+    def estimate_speed(self, text_file, target_duration):
+        """
+        Estimate the speed factor that the TTS backend
+        should use so that the synthesized wave
+        lasts (roughly) ``target_duration`` seconds.
+
+        The speech rate of the real recording is estimated as
+        the number of characters of the text divided by
+        ``target_duration``, and it is compared with the
+        speech rate of the TTS backend at its natural speed.
+
+        The returned value is clamped to
+        [:class:`aeneas.globalconstants.SYNTHESIZER_SPEECH_RATE_MIN`,
+        :class:`aeneas.globalconstants.SYNTHESIZER_SPEECH_RATE_MAX`].
+        If the speech rate of the backend is unknown,
+        return ``1.0``.
+
+        :param text_file: the text file to be synthesized
+        :type  text_file: :class:`aeneas.textfile.TextFile`
+        :param target_duration: the duration of the real audio, in seconds
+        :type  target_duration: float
+        :rtype: float
+        """
+        backend_rate = self.tts_backend.characters_per_second
+        if (backend_rate == None) or (target_duration <= 0):
+            self._log("Cannot estimate speed, using 1.0")
+            return 1.0
+        characters = sum([len(f.text) for f in text_file.fragments if f.text != None])
+        if characters == 0:
+            return 1.0
+        real_rate = characters / float(target_duration)
+        self._log("Estimated speech rate: %f characters per second" % real_rate)
+        speed = self._clamp_speed(real_rate / backend_rate)
+        self._log("Estimated speed: %f" % speed)
+        return speed
+
+    def _clamp_speed(self, speed):
+        """
+        Clamp the given speed factor to the allowed range.
+
+        :param speed: the speed factor
+        :type  speed: float
+        :rtype: float
+        """
+        return min(
+            max(speed, gc.SYNTHESIZER_SPEECH_RATE_MIN),
+            gc.SYNTHESIZER_SPEECH_RATE_MAX
+        )
+
 
 
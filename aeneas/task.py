@@ -43,9 +43,11 @@ class Task(object):
         self.configuration = None
         self.audio_file_path = None # relative to input container root
         self.audio_file_path_absolute = None # concrete path, file will be read from this!
+        self.audio_file_data = None # contents, if the file is held in memory
         self.audio_file = None
         self.text_file_path = None # relative to input container root
         self.text_file_path_absolute = None # concrete path, file will be read from this!
+        self.text_file_data = None # contents, if the file is held in memory
         self.text_file = None
         self.sync_map_file_path = None # relative to output container root
         self.sync_map_file_path_absolute = None # concrete path, file will be written to this!
@@ -91,6 +93,34 @@ class Task(object):
         self.__text_file_path_absolute = text_file_path_absolute
         self._populate_text_file()
 
+    @property
+    def audio_file_data(self):
+        """
+        The contents of the audio file, if it is held in memory,
+        or ``None``.
+
+        :rtype: string
+        """
+        return self.__audio_file_data
+    @audio_file_data.setter
+    def audio_file_data(self, audio_file_data):
+        self.__audio_file_data = audio_file_data
+        self._populate_audio_file()
+
+    @property
+    def text_file_data(self):
+        """
+        The contents of the text file, if it is held in memory,
+        or ``None``.
+
+        :rtype: string
+        """
+        return self.__text_file_data
+    @text_file_data.setter
+    def text_file_data(self, text_file_data):
+        self.__text_file_data = text_file_data
+        self._populate_text_file()
+
     @property
     def sync_map_file_path_absolute(self):
         """
@@ -106,9 +136,16 @@ class Task(object):
     def _populate_audio_file(self):
         """
         Create the ``self.audio_file`` object by reading
-        the audio file at ``self.audio_file_path_absolute``.
+        the audio file at ``self.audio_file_path_absolute``,
+        or the contents in ``self.audio_file_data``.
         """
-        if self.audio_file_path_absolute != None:
+        if getattr(self, "audio_file_data", None) != None:
+            self.audio_file = AudioFile(
+                file_path=self.audio_file_path,
+                logger=None,
+                data=self.audio_file_data
+            )
+        elif self.audio_file_path_absolute != None:
             self.audio_file = AudioFile(
                 file_path=self.audio_file_path_absolute,
                 logger=None
@@ -117,19 +154,25 @@ class Task(object):
     def _populate_text_file(self):
         """
         Create the ``self.text_file`` object by reading
-        the text file at ``self.text_file_path_absolute``.
+        the text file at ``self.text_file_path_absolute``,
+        or the contents in ``self.text_file_data``.
         """
-        if ((self.text_file_path_absolute != None) and
+        data = getattr(self, "text_file_data", None)
+        if (((self.text_file_path_absolute != None) or (data != None)) and
                 (self.configuration.language != None)):
             parameters = dict()
             parameters[gc.PPN_TASK_IS_TEXT_UNPARSED_CLASS_REGEX] = self.configuration.is_text_unparsed_class_regex
             parameters[gc.PPN_TASK_IS_TEXT_UNPARSED_ID_REGEX] = self.configuration.is_text_unparsed_id_regex
             parameters[gc.PPN_TASK_IS_TEXT_UNPARSED_ID_SORT] = self.configuration.is_text_unparsed_id_sort
+            file_path = self.text_file_path_absolute
+            if data != None:
+                file_path = self.text_file_path
             self.text_file = TextFile(
-                file_path=self.text_file_path_absolute,
+                file_path=file_path,
                 file_format=self.configuration.is_text_file_format,
                 parameters=parameters,
-                logger=None
+                logger=None,
+                data=data
             )
             self.text_file.set_language(self.configuration.language)
 
@@ -166,14 +209,39 @@ class Task(object):
             path = self.sync_map_file_path_absolute
 
         sync_map_format = self.configuration.os_file_format
-        parameters = dict()
-        parameters[gc.PPN_TASK_OS_FILE_SMIL_PAGE_REF] = self.configuration.os_file_smil_page_ref
-        parameters[gc.PPN_TASK_OS_FILE_SMIL_AUDIO_REF] = self.configuration.os_file_smil_audio_ref
+        parameters = self._sync_map_parameters()
         result = self.sync_map.output(sync_map_format, path, parameters)
         if not result:
             return None
         return path
 
+    def output_sync_map_string(self):
+        """
+        Return the contents of the sync map file for this task,
+        as a (UTF-8 encoded) string,
+        or ``None`` if an error occurred.
+
+        :rtype: string
+        """
+        if self.sync_map == None:
+            return None
+        return self.sync_map.output_string(
+            self.configuration.os_file_format,
+            self._sync_map_parameters()
+        )
+
+    def _sync_map_parameters(self):
+        """
+        Return the additional parameters for the sync map output
+        (e.g., for SMIL output).
+
+        :rtype: dict
+        """
+        parameters = dict()
+        parameters[gc.PPN_TASK_OS_FILE_SMIL_PAGE_REF] = self.configuration.os_file_smil_page_ref
+        parameters[gc.PPN_TASK_OS_FILE_SMIL_AUDIO_REF] = self.configuration.os_file_smil_audio_ref
+        return parameters
+
 
 
 
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+import numpy
+import os
+import threading
+import unittest
+import urllib2
+
+from . import get_abs_path
+
+from aeneas.alignmentserver import AlignmentServer
+from aeneas.dtw import WaveFeatures
+from aeneas.logger import Logger
+from aeneas.task import Task
+from aeneas.ttsbackend import FakeTTSBackend
+
+class TestAlignmentServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = AlignmentServer(port=0, tts_backend=FakeTTSBackend())
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+
+    def request(self, path, data=None):
+        url = "http://%s:%d%s" % (self.server.server_address + (path,))
+        try:
+            response = urllib2.urlopen(urllib2.Request(url, data))
+            return (response.getcode(), json.loads(response.read()))
+        except urllib2.HTTPError as exc:
+            return (exc.code, json.loads(exc.read()))
+
+    def load_task(self):
+        task = Task("task_language=en|is_text_type=plain|os_task_file_name=output.txt|os_task_file_format=txt")
+        task.text_file_path_absolute = get_abs_path("res/inputtext/sonnet_plain_head.txt")
+        return task
+
+    def test_status(self):
+        code, response = self.request("/status")
+        self.assertEqual(code, 200)
+        self.assertTrue(response["success"])
+        self.assertEqual(response["requests"], 0)
+        self.assertEqual(response["workers"], 1)
+
+    def test_unknown_path(self):
+        code, response = self.request("/foo")
+        self.assertEqual(code, 404)
+        code, response = self.request("/foo", "{}")
+        self.assertEqual(code, 404)
+        self.assertFalse(response["success"])
+
+    def test_bad_json(self):
+        code, response = self.request("/task", "{")
+        self.assertEqual(code, 400)
+        code, response = self.request("/task", "[]")
+        self.assertEqual(code, 400)
+
+    def test_task_missing_key(self):
+        code, response = self.request("/task", json.dumps({"audio_file_path": "/foo.mp3"}))
+        self.assertEqual(code, 400)
+        self.assertTrue("text_file_path" in response["error"])
+
+    def test_task_missing_file(self):
+        request = {
+            "audio_file_path": "/this/file/does/not/exist.mp3",
+            "text_file_path": get_abs_path("res/inputtext/sonnet_plain.txt"),
+            "config_string": "task_language=en|is_text_type=plain|os_task_file_name=output.txt|os_task_file_format=txt"
+        }
+        code, response = self.request("/task", json.dumps(request))
+        self.assertEqual(code, 400)
+        self.assertEqual(self.request("/status")[1]["requests"], 0)
+
+    def test_job_missing_container(self):
+        request = {
+            "container_path": "/this/file/does/not/exist.zip",
+            "output_directory": "/tmp"
+        }
+        code, response = self.request("/job", json.dumps(request))
+        self.assertEqual(code, 400)
+
+    def test_shared_synthesis(self):
+        task = self.load_task()
+        entry = self.server._shared_synthesis(task, FakeTTSBackend())
+        self.assertEqual(len(entry.value[1]), len(task.text_file))
+        again = self.server._shared_synthesis(self.load_task(), FakeTTSBackend())
+        self.assertTrue(again is entry)
+        self.assertEqual(entry.references, 2)
+        self.server.synthesis.release(entry)
+        self.server.synthesis.release(again)
+        self.assertEqual(entry.references, 0)
+        self.assertEqual(self.request("/status")[1]["cached_synthesis"], 1)
+
+    def test_shared_synthesis_eviction(self):
+        self.server.synthesis.size = 1
+        entry = self.server._shared_synthesis(self.load_task(), FakeTTSBackend())
+        self.server.synthesis.release(entry)
+        task = Task("task_language=en|is_text_type=plain|os_task_file_name=output.txt|os_task_file_format=txt")
+        task.text_file_path_absolute = get_abs_path("res/inputtext/sonnet_plain.txt")
+        self.server.synthesis.release(self.server._shared_synthesis(task, FakeTTSBackend()))
+        self.assertEqual(len(self.server.synthesis), 1)
+        self.assertTrue(entry.evicted)
+
+    def test_shared_synthesis_eviction_in_use(self):
+        server = AlignmentServer(port=0, workers=2, tts_backend=FakeTTSBackend())
+        try:
+            server.synthesis.size = 1
+            entry = server._shared_synthesis(self.load_task(), FakeTTSBackend())
+            features = entry.value[0]
+            task = Task("task_language=en|is_text_type=plain|os_task_file_name=output.txt|os_task_file_format=txt")
+            task.text_file_path_absolute = get_abs_path("res/inputtext/sonnet_plain.txt")
+            server.synthesis.release(server._shared_synthesis(task, FakeTTSBackend()))
+            # evicted, but still used by a task
+            self.assertTrue(entry.evicted)
+            self.assertTrue(os.path.isfile(features.path + features.MFCC_EXTENSION))
+            server.synthesis.release(entry)
+            self.assertFalse(os.path.isfile(features.path + features.MFCC_EXTENSION))
+        finally:
+            server.close()
+
+    def test_shared_synthesis_holds_slot(self):
+        self.server.slots.acquire()
+        thread = threading.Thread(
+            target=self.server._shared_synthesis,
+            args=(self.load_task(), FakeTTSBackend())
+        )
+        thread.start()
+        thread.join(0.5)
+        self.assertTrue(thread.is_alive())
+        self.server.slots.release()
+        thread.join()
+        self.assertEqual(len(self.server.synthesis), 1)
+
+    def test_tts_backend_own_logger(self):
+        logger = Logger()
+        tts_backend = self.server._tts_backend(logger)
+        self.assertTrue(tts_backend.logger is logger)
+        self.assertFalse(self.server.tts_backend.logger is logger)
+        self.assertEqual(tts_backend.parameters(), self.server.tts_backend.parameters())
+
+    def test_shared_audio_missing_file(self):
+        self.assertEqual(self.server._shared_audio(_AudioTask("/this/file/does/not/exist.mp3")), None)
+        self.assertEqual(len(self.server.features), 0)
+
+    def test_shared_audio_cached(self):
+        path = get_abs_path("res/inputtext/sonnet_plain.txt")
+        stat = os.stat(path)
+        features = WaveFeatures(numpy.zeros((13, 250)), 10.0, numpy.zeros(250))
+        key = (os.path.realpath(path), stat.st_size, stat.st_mtime)
+        self.server.features.release(self.server.features.add(key, features))
+        entry = self.server._shared_audio(_AudioTask(path))
+        self.assertTrue(entry.value is features)
+        self.server.features.release(entry)
+        self.assertEqual(self.request("/status")[1]["cached_features"], 1)
+
+class _AudioTask(object):
+    """ A task, with the path of its audio file only """
+
+    def __init__(self, audio_file_path_absolute):
+        self.audio_file_path_absolute = audio_file_path_absolute
+
+if __name__ == '__main__':
+    unittest.main()
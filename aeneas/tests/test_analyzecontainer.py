@@ -7,8 +7,8 @@ import unittest
 
 from . import get_abs_path
 
-from aeneas.analyzecontainer import AnalyzeContainer
-from aeneas.container import Container
+from aeneas.analyzecontainer import AnalyzeContainer, _EntryTree
+from aeneas.container import Container, ContainerWriter
 from aeneas.logger import Logger
 
 class TestAnalyzeContainer(unittest.TestCase):
@@ -76,6 +76,44 @@ class TestAnalyzeContainer(unittest.TestCase):
         job = analyzer.analyze()
         self.assertEqual(len(job), 3)
 
+    def test_entry_tree(self):
+        tree = _EntryTree([
+            "config.txt",
+            "assets/01/p001.mp3",
+            "assets/01/p001.xhtml",
+            "assets/01/extra/p001.css",
+            "assets/02/p002.mp3",
+            "assets/zzz/foo.txt",
+            "assetsbis/03/p003.mp3",
+        ])
+        self.assertEqual(tree.directories("."), ["assets", "assetsbis"])
+        self.assertEqual(tree.directories("assets/"), ["01", "02", "zzz"])
+        self.assertEqual(tree.directories("assets/01"), ["extra"])
+        self.assertEqual(tree.directories("nonexistent"), [])
+        self.assertEqual(len(tree.entries(".")), 7)
+        self.assertEqual(sorted(tree.entries("assets/01")), [
+            ("assets/01/extra/p001.css", "extra/p001.css"),
+            ("assets/01/p001.mp3", "p001.mp3"),
+            ("assets/01/p001.xhtml", "p001.xhtml"),
+        ])
+        self.assertEqual(tree.entries("assets/0"), [])
+
+    def test_check_container_txt_paged_many(self):
+        pages = 1000
+        with ContainerWriter(None) as writer:
+            with open(get_abs_path("res/validator/job_txt_config_paged_1/config.txt"), "r") as config_file:
+                writer.add_entry("config.txt", config_file.read())
+            for page in range(1, pages + 1):
+                writer.add_entry("assets/%04d/p%04d.xhtml" % (page, page), "")
+                writer.add_entry("assets/%04d/p%04d.mp3" % (page, page), "")
+            writer.add_entry("assets/zzz/foo.mp3", "")
+        logger = Logger()
+        analyzer = AnalyzeContainer(Container(None, data=writer.data), logger=logger)
+        job = analyzer.analyze()
+        self.assertEqual(len(job), pages)
+        self.assertEqual(job.tasks[-1].text_file_path, "assets/1000/p1000.xhtml")
+        self.assertEqual(len(analyzer.regexes), 3)
+
 if __name__ == '__main__':
     unittest.main()
 
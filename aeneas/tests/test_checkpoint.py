@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from . import get_abs_path
+
+from aeneas.checkpoint import CheckpointStore
+from aeneas.syncmap import SyncMap, SyncMapFragment
+from aeneas.task import Task
+
+class TestCheckpointStore(unittest.TestCase):
+
+    CONFIG_STRING = "task_language=en|is_text_type=plain|os_task_file_name=output.txt|os_task_file_format=txt"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def load_task(self, path="res/inputtext/sonnet_plain.txt", config_string=CONFIG_STRING):
+        task = Task(config_string)
+        task.text_file_path_absolute = get_abs_path(path)
+        return task
+
+    def completed_task(self, path="res/inputtext/sonnet_plain.txt"):
+        task = self.load_task(path)
+        task.sync_map = SyncMap()
+        begin = 0.0
+        for fragment in task.text_file.fragments:
+            task.sync_map.append(SyncMapFragment(fragment, begin, begin + 1.0))
+            begin += 1.0
+        return task
+
+    def test_create_directory(self):
+        directory = os.path.join(self.directory, "sub")
+        CheckpointStore(directory)
+        self.assertTrue(os.path.isdir(directory))
+
+    def test_task_key(self):
+        store = CheckpointStore(self.directory)
+        key1 = store.task_key(self.load_task())
+        key2 = store.task_key(self.load_task())
+        self.assertEqual(len(key1), 40)
+        self.assertEqual(key1, key2)
+
+    def test_task_key_text_changed(self):
+        store = CheckpointStore(self.directory)
+        key1 = store.task_key(self.load_task())
+        key2 = store.task_key(self.load_task("res/inputtext/sonnet_plain_head.txt"))
+        self.assertNotEqual(key1, key2)
+
+    def test_task_key_configuration_changed(self):
+        store = CheckpointStore(self.directory)
+        key1 = store.task_key(self.load_task())
+        key2 = store.task_key(self.load_task(config_string=self.CONFIG_STRING + "|os_task_file_smil_page_ref=p001.xhtml"))
+        self.assertNotEqual(key1, key2)
+
+    def test_task_key_in_memory(self):
+        store = CheckpointStore(self.directory)
+        path = get_abs_path("res/inputtext/sonnet_plain.txt")
+        with open(path, "rb") as text_file:
+            data = text_file.read()
+        task = Task(self.CONFIG_STRING)
+        task.text_file_data = data
+        self.assertEqual(len(task.text_file), len(self.load_task().text_file))
+        self.assertEqual(store.task_key(task), store.task_key(self.load_task()))
+        other = Task(self.CONFIG_STRING)
+        other.text_file_data = data + "\nfoo"
+        self.assertNotEqual(store.task_key(other), store.task_key(task))
+
+    def test_load_missing(self):
+        store = CheckpointStore(self.directory)
+        self.assertEqual(store.load(self.load_task()), None)
+
+    def test_save_no_sync_map(self):
+        store = CheckpointStore(self.directory)
+        self.assertFalse(store.save(self.load_task()))
+
+    def test_save_load(self):
+        store = CheckpointStore(self.directory)
+        task = self.completed_task()
+        self.assertTrue(store.save(task))
+        resumed = self.load_task()
+        sync_map = CheckpointStore(self.directory).load(resumed)
+        self.assertNotEqual(sync_map, None)
+        self.assertEqual(len(sync_map), len(task.sync_map))
+        for original, loaded in zip(task.sync_map.fragments, sync_map.fragments):
+            self.assertEqual(original.text_fragment.identifier, loaded.text_fragment.identifier)
+            self.assertEqual(original.begin, loaded.begin)
+            self.assertEqual(original.end, loaded.end)
+
+    def test_load_corrupted(self):
+        store = CheckpointStore(self.directory)
+        task = self.completed_task()
+        store.save(task)
+        path = os.path.join(self.directory, store.task_key(task) + CheckpointStore.EXTENSION)
+        with open(path, "wb") as checkpoint_file:
+            checkpoint_file.write("{")
+        self.assertEqual(store.load(self.load_task()), None)
+
+    def test_clean(self):
+        store = CheckpointStore(self.directory)
+        task1 = self.completed_task()
+        task2 = self.completed_task("res/inputtext/sonnet_plain_head.txt")
+        store.save(task1)
+        store.save(task2)
+        self.assertEqual(store.clean([task1]), 1)
+        self.assertNotEqual(store.load(self.load_task()), None)
+        self.assertEqual(store.load(self.load_task("res/inputtext/sonnet_plain_head.txt")), None)
+
+    def test_clean_keeps_other_files(self):
+        store = CheckpointStore(self.directory)
+        path = os.path.join(self.directory, "other.txt")
+        with open(path, "wb") as other_file:
+            other_file.write("other")
+        self.assertEqual(store.clean([]), 0)
+        self.assertTrue(os.path.isfile(path))
+
+if __name__ == '__main__':
+    unittest.main()
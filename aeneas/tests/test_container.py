@@ -1,15 +1,19 @@
 #!/usr/bin/env python
 # coding=utf-8
 
+import gzip
 import os
 import shutil
 import sys
+import tarfile
 import tempfile
 import unittest
+import zipfile
 
 from . import get_abs_path
 
-from aeneas.container import Container, ContainerFormat
+from aeneas.container import Container, ContainerFormat, ContainerWriter, compression_level
+import aeneas.globalconstants as gc
 
 class TestContainer(unittest.TestCase):
 
@@ -207,8 +211,52 @@ class TestContainer(unittest.TestCase):
         cont.decompress(output_path)
         copy = Container(output_path, ContainerFormat.UNPACKED)
         self.assertEqual(copy.entries(), self.EXPECTED_ENTRIES)
+        # not hard linked to the original files, by default
+        self.assertNotEqual(
+            os.stat(os.path.join(file_path, "config.txt")).st_ino,
+            os.stat(os.path.join(output_path, "config.txt")).st_ino
+        )
         shutil.rmtree(output_path)
 
+    def test_decompress_entries(self):
+        entries = ["./assets/p001.mp3", "config.txt", "not/existing.txt"]
+        for file_path in [self.JOB_ZIP, self.JOB_TAR_GZ, self.JOB_UNPACKED]:
+            output_path = tempfile.mkdtemp()
+            cont = Container(file_path)
+            cont.decompress(output_path, entries=entries)
+            cont.close()
+            copy = Container(output_path, ContainerFormat.UNPACKED)
+            self.assertEqual(copy.entries(), ["assets/p001.mp3", "config.txt"])
+            shutil.rmtree(output_path)
+
+    def test_decompress_zip_parallel(self):
+        for workers in [1, 2, 8]:
+            output_path = tempfile.mkdtemp()
+            cont = Container(self.JOB_ZIP, decompression_workers=workers)
+            cont.decompress(output_path)
+            copy = Container(output_path, ContainerFormat.UNPACKED)
+            self.assertEqual(copy.entries(), self.EXPECTED_ENTRIES)
+            for entry in self.EXPECTED_ENTRIES:
+                self.assertEqual(copy.read_entry(entry), cont.read_entry(entry))
+            cont.close()
+            shutil.rmtree(output_path)
+
+    def test_decompress_zip_unsafe(self):
+        directory = tempfile.mkdtemp()
+        file_path = os.path.join(directory, "unsafe.zip")
+        zip_file = zipfile.ZipFile(file_path, "w")
+        zip_file.writestr("foo.txt", "foo")
+        zip_file.writestr("../bar.txt", "bar")
+        zip_file.close()
+        output_path = os.path.join(directory, "output")
+        os.makedirs(output_path)
+        cont = Container(file_path, decompression_workers=4)
+        cont.decompress(output_path)
+        cont.close()
+        self.assertEqual(os.listdir(output_path), [])
+        self.assertFalse(os.path.exists(os.path.join(directory, "bar.txt")))
+        shutil.rmtree(directory)
+
     def test_compress_zip(self):
         input_path = self.JOB_UNPACKED
         handler, output_path = tempfile.mkstemp(suffix=".zip")
@@ -272,6 +320,219 @@ class TestContainer(unittest.TestCase):
         self.assertFalse(cont.find_entry(entry, exact=True))
         self.assertFalse(cont.find_entry(entry, exact=False))
 
+    def test_entries_indexed_once(self):
+        cont = Container(self.JOB_ZIP)
+        self.assertEqual(cont.entries(), self.EXPECTED_ENTRIES)
+        cont.actual_container.entries = None
+        self.assertEqual(cont.entries(), self.EXPECTED_ENTRIES)
+        self.assertEqual(cont.find_entry("p002.mp3", exact=False), "assets/p002.mp3")
+        self.assertTrue(cont.is_safe)
+        cont.close()
+
+    def test_entries_returns_copy(self):
+        cont = Container(self.JOB_ZIP)
+        cont.entries().append("foo")
+        self.assertEqual(cont.entries(), self.EXPECTED_ENTRIES)
+        cont.close()
+
+    def test_archive_handle_kept_open(self):
+        for file_path in [self.JOB_ZIP, self.JOB_TAR_GZ]:
+            cont = Container(file_path)
+            cont.entries()
+            actual = cont.actual_container
+            handle = actual._archive()
+            self.assertNotEqual(cont.read_entry("config.txt"), None)
+            self.assertNotEqual(cont.read_entry("assets/p001.xhtml"), None)
+            self.assertTrue(actual._archive() is handle)
+            cont.close()
+            self.assertNotEqual(cont.read_entry("config.txt"), None)
+            self.assertFalse(actual._archive() is handle)
+            cont.close()
+
+    def test_context_manager(self):
+        with Container(self.JOB_TAR_BZ2) as cont:
+            self.assertEqual(len(cont.read_entry("config.txt")), 599)
+            actual = cont.actual_container
+        self.assertEqual(actual.tar_file, None)
+
+    def test_compress_resets_index(self):
+        handler, output_path = tempfile.mkstemp(suffix=".zip")
+        os.close(handler)
+        os.remove(output_path)
+        cont = Container(output_path, ContainerFormat.ZIP)
+        self.assertEqual(cont.entries(), [])
+        cont.compress(self.JOB_UNPACKED)
+        self.assertEqual(cont.entries(), self.EXPECTED_ENTRIES)
+        self.assertTrue(cont.find_entry("config.txt", exact=True))
+        cont.close()
+        os.remove(output_path)
+
+    def test_infer_format(self):
+        self.assertEqual(Container.infer_format("foo.ZIP"), ContainerFormat.ZIP)
+        self.assertEqual(Container.infer_format("foo.tar.bz2"), ContainerFormat.TAR_BZ2)
+        self.assertEqual(Container.infer_format("foo"), ContainerFormat.UNPACKED)
+
+    def test_writer(self):
+        for suffix in [".zip", ".epub", ".tar", ".tar.gz", ".tar.bz2", ""]:
+            directory = tempfile.mkdtemp()
+            output_path = os.path.join(directory, "output" + suffix)
+            with ContainerWriter(output_path) as writer:
+                writer.add_entry("foo/bar.txt", "bar")
+                writer.add_entry("./baz.txt", u"bàz".encode("utf-8"))
+            copy = Container(output_path)
+            self.assertEqual(copy.entries(), ["baz.txt", "foo/bar.txt"])
+            self.assertEqual(copy.read_entry("foo/bar.txt"), "bar")
+            self.assertEqual(copy.read_entry("baz.txt"), u"bàz".encode("utf-8"))
+            copy.close()
+            shutil.rmtree(directory)
+
+    def test_writer_abort(self):
+        directory = tempfile.mkdtemp()
+        for name in ["output.zip", "output"]:
+            writer = ContainerWriter(os.path.join(directory, name))
+            writer.add_entry("foo/bar.txt", "bar")
+            writer.abort()
+            self.assertEqual(os.listdir(directory), [])
+        shutil.rmtree(directory)
+
+    def test_compression_level(self):
+        self.assertEqual(compression_level(ContainerFormat.ZIP), gc.CONTAINER_ZIP_COMPRESSION_LEVEL)
+        self.assertEqual(compression_level(ContainerFormat.TAR_GZ), gc.CONTAINER_TAR_GZ_COMPRESSION_LEVEL)
+        self.assertEqual(compression_level(ContainerFormat.TAR_BZ2, 3), 3)
+        self.assertEqual(compression_level(ContainerFormat.TAR), None)
+        self.assertEqual(compression_level(ContainerFormat.UNPACKED), None)
+
+    def test_compress_zip_levels(self):
+        directory = tempfile.mkdtemp()
+        for level in [0, 1, 6, 9]:
+            for workers in [1, 3]:
+                output_path = os.path.join(directory, "output_%d_%d.zip" % (level, workers))
+                cont = Container(output_path, compression_level=level, compression_workers=workers)
+                cont.compress(self.JOB_UNPACKED)
+                zip_file = zipfile.ZipFile(output_path)
+                self.assertEqual(zip_file.testzip(), None)
+                expected = zipfile.ZIP_DEFLATED
+                if level == 0:
+                    expected = zipfile.ZIP_STORED
+                for info in zip_file.infolist():
+                    self.assertEqual(info.compress_type, expected)
+                zip_file.close()
+                self.assertEqual(cont.entries(), self.EXPECTED_ENTRIES)
+                self.assertEqual(len(cont.read_entry("config.txt")), 599)
+                cont.close()
+        stored = os.path.getsize(os.path.join(directory, "output_0_1.zip"))
+        deflated = os.path.getsize(os.path.join(directory, "output_9_1.zip"))
+        self.assertTrue(deflated < stored)
+        self.assertEqual(deflated, os.path.getsize(os.path.join(directory, "output_9_3.zip")))
+        shutil.rmtree(directory)
+
+    def test_compress_tar_gz_parallel(self):
+        directory = tempfile.mkdtemp()
+        for workers in [1, 4]:
+            output_path = os.path.join(directory, "output_%d.tar.gz" % workers)
+            cont = Container(output_path, compression_level=6, compression_workers=workers)
+            cont.compress(self.JOB_UNPACKED)
+            self.assertEqual(cont.entries(), self.EXPECTED_ENTRIES)
+            self.assertEqual(len(cont.read_entry("config.txt")), 599)
+            cont.close()
+            gzip_file = gzip.open(output_path)
+            self.assertTrue(len(gzip_file.read()) > 0)
+            gzip_file.close()
+        sequential = tarfile.open(os.path.join(directory, "output_1.tar.gz"), "r:gz")
+        parallel = tarfile.open(os.path.join(directory, "output_4.tar.gz"), "r:gz")
+        for entry in self.EXPECTED_ENTRIES:
+            self.assertEqual(
+                sequential.extractfile(entry).read(),
+                parallel.extractfile(entry).read()
+            )
+        sequential.close()
+        parallel.close()
+        shutil.rmtree(directory)
+
+    def test_compress_tar_bz2_level(self):
+        handler, output_path = tempfile.mkstemp(suffix=".tar.bz2")
+        os.close(handler)
+        cont = Container(output_path, compression_level=1, compression_workers=2)
+        cont.compress(self.JOB_UNPACKED)
+        self.assertEqual(cont.entries(), self.EXPECTED_ENTRIES)
+        cont.close()
+        os.remove(output_path)
+
+    def test_writer_parallel(self):
+        contents = "".join(["%06d " % i for i in range(300000)])
+        for suffix in [".zip", ".tar.gz"]:
+            directory = tempfile.mkdtemp()
+            output_path = os.path.join(directory, "output" + suffix)
+            with ContainerWriter(output_path, compression_level=6, compression_workers=3) as writer:
+                for i in range(10):
+                    writer.add_entry("foo/%d.txt" % i, contents[i:])
+            if suffix == ".zip":
+                zip_file = zipfile.ZipFile(output_path)
+                self.assertEqual(zip_file.testzip(), None)
+                zip_file.close()
+            copy = Container(output_path)
+            self.assertEqual(len(copy.entries()), 10)
+            self.assertEqual(copy.read_entry("foo/7.txt"), contents[7:])
+            copy.close()
+            self.assertTrue(os.path.getsize(output_path) < 5 * len(contents))
+            shutil.rmtree(directory)
+
+    def test_writer_abort_parallel(self):
+        directory = tempfile.mkdtemp()
+        writer = ContainerWriter(os.path.join(directory, "output.tar.gz"), compression_workers=2)
+        writer.add_entry("foo/bar.txt", "bar")
+        writer.abort()
+        self.assertEqual(os.listdir(directory), [])
+        shutil.rmtree(directory)
+
+    def test_in_memory(self):
+        for file_path in [self.JOB_ZIP, self.JOB_EPUB, self.JOB_TAR, self.JOB_TAR_GZ, self.JOB_TAR_BZ2]:
+            with open(file_path, "rb") as container_file:
+                data = container_file.read()
+            with Container(None, data=data) as cont:
+                self.assertTrue(cont.exists())
+                self.assertTrue(cont.is_safe)
+                self.assertEqual(cont.entries(), self.EXPECTED_ENTRIES)
+                self.assertEqual(len(cont.read_entry("config.txt")), 599)
+                output_path = tempfile.mkdtemp()
+                cont.decompress(output_path, entries=["config.txt"])
+                self.assertEqual(os.listdir(output_path), ["config.txt"])
+                shutil.rmtree(output_path)
+
+    def test_in_memory_format(self):
+        with open(self.JOB_TAR_GZ, "rb") as container_file:
+            data = container_file.read()
+        self.assertEqual(Container(None, data=data).container_format, ContainerFormat.TAR_GZ)
+        self.assertEqual(Container.infer_format_from_data("PK\x03\x04"), ContainerFormat.ZIP)
+        self.assertEqual(Container.infer_format_from_data("BZh9"), ContainerFormat.TAR_BZ2)
+        self.assertEqual(Container.infer_format_from_data("foo"), ContainerFormat.TAR)
+        with self.assertRaises(ValueError):
+            Container(None, ContainerFormat.UNPACKED, data=data)
+
+    def test_in_memory_compress(self):
+        with open(self.JOB_ZIP, "rb") as container_file:
+            data = container_file.read()
+        cont = Container(None, data=data)
+        cont.compress(self.JOB_UNPACKED)
+        self.assertEqual(cont.data, data)
+
+    def test_writer_in_memory(self):
+        for container_format in [None, ContainerFormat.ZIP, ContainerFormat.TAR, ContainerFormat.TAR_GZ, ContainerFormat.TAR_BZ2]:
+            for workers in [1, 2]:
+                with ContainerWriter(None, container_format, compression_workers=workers) as writer:
+                    writer.add_entry("foo/bar.txt", "bar")
+                    self.assertEqual(writer.data, None)
+                copy = Container(None, container_format, data=writer.data)
+                self.assertEqual(copy.entries(), ["foo/bar.txt"])
+                self.assertEqual(copy.read_entry("foo/bar.txt"), "bar")
+                copy.close()
+        with self.assertRaises(ValueError):
+            ContainerWriter(None, ContainerFormat.UNPACKED)
+        writer = ContainerWriter(None)
+        writer.add_entry("foo/bar.txt", "bar")
+        writer.abort()
+        self.assertEqual(writer.data, None)
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import numpy
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from scikits.audiolab import wavwrite
+
+from . import get_abs_path
+
+from aeneas.dtw import DTWAligner, DTWAlgorithm, DTWStripe, WaveFeatures
+from aeneas.logger import Logger
+from aeneas.textfile import TextFile, TextFileFormat
+from aeneas.ttsbackend import FakeTTSBackend
+
+class TestDTW(unittest.TestCase):
+
+    def load_shifted(self):
+        # the real wave is the synt wave preceded by 150 frames of noise,
+        # so the min cost path is far from the diagonal
+        random = numpy.random.RandomState(0)
+        mfcc2 = random.uniform(-1.0, 1.0, (13, 300))
+        mfcc1 = numpy.concatenate((random.uniform(-1.0, 1.0, (13, 150)), mfcc2), axis=1)
+        return (mfcc1, mfcc2)
+
+    def load_aligner(self, algorithm, auto_margin):
+        mfcc1, mfcc2 = self.load_shifted()
+        aligner = DTWAligner(
+            None,
+            None,
+            frame_rate=5,
+            margin=20,
+            algorithm=algorithm,
+            auto_margin=auto_margin
+        )
+        aligner.wave_mfcc_1 = mfcc1
+        aligner.wave_mfcc_2 = mfcc2
+        return aligner
+
+    def test_stripe_path(self):
+        mfcc1, mfcc2 = self.load_shifted()
+        path = DTWStripe(mfcc1, mfcc2, 250, Logger()).compute_path()
+        self.assertEqual(path[0], (0, 0))
+        self.assertEqual(path[-1], (449, 299))
+
+    def test_stripe_touches_band_edge(self):
+        mfcc1, mfcc2 = self.load_shifted()
+        dtw = DTWStripe(mfcc1, mfcc2, 20, Logger())
+        self.assertTrue(dtw.touches_band_edge(dtw.compute_path()))
+        dtw = DTWStripe(mfcc1, mfcc2, 300, Logger())
+        self.assertFalse(dtw.touches_band_edge(dtw.compute_path()))
+
+    def test_auto_margin_stripe(self):
+        aligner = self.load_aligner(DTWAlgorithm.STRIPE, False)
+        aligner.compute_path()
+        self.assertEqual(aligner.computed_delta, 200)
+        expected = aligner.computed_path
+        aligner = self.load_aligner(DTWAlgorithm.STRIPE, True)
+        aligner.compute_path()
+        self.assertLessEqual(aligner.computed_delta, 200)
+        self.assertEqual(aligner.computed_path, expected)
+
+    def test_auto_margin_stripe_not_optimized(self):
+        aligner = self.load_aligner(DTWAlgorithm.STRIPE_NOT_OPTIMIZED, False)
+        aligner.compute_path()
+        expected = aligner.computed_path
+        aligner = self.load_aligner(DTWAlgorithm.STRIPE_NOT_OPTIMIZED, True)
+        aligner.compute_path()
+        self.assertLessEqual(aligner.computed_delta, 200)
+        self.assertEqual(aligner.computed_path, expected)
+
+    def test_exact_when_margin_too_large(self):
+        aligner = self.load_aligner(DTWAlgorithm.STRIPE, True)
+        aligner.margin = 60
+        aligner.compute_path()
+        self.assertEqual(aligner.computed_delta, None)
+        self.assertEqual(aligner.computed_path[-1], (449, 299))
+
+    def write_wave(self, samples, sample_rate):
+        handler, path = tempfile.mkstemp(suffix=".wav")
+        os.close(handler)
+        wavwrite(samples, path, sample_rate)
+        return path
+
+    def load_trimmed_aligner(self, trim_nonspeech):
+        # real wave: 3s silence, 5s noise, speech, 3s silence
+        tfl = TextFile(get_abs_path("res/inputtext/sonnet_plain.txt"), TextFileFormat.PLAIN)
+        speech, sample_rate, durations = FakeTTSBackend().synthesize(tfl.fragments[0:4])
+        random = numpy.random.RandomState(0)
+        silence = random.uniform(-0.001, 0.001, 3 * sample_rate)
+        noise = random.uniform(-0.3, 0.3, 5 * sample_rate)
+        real = numpy.concatenate((silence, noise, speech, silence))
+        self.paths = [
+            self.write_wave(real, sample_rate),
+            self.write_wave(speech, sample_rate)
+        ]
+        aligner = DTWAligner(
+            self.paths[0],
+            self.paths[1],
+            trim_nonspeech=trim_nonspeech
+        )
+        aligner.compute_mfcc()
+        return (aligner, 8.0, 8.0 + sum(durations))
+
+    def remove_waves(self):
+        for path in self.paths:
+            os.remove(path)
+
+    def test_speech_interval(self):
+        aligner, speech_start, speech_end = self.load_trimmed_aligner(True)
+        start, end = aligner.compute_speech_interval()
+        self.assertGreater(start / 25.0, speech_start - 1.5)
+        self.assertLessEqual(start / 25.0, speech_start)
+        self.assertGreaterEqual(end / 25.0, speech_end)
+        self.assertLess(end / 25.0, speech_end + 1.5)
+        self.remove_waves()
+
+    def test_trim_nonspeech(self):
+        aligner, speech_start, speech_end = self.load_trimmed_aligner(True)
+        aligner.compute_path()
+        start, end = aligner.speech_interval
+        self.assertEqual(aligner.computed_path[0], (start, 0))
+        self.assertEqual(aligner.computed_path[-1][0], end - 1)
+        self.remove_waves()
+
+    def test_no_trim_nonspeech(self):
+        aligner, speech_start, speech_end = self.load_trimmed_aligner(False)
+        aligner.compute_path()
+        self.assertEqual(aligner.speech_interval, None)
+        self.assertEqual(aligner.computed_path[0], (0, 0))
+        self.assertEqual(aligner.computed_path[-1][0], aligner.wave_mfcc_1.shape[1] - 1)
+        self.remove_waves()
+
+    def load_paused_aligner(self, compress_pauses):
+        # real wave: speech, 6s silence, speech
+        tfl = TextFile(get_abs_path("res/inputtext/sonnet_plain.txt"), TextFileFormat.PLAIN)
+        backend = FakeTTSBackend()
+        speech_1, sample_rate, durations_1 = backend.synthesize(tfl.fragments[0:2])
+        speech_2, sample_rate, durations_2 = backend.synthesize(tfl.fragments[2:4])
+        silence = numpy.random.RandomState(0).uniform(-0.001, 0.001, 6 * sample_rate)
+        real = numpy.concatenate((speech_1, silence, speech_2))
+        synt = numpy.concatenate((speech_1, speech_2))
+        self.paths = [
+            self.write_wave(real, sample_rate),
+            self.write_wave(synt, sample_rate)
+        ]
+        aligner = DTWAligner(
+            self.paths[0],
+            self.paths[1],
+            compress_pauses=compress_pauses
+        )
+        aligner.compute_mfcc()
+        return (aligner, sum(durations_1))
+
+    def test_compress_pauses(self):
+        aligner, pause_start = self.load_paused_aligner(True)
+        n = aligner.wave_mfcc_1.shape[1]
+        m = aligner.wave_mfcc_2.shape[1]
+        kept = aligner.compute_kept_frames()
+        self.assertLess(len(kept), n - 4 * 25)
+        aligner.compute_path()
+        path = aligner.computed_path
+        self.assertEqual(path[0], (0, 0))
+        self.assertEqual(path[-1], (n - 1, m - 1))
+        for k in range(1, len(path)):
+            self.assertLessEqual(path[k][0] - path[k-1][0], 1)
+        # the second half of the synt wave starts after the pause
+        synt_frame = int(pause_start * 25) + 5
+        real_frame = min([i for (i, j) in aligner.computed_path if j == synt_frame])
+        self.assertGreater(real_frame / 25.0, pause_start + 5.0)
+        self.remove_waves()
+
+    def test_no_compress_pauses(self):
+        aligner, pause_start = self.load_paused_aligner(False)
+        n = aligner.wave_mfcc_1.shape[1]
+        self.assertEqual(len(aligner.compute_kept_frames()), n)
+        self.remove_waves()
+
+    def load_features(self):
+        random = numpy.random.RandomState(0)
+        mfcc = random.uniform(-1.0, 1.0, (13, 251))
+        energy = random.uniform(-60.0, 0.0, 251)
+        return WaveFeatures(mfcc, 10.0, energy, 25)
+
+    def test_wave_features_slice_whole(self):
+        features = self.load_features()
+        whole = features.slice()
+        self.assertEqual(whole.length, 10.0)
+        self.assertEqual(whole.mfcc.shape, (13, 251))
+
+    def test_wave_features_slice(self):
+        features = self.load_features()
+        window = features.slice(2.0, 4.0)
+        self.assertEqual(window.length, 4.0)
+        self.assertEqual(window.mfcc.shape, (13, 101))
+        self.assertEqual(len(window.energy), 101)
+        self.assertTrue((window.mfcc == features.mfcc[:, 50:151]).all())
+        # no copy
+        self.assertTrue(numpy.may_share_memory(window.mfcc, features.mfcc))
+
+    def test_wave_features_slice_head_only(self):
+        features = self.load_features()
+        window = features.slice(6.0)
+        self.assertEqual(window.length, 4.0)
+        self.assertEqual(window.mfcc.shape, (13, 101))
+
+    def test_wave_features_slice_past_end(self):
+        features = self.load_features()
+        window = features.slice(8.0, 5.0)
+        self.assertEqual(window.length, 2.0)
+        self.assertEqual(window.mfcc.shape, (13, 51))
+
+    def test_wave_features_from_file(self):
+        random = numpy.random.RandomState(0)
+        samples = random.uniform(-0.3, 0.3, 22050 * 4)
+        path = self.write_wave(samples, 22050)
+        features = WaveFeatures.from_file(path)
+        os.remove(path)
+        self.assertAlmostEqual(features.length, 4.0)
+        self.assertEqual(features.mfcc.shape[1], len(features.energy))
+        self.assertEqual(features.mfcc.shape[1], 101)
+
+    def test_wave_features_share(self):
+        features = self.load_features()
+        mfcc = numpy.array(features.mfcc)
+        directory = tempfile.mkdtemp()
+        try:
+            features.share(os.path.join(directory, "shared"))
+            self.assertTrue(isinstance(features.mfcc, numpy.memmap))
+            self.assertFalse(features.mfcc.flags.writeable)
+            self.assertTrue((features.mfcc == mfcc).all())
+            # pickling a shared slice sends only its path
+            window = features.slice(2.0, 4.0)
+            pickled = pickle.dumps(window, pickle.HIGHEST_PROTOCOL)
+            self.assertLess(len(pickled), 1000)
+            unpickled = pickle.loads(pickled)
+            self.assertEqual(unpickled.length, 4.0)
+            self.assertTrue((unpickled.mfcc == mfcc[:, 50:151]).all())
+            self.assertEqual(len(unpickled.energy), 101)
+            del features, window, unpickled
+        finally:
+            shutil.rmtree(directory)
+
+    def test_wave_features_pickle_not_shared(self):
+        features = self.load_features()
+        unpickled = pickle.loads(pickle.dumps(features.slice(2.0, 4.0), pickle.HIGHEST_PROTOCOL))
+        self.assertTrue((unpickled.mfcc == features.mfcc[:, 50:151]).all())
+
+    def test_aligner_synt_features(self):
+        features = self.load_features()
+        aligner = DTWAligner(None, "/this/file/does/not/exist", synt_features=features)
+        aligner.compute_mfcc()
+        self.assertTrue(aligner.wave_mfcc_2 is features.mfcc)
+        self.assertEqual(aligner.wave_len_2, 10.0)
+
+    def test_aligner_real_features(self):
+        features = self.load_features()
+        aligner = DTWAligner("/this/file/does/not/exist", None, real_features=features)
+        aligner.compute_mfcc()
+        self.assertTrue(aligner.wave_mfcc_1 is features.mfcc)
+        self.assertEqual(aligner.wave_len_1, 10.0)
+
+    def test_mfcc_computer_cached(self):
+        computer = DTWAligner._mfcc_computer(16000, 25)
+        computer.prior = 1.0
+        again = DTWAligner._mfcc_computer(16000, 25)
+        self.assertFalse(again is computer)
+        self.assertTrue(again.filters is computer.filters)
+        self.assertEqual(again.prior, 0)
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+
@@ -31,6 +31,17 @@ class TestESPEAKWrapper(unittest.TestCase):
         os.close(handler)
         os.remove(output_file_path)
 
+    def test_synthesize_speed(self):
+        text = u"Nel mezzo del cammin di nostra vita"
+        language = Language.IT
+        handler, output_file_path = tempfile.mkstemp(suffix=".wav")
+        espeak = ESPEAKWrapper()
+        result_default = espeak.synthesize(text, language, output_file_path)
+        result_slow = espeak.synthesize(text, language, output_file_path, speed=100)
+        self.assertGreater(result_slow, result_default)
+        os.close(handler)
+        os.remove(output_file_path)
+
     def test_none_text(self):
         text = None
         language = Language.IT
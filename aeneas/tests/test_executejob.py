@@ -0,0 +1,425 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import multiprocessing
+import os
+import shutil
+import StringIO
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+
+from . import get_abs_path
+
+from aeneas.checkpoint import CheckpointStore
+from aeneas.executejob import ExecuteJob
+from aeneas.executetask import ExecuteTask
+from aeneas.job import Job
+from aeneas.language import Language
+from aeneas.memorygovernor import MemoryGovernor
+from aeneas.syncmap import SyncMap, SyncMapFragment
+from aeneas.task import Task
+from aeneas.textfile import TextFile, TextFileFormat
+from aeneas.ttsbackend import FakeTTSBackend
+
+class TestExecuteJob(unittest.TestCase):
+
+    def test_estimate_task_cost_empty(self):
+        task = Task()
+        self.assertEqual(ExecuteJob().estimate_task_cost(task), 0.0)
+
+    def test_estimate_task_cost_fragments(self):
+        task = Task()
+        task.text_file = TextFile(get_abs_path("res/inputtext/sonnet_plain.txt"), TextFileFormat.PLAIN)
+        task.text_file.set_language(Language.EN)
+        self.assertGreater(ExecuteJob().estimate_task_cost(task), 0.0)
+
+    def test_longest_first(self):
+        self.assertEqual(ExecuteJob.longest_first([]), [])
+        self.assertEqual(ExecuteJob.longest_first([1.0, 5.0, 3.0, 5.0]), [1, 3, 2, 0])
+
+    def test_predict_makespan(self):
+        self.assertEqual(ExecuteJob.predict_makespan([], 2), 0.0)
+        self.assertEqual(ExecuteJob.predict_makespan([3.0, 1.0, 1.0, 1.0], 1), 6.0)
+        self.assertEqual(ExecuteJob.predict_makespan([3.0, 1.0, 1.0, 1.0], 2), 3.0)
+        self.assertEqual(ExecuteJob.predict_makespan([1.0, 1.0, 1.0, 3.0], 2), 4.0)
+
+    def test_plan_task_processed_window(self):
+        task = Task("task_language=en|is_text_type=plain|is_audio_file_head_length=2|is_audio_file_process_length=5|os_task_file_name=output.txt|os_task_file_format=txt")
+        task.audio_file = _AudioFile()
+        self.assertEqual(ExecuteTask.processed_audio_length(task), 5.0)
+        algorithm, margin, memory = ExecuteJob()._plan_task(task)
+        self.assertEqual(memory, MemoryGovernor.estimate_peak_memory(5.0))
+        self.assertEqual(ExecuteTask.processed_audio_length(Task()), None)
+
+    def test_execute_resumed_from_checkpoints(self):
+        directory = tempfile.mkdtemp()
+        try:
+            task = Task("task_language=en|is_text_type=plain|os_task_file_name=output.txt|os_task_file_format=txt")
+            task.text_file_path_absolute = get_abs_path("res/inputtext/sonnet_plain.txt")
+            task.sync_map = SyncMap()
+            for fragment in task.text_file.fragments:
+                task.sync_map.append(SyncMapFragment(fragment, 0.0, 1.0))
+            CheckpointStore(directory).save(task)
+            task.sync_map = None
+            job = Job()
+            job.add_task(task)
+            executor = ExecuteJob(job, checkpoint_directory=directory)
+            self.assertTrue(executor.execute())
+            self.assertEqual(len(task.sync_map), len(task.text_file.fragments))
+        finally:
+            shutil.rmtree(directory)
+
+    def load_output_job(self, tasks=2):
+        job = Job("job_language=en|os_job_file_name=output|os_job_file_container=zip")
+        for index in range(tasks):
+            task = Task("task_language=en|is_text_type=plain|os_task_file_name=output.txt|os_task_file_format=txt")
+            task.text_file_path_absolute = get_abs_path("res/inputtext/sonnet_plain.txt")
+            task.sync_map_file_path = "task%d/output.txt" % index
+            task.sync_map = SyncMap()
+            for fragment in task.text_file.fragments:
+                task.sync_map.append(SyncMapFragment(fragment, 0.0, 1.0))
+            job.add_task(task)
+        return job
+
+    def test_write_output_container(self):
+        directory = tempfile.mkdtemp()
+        try:
+            executor = ExecuteJob(self.load_output_job())
+            result, path = executor.write_output_container(directory)
+            self.assertTrue(result)
+            self.assertEqual(path, os.path.join(directory, "output.zip"))
+            output = zipfile.ZipFile(path)
+            self.assertEqual(sorted(output.namelist()), ["task0/output.txt", "task1/output.txt"])
+            output.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_write_output_container_streamed(self):
+        directory = tempfile.mkdtemp()
+        try:
+            job = self.load_output_job()
+            executor = ExecuteJob(job)
+            self.assertTrue(executor.open_output_container(directory))
+            executor._complete_task(job.tasks[1])
+            self.assertEqual(executor.output_tasks, set([job.tasks[1].identifier]))
+            result, path = executor.write_output_container(None)
+            self.assertTrue(result)
+            output = zipfile.ZipFile(path)
+            self.assertEqual(output.namelist(), ["task1/output.txt", "task0/output.txt"])
+            output.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_write_output_container_failed(self):
+        directory = tempfile.mkdtemp()
+        try:
+            job = self.load_output_job()
+            job.tasks[1].sync_map = None
+            executor = ExecuteJob(job)
+            self.assertEqual(executor.write_output_container(directory), (False, None))
+            self.assertEqual(os.listdir(directory), [])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_clean_removes_open_output_container(self):
+        directory = tempfile.mkdtemp()
+        try:
+            executor = ExecuteJob(self.load_output_job())
+            self.assertTrue(executor.open_output_container(directory))
+            executor.clean()
+            self.assertEqual(os.listdir(directory), [])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_write_output_container_in_memory(self):
+        executor = ExecuteJob(self.load_output_job())
+        result, path = executor.write_output_container(None)
+        self.assertTrue(result)
+        self.assertEqual(path, None)
+        output = zipfile.ZipFile(StringIO.StringIO(executor.output_container_data))
+        self.assertEqual(sorted(output.namelist()), ["task0/output.txt", "task1/output.txt"])
+        output.close()
+
+    def test_load_job_from_container_in_memory(self):
+        with open(get_abs_path("res/container/job.zip"), "rb") as container_file:
+            data = container_file.read()
+        executor = ExecuteJob()
+        self.assertTrue(executor.load_job_from_container("job.zip", container_data=data))
+        self.assertEqual(executor.working_directory, None)
+        for task in executor.job.tasks:
+            self.assertEqual(task.audio_file_path_absolute, None)
+            self.assertNotEqual(task.audio_file_data, None)
+            self.assertTrue(len(task.text_file) > 0)
+        executor.clean()
+
+    def load_text_task(self, path):
+        task = Task("task_language=en|is_text_type=plain|os_task_file_name=output.txt|os_task_file_format=txt")
+        task.text_file_path_absolute = get_abs_path(path)
+        return task
+
+    def test_execute_share_cached(self):
+        directory = tempfile.mkdtemp()
+        try:
+            job = self.load_text_job()
+            for task in job.tasks:
+                task.sync_map = SyncMap()
+                for fragment in task.text_file.fragments:
+                    task.sync_map.append(SyncMapFragment(fragment, 0.0, 1.0))
+                ExecuteTask(task, tts_backend=FakeTTSBackend(), cache_directory=directory)._cache().save(task)
+                task.sync_map = None
+            executor = ExecuteJob(
+                job,
+                tts_backend=FakeTTSBackend(),
+                cache_directory=directory,
+                share_audio=True,
+                share_synthesis=True
+            )
+            self.assertTrue(executor.execute())
+            for task in job.tasks:
+                self.assertEqual(len(task.sync_map), len(task.text_file.fragments))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_share_synthesis(self):
+        tasks = [
+            self.load_text_task("res/inputtext/sonnet_plain_head.txt"),
+            self.load_text_task("res/inputtext/sonnet_plain.txt"),
+            self.load_text_task("res/inputtext/sonnet_plain_head.txt")
+        ]
+        executor = ExecuteJob(tts_backend=FakeTTSBackend())
+        synthesis = executor._share_synthesis(tasks)
+        self.assertEqual(len(synthesis), 2)
+        self.assertTrue(synthesis[tasks[0].identifier] is synthesis[tasks[2].identifier])
+        features, anchors = synthesis[tasks[0].identifier]
+        self.assertEqual(len(anchors), len(tasks[0].text_file))
+        self.assertGreater(features.mfcc.shape[1], 0)
+        self.assertEqual(features.path, None)
+        executor.shared_synthesis = synthesis
+        parameters = executor._shared_parameters(tasks[2])
+        self.assertTrue(parameters["synt_features"] is features)
+        self.assertEqual(executor._shared_parameters(tasks[1]), dict())
+
+    def test_share_synthesis_with_workers(self):
+        tasks = [
+            self.load_text_task("res/inputtext/sonnet_plain_head.txt"),
+            self.load_text_task("res/inputtext/sonnet_plain_head.txt")
+        ]
+        executor = ExecuteJob(tts_backend=FakeTTSBackend(), workers=2)
+        synthesis = executor._share_synthesis(tasks)
+        features, anchors = synthesis[tasks[0].identifier]
+        self.assertNotEqual(features.path, None)
+        self.assertNotEqual(executor.shared_directory, None)
+        executor._clean(executor.shared_directory)
+
+    def load_text_job(self, tasks=2):
+        job = Job()
+        for index in range(tasks):
+            job.add_task(self.load_text_task("res/inputtext/sonnet_plain_head.txt"))
+        return job
+
+    def test_execute_parallel_unpicklable(self):
+        tts_backend = FakeTTSBackend()
+        tts_backend.unpicklable = lambda text: text
+        executor = ExecuteJob(
+            self.load_text_job(),
+            tts_backend=tts_backend,
+            workers=2,
+            share_synthesis=False
+        )
+        self.assertFalse(executor.execute())
+        self.assertEqual(executor.governor.used, 0)
+
+    def test_execute_parallel_shared_governor(self):
+        governor = MemoryGovernor(budget=10 ** 9)
+        governor.acquire(1000)
+        job = self.load_text_job()
+        for task in job.tasks:
+            task.audio_file = _AudioFile()
+        executor = ExecuteJob(
+            job,
+            tts_backend=FakeTTSBackend(),
+            workers=2,
+            share_synthesis=False,
+            governor=governor
+        )
+        self.assertFalse(executor.execute())
+        self.assertEqual(governor.used, 1000)
+
+    def test_execute_parallel_shared_pool(self):
+        pool = multiprocessing.Pool(processes=2)
+        slots = threading.Semaphore(2)
+        try:
+            job = self.load_text_job(3)
+            for task in job.tasks:
+                task.audio_file = _AudioFile()
+            executor = ExecuteJob(
+                job,
+                tts_backend=FakeTTSBackend(),
+                workers=2,
+                share_synthesis=False,
+                pool=pool,
+                slots=slots
+            )
+            self.assertFalse(executor.execute())
+            # the pool is still alive, and all the slots are released
+            self.assertEqual(pool.apply(abs, (-1,)), 1)
+            self.assertTrue(slots.acquire(False))
+            self.assertTrue(slots.acquire(False))
+            self.assertFalse(slots.acquire(False))
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def test_execute_parallel_killed_worker(self):
+        job = self.load_text_job()
+        for task in job.tasks:
+            task.audio_file = _KillWorkerAudioFile()
+        executor = ExecuteJob(
+            job,
+            tts_backend=FakeTTSBackend(),
+            workers=2,
+            share_synthesis=False,
+            task_timeout=1
+        )
+        self.assertFalse(executor.execute())
+
+    def test_execute_parallel_stalled_worker_keeps_slot(self):
+        pool = multiprocessing.Pool(processes=1)
+        slots = threading.Semaphore(1)
+        try:
+            job = self.load_text_job(1)
+            job.tasks[0].audio_file = _SlowAudioFile(3.0)
+            executor = ExecuteJob(
+                job,
+                tts_backend=FakeTTSBackend(),
+                workers=2,
+                share_synthesis=False,
+                task_timeout=0.5,
+                pool=pool,
+                slots=slots
+            )
+            self.assertFalse(executor.execute())
+            # the worker is still running, and it holds the slot
+            self.assertFalse(slots.acquire(False))
+            deadline = time.time() + 10
+            while (not slots.acquire(False)) and (time.time() < deadline):
+                time.sleep(0.1)
+            self.assertLess(time.time(), deadline)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def test_execute_parallel_timeout_from_start(self):
+        pool = multiprocessing.Pool(processes=1)
+        try:
+            job = self.load_text_job(2)
+            for task in job.tasks:
+                task.audio_file = _SlowAudioFile(0.6)
+            executor = ExecuteJob(
+                job,
+                tts_backend=FakeTTSBackend(),
+                workers=2,
+                share_synthesis=False,
+                stop_on_failure=False,
+                task_timeout=1.0,
+                pool=pool
+            )
+            executor.execute()
+            # the second task waits for the first one, without timing out
+            self.assertFalse("no result after" in str(executor.logger))
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def test_execute_parallel_recycle_stalled_workers(self):
+        job = self.load_text_job(3)
+        for task in job.tasks:
+            task.audio_file = _SlowAudioFile(60.0)
+        governor = MemoryGovernor()
+        executor = ExecuteJob(
+            job,
+            tts_backend=FakeTTSBackend(),
+            workers=2,
+            share_synthesis=False,
+            stop_on_failure=False,
+            task_timeout=0.5,
+            governor=governor
+        )
+        start = time.time()
+        self.assertFalse(executor.execute())
+        self.assertLess(time.time() - start, 30)
+        self.assertEqual(governor.used, 0)
+
+    def test_execute_pipeline_unexpected_error(self):
+        job = self.load_text_job(3)
+        for task in job.tasks:
+            task.audio_file = _AudioFile()
+        executor = _FailingExecuteJob(
+            job,
+            tts_backend=FakeTTSBackend(),
+            pipeline=True,
+            stop_on_failure=False,
+            share_audio=True
+        )
+        self.assertFalse(executor.execute())
+        self.assertEqual(executor.completed, 3)
+
+class _AudioFile(object):
+    """ An audio file, with its length only """
+
+    audio_length = 10.0
+
+class _FailingExecuteJob(ExecuteJob):
+    """
+    Use the synthesized text as the audio file of each task,
+    and raise an unexpected error when a task is completed
+    """
+
+    def _share_audio(self, tasks):
+        self.completed = 0
+        features = dict()
+        for task in tasks:
+            features[task.identifier] = ExecuteTask.precompute_synthesis(
+                task.text_file,
+                tts_backend=self.tts_backend
+            )[0]
+        return features
+
+    def _complete_task(self, task):
+        self.completed += 1
+        raise ValueError("Unexpected error")
+
+class _KillWorkerAudioFile(object):
+    """ An audio file killing the worker process reading its length """
+
+    def __init__(self):
+        self.pid = os.getpid()
+
+    @property
+    def audio_length(self):
+        if os.getpid() != self.pid:
+            os._exit(1)
+        return 1.0
+
+class _SlowAudioFile(object):
+    """ An audio file slowing down the worker process reading its length first """
+
+    def __init__(self, duration):
+        self.pid = os.getpid()
+        self.duration = duration
+
+    @property
+    def audio_length(self):
+        if os.getpid() != self.pid:
+            time.sleep(self.duration)
+            self.duration = 0
+        return 1.0
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+
@@ -21,6 +21,17 @@ class TestFFMPEGWrapper(unittest.TestCase):
         os.close(handler)
         os.remove(output_file_path)
 
+    def test_convert_m4a_in_memory(self):
+        with open(get_abs_path("res/audioformats/p001.mp4"), "rb") as input_file:
+            input_data = input_file.read()
+        handler, output_file_path = tempfile.mkstemp(suffix=".wav")
+        converter = FFMPEGWrapper()
+        result = converter.convert("p001.m4a", output_file_path, input_data=input_data)
+        self.assertEqual(result, output_file_path)
+        self.assertGreater(os.path.getsize(output_file_path), 0)
+        os.close(handler)
+        os.remove(output_file_path)
+
     def test_cannotload(self):
         input_file_path = get_abs_path("res/this_file_does_not_exist.mp3")
         handler, output_file_path = tempfile.mkstemp(suffix=".wav")
@@ -33,6 +33,15 @@ class TestFFPROBEWrapper(unittest.TestCase):
         with self.assertRaises(OSError):
             properties = prober.read_properties(file_path)
 
+    def test_read_m4a_in_memory(self):
+        file_path = get_abs_path("res/audioformats/p001.mp4")
+        with open(file_path, "rb") as audio_file:
+            audio_data = audio_file.read()
+        prober = FFPROBEWrapper()
+        expected = prober.read_properties(file_path)
+        properties = prober.read_properties("p001.m4a", audio_data=audio_data)
+        self.assertEqual(properties['duration'], expected['duration'])
+
     def test_format_wav(self):
         file_path = get_abs_path("res/audioformats/p001.wav")
         prober = FFPROBEWrapper()
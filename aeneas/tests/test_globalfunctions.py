@@ -1,10 +1,18 @@
 #!/usr/bin/env python
 # coding=utf-8
 
+import os
+import shutil
+import tempfile
 import unittest
 
+from aeneas.globalfunctions import can_pipe_audio
+from aeneas.globalfunctions import copy_file
+from aeneas.globalfunctions import copytree
+from aeneas.globalfunctions import hash_file
 from aeneas.globalfunctions import safe_float
 from aeneas.globalfunctions import safe_int
+from aeneas.globalfunctions import write_tmp_file
 
 class TestGlobalFunctions(unittest.TestCase):
 
@@ -120,6 +128,65 @@ class TestGlobalFunctions(unittest.TestCase):
         result = safe_int(value, default)
         self.assertEqual(result, expected)
 
+    def test_hash_file(self):
+        handler, path = tempfile.mkstemp()
+        os.write(handler, "abc")
+        os.close(handler)
+        self.assertEqual(hash_file(path), "a9993e364706816aba3e25717850c26c9cd0d89d")
+        self.assertEqual(hash_file(path, block_size=1), "a9993e364706816aba3e25717850c26c9cd0d89d")
+        os.remove(path)
+
+    def test_can_pipe_audio(self):
+        self.assertTrue(can_pipe_audio("assets/p001.mp3"))
+        self.assertTrue(can_pipe_audio("assets/p001.WAV"))
+        self.assertFalse(can_pipe_audio("assets/p001.m4a"))
+        self.assertFalse(can_pipe_audio("assets/p001"))
+        self.assertFalse(can_pipe_audio(None))
+
+    def test_write_tmp_file(self):
+        path = write_tmp_file("abc", suffix=".m4a")
+        self.assertTrue(path.endswith(".m4a"))
+        with open(path, "rb") as tmp_file:
+            self.assertEqual(tmp_file.read(), "abc")
+        os.remove(path)
+
+    def test_hash_file_none(self):
+        self.assertEqual(hash_file(None), None)
+        self.assertEqual(hash_file("/this/file/does/not/exist"), None)
+
+    def test_copy_file(self):
+        directory = tempfile.mkdtemp()
+        source = os.path.join(directory, "source")
+        destination = os.path.join(directory, "destination")
+        with open(source, "wb") as source_file:
+            source_file.write("abc")
+        copy_file(source, destination)
+        self.assertNotEqual(os.stat(source).st_ino, os.stat(destination).st_ino)
+        with open(destination, "rb") as destination_file:
+            self.assertEqual(destination_file.read(), "abc")
+        copy_file(source, destination, link=True)
+        self.assertEqual(os.stat(source).st_ino, os.stat(destination).st_ino)
+        copy_file(source, destination, link=True)
+        with open(source, "rb") as source_file:
+            self.assertEqual(source_file.read(), "abc")
+        shutil.rmtree(directory)
+
+    def test_copytree_link(self):
+        source = tempfile.mkdtemp()
+        destination = tempfile.mkdtemp()
+        os.makedirs(os.path.join(source, "foo"))
+        with open(os.path.join(source, "foo", "bar.txt"), "wb") as source_file:
+            source_file.write("bar")
+        copytree(source, destination, link=True)
+        self.assertEqual(
+            os.stat(os.path.join(source, "foo", "bar.txt")).st_ino,
+            os.stat(os.path.join(destination, "foo", "bar.txt")).st_ino
+        )
+        shutil.rmtree(source)
+        with open(os.path.join(destination, "foo", "bar.txt"), "rb") as destination_file:
+            self.assertEqual(destination_file.read(), "bar")
+        shutil.rmtree(destination)
+
 if __name__ == '__main__':
     unittest.main()
 
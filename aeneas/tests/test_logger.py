@@ -28,6 +28,18 @@ class TestLogger(unittest.TestCase):
         logger.clear()
         self.assertEqual(len(logger), 0)
 
+    def test_add_entries(self):
+        logger = Logger(tee=False, indentation=2)
+        logger.log("Message 1", Logger.DEBUG)
+        other = Logger(tee=False, indentation=1)
+        other.log("Message 2", Logger.INFO, "Other")
+        other.log("Message 3", Logger.WARNING, "Other")
+        logger.add_entries(other.entries)
+        self.assertEqual(len(logger), 3)
+        self.assertEqual(logger.entries[1].message, "Message 2")
+        self.assertEqual(logger.entries[1].tag, "Other")
+        self.assertEqual(logger.entries[1].indentation, 3)
+
     def test_change_indentation(self):
         logger = Logger(tee=False, indentation=4)
         self.assertEqual(logger.indentation, 4)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import unittest
+
+from aeneas.dtw import DTWAlgorithm
+from aeneas.memorygovernor import MemoryGovernor
+
+class TestMemoryGovernor(unittest.TestCase):
+
+    def test_estimate_zero(self):
+        self.assertEqual(MemoryGovernor.estimate_peak_memory(None), 0)
+        self.assertEqual(MemoryGovernor.estimate_peak_memory(0), 0)
+
+    def test_estimate_exact_larger_than_stripe(self):
+        exact = MemoryGovernor.estimate_peak_memory(3600, DTWAlgorithm.EXACT, 60)
+        stripe = MemoryGovernor.estimate_peak_memory(3600, DTWAlgorithm.STRIPE, 60)
+        self.assertGreater(exact, stripe)
+
+    def test_estimate_stripe_grows_with_margin(self):
+        small = MemoryGovernor.estimate_peak_memory(3600, DTWAlgorithm.STRIPE, 10)
+        large = MemoryGovernor.estimate_peak_memory(3600, DTWAlgorithm.STRIPE, 60)
+        self.assertGreater(large, small)
+
+    def test_estimate_short_audio_uses_exact(self):
+        exact = MemoryGovernor.estimate_peak_memory(60, DTWAlgorithm.EXACT, 60)
+        stripe = MemoryGovernor.estimate_peak_memory(60, DTWAlgorithm.STRIPE, 60)
+        self.assertEqual(exact, stripe)
+
+    def test_plan_no_budget(self):
+        governor = MemoryGovernor(budget=None)
+        algorithm, margin, memory = governor.plan(3600, DTWAlgorithm.EXACT, 60)
+        self.assertEqual(algorithm, DTWAlgorithm.EXACT)
+        self.assertEqual(margin, 60)
+
+    def test_plan_downgrade_algorithm(self):
+        budget = MemoryGovernor.estimate_peak_memory(3600, DTWAlgorithm.STRIPE, 60)
+        governor = MemoryGovernor(budget=budget)
+        algorithm, margin, memory = governor.plan(3600, DTWAlgorithm.EXACT, 60)
+        self.assertEqual(algorithm, DTWAlgorithm.STRIPE)
+        self.assertEqual(margin, 60)
+        self.assertLessEqual(memory, budget)
+
+    def test_plan_downgrade_margin(self):
+        budget = MemoryGovernor.estimate_peak_memory(3600, DTWAlgorithm.STRIPE, 20)
+        governor = MemoryGovernor(budget=budget)
+        algorithm, margin, memory = governor.plan(3600, DTWAlgorithm.STRIPE, 60)
+        self.assertEqual(algorithm, DTWAlgorithm.STRIPE)
+        self.assertLessEqual(margin, 20)
+        self.assertLessEqual(memory, budget)
+
+    def test_admits(self):
+        governor = MemoryGovernor(budget=100)
+        self.assertTrue(governor.admits(1000))
+        governor.acquire(60)
+        self.assertTrue(governor.admits(40))
+        self.assertFalse(governor.admits(41))
+        governor.release(60)
+        self.assertTrue(governor.admits(1000))
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+
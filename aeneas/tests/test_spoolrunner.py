@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from aeneas.spoolrunner import SpoolRunner
+
+class TestSpoolRunner(unittest.TestCase):
+
+    DEAD_PID = 999999999
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.spool = os.path.join(self.directory, "spool")
+        self.outbox = os.path.join(self.directory, "outbox")
+        os.makedirs(self.spool)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def enqueue(self, name, contents="not a container"):
+        path = os.path.join(self.spool, name)
+        with open(path, "wb") as container_file:
+            container_file.write(contents)
+        return path
+
+    def dead_runner_directory(self):
+        runner_id = "%s-%d" % (socket.gethostname(), self.DEAD_PID)
+        path = os.path.join(self.spool, SpoolRunner.PROCESSING_DIRECTORY_NAME, runner_id)
+        os.makedirs(path)
+        return path
+
+    def test_create_directories(self):
+        runner = SpoolRunner(self.spool, self.outbox)
+        self.assertTrue(os.path.isdir(self.outbox))
+        self.assertTrue(os.path.isdir(runner.processing_directory))
+        self.assertTrue(os.path.isdir(os.path.join(self.spool, SpoolRunner.DONE_DIRECTORY_NAME)))
+        self.assertTrue(os.path.isdir(os.path.join(self.spool, SpoolRunner.FAILED_DIRECTORY_NAME)))
+
+    def test_queued(self):
+        runner = SpoolRunner(self.spool, self.outbox)
+        self.assertEqual(runner.queued(), [])
+        self.enqueue("job1.zip")
+        os.utime(self.enqueue("job2.zip"), (0, 0))
+        self.assertEqual(runner.queued(), ["job2.zip", "job1.zip"])
+
+    def test_claim(self):
+        runner = SpoolRunner(self.spool, self.outbox)
+        self.enqueue("job.zip")
+        path = runner.claim("job.zip")
+        self.assertTrue(os.path.isfile(path))
+        self.assertEqual(runner.queued(), [])
+        self.assertEqual(runner.claim("job.zip"), None)
+
+    def test_process_failed(self):
+        runner = SpoolRunner(self.spool, self.outbox)
+        self.enqueue("job.zip")
+        status = runner.process(runner.claim("job.zip"))
+        self.assertFalse(status["success"])
+        self.assertEqual(status["output_path"], None)
+        self.assertTrue(os.path.isfile(os.path.join(self.spool, SpoolRunner.FAILED_DIRECTORY_NAME, "job.zip")))
+        with open(os.path.join(self.outbox, "job.zip" + SpoolRunner.STATUS_EXTENSION), "rb") as status_file:
+            self.assertEqual(json.load(status_file)["error"], status["error"])
+        self.assertEqual(os.listdir(runner.processing_directory), [])
+
+    def test_run_once(self):
+        runner = SpoolRunner(self.spool, self.outbox, workers=2, poll_interval=0.1)
+        for index in range(3):
+            self.enqueue("job%d.zip" % index)
+        runner.run(once=True)
+        status = runner.status()
+        self.assertEqual(status["queued"], 0)
+        self.assertEqual(status["processing"], 0)
+        self.assertEqual(status["completed"], 0)
+        self.assertEqual(status["failed"], 3)
+        with open(os.path.join(self.outbox, SpoolRunner.RUNNER_STATUS_FILE_NAME), "rb") as status_file:
+            self.assertEqual(json.load(status_file)["failed"], 3)
+
+    def test_recover_queued_again(self):
+        claimed = self.dead_runner_directory()
+        with open(os.path.join(claimed, "job.zip"), "wb") as container_file:
+            container_file.write("not a container")
+        runner = SpoolRunner(self.spool, self.outbox)
+        self.assertEqual(runner.recover(), 1)
+        self.assertEqual(runner.queued(), ["job.zip"])
+        self.assertFalse(os.path.exists(claimed))
+
+    def test_recover_already_processed(self):
+        claimed = self.dead_runner_directory()
+        path = os.path.join(claimed, "job.zip")
+        with open(path, "wb") as container_file:
+            container_file.write("not a container")
+        os.makedirs(self.outbox)
+        with open(os.path.join(self.outbox, "job.zip" + SpoolRunner.STATUS_EXTENSION), "wb") as status_file:
+            json.dump({"claim": path, "success": True}, status_file)
+        runner = SpoolRunner(self.spool, self.outbox)
+        self.assertEqual(runner.recover(), 1)
+        self.assertEqual(runner.queued(), [])
+        self.assertTrue(os.path.isfile(os.path.join(self.spool, SpoolRunner.DONE_DIRECTORY_NAME, "job.zip")))
+
+    def test_recover_output_not_moved(self):
+        claimed = self.dead_runner_directory()
+        path = os.path.join(claimed, "job.zip")
+        with open(path, "wb") as container_file:
+            container_file.write("not a container")
+        os.makedirs(self.outbox)
+        # crashed after writing the status file,
+        # but before moving the output container into place
+        tmp_directory = tempfile.mkdtemp(
+            prefix=".%s.job.zip." % os.path.basename(claimed),
+            dir=self.outbox
+        )
+        with open(os.path.join(tmp_directory, "output.zip"), "wb") as output_file:
+            output_file.write("output")
+        output_path = os.path.join(self.outbox, "job.zip", "output.zip")
+        status = {
+            "claim": path,
+            "success": True,
+            "output_path": output_path,
+            "tmp_directory": tmp_directory
+        }
+        with open(os.path.join(self.outbox, "job.zip" + SpoolRunner.STATUS_EXTENSION), "wb") as status_file:
+            json.dump(status, status_file)
+        runner = SpoolRunner(self.spool, self.outbox)
+        self.assertEqual(runner.recover(), 1)
+        self.assertEqual(runner.queued(), [])
+        self.assertTrue(os.path.isfile(output_path))
+        self.assertFalse(os.path.exists(tmp_directory))
+        self.assertFalse(os.path.exists(os.path.join(self.outbox, "job.zip.1")))
+        self.assertTrue(os.path.isfile(os.path.join(self.spool, SpoolRunner.DONE_DIRECTORY_NAME, "job.zip")))
+
+    def test_recover_restarted_runner(self):
+        # a crashed runner with the same host name and pid
+        runner = SpoolRunner(self.spool, self.outbox)
+        with open(os.path.join(runner.processing_directory, "job.zip"), "wb") as container_file:
+            container_file.write("not a container")
+        runner.run(once=True)
+        self.assertEqual(runner.status()["failed"], 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.spool, SpoolRunner.FAILED_DIRECTORY_NAME, "job.zip")))
+        self.assertFalse(os.path.exists(runner.processing_directory))
+
+    def test_recover_not_own_claims(self):
+        runner = SpoolRunner(self.spool, self.outbox)
+        self.enqueue("job.zip")
+        runner.claim("job.zip")
+        self.assertEqual(runner.recover(), 0)
+        self.assertEqual(os.listdir(runner.processing_directory), ["job.zip"])
+
+    def test_recover_dead_locked_runner(self):
+        # the pid is alive, but the lock is not held
+        claimed = self.dead_runner_directory()
+        alive = os.path.join(os.path.dirname(claimed), "%s-%d" % (socket.gethostname(), os.getppid()))
+        os.rename(claimed, alive)
+        with open(os.path.join(alive, SpoolRunner.LOCK_FILE_NAME), "wb") as lock_file:
+            lock_file.write("")
+        with open(os.path.join(alive, "job.zip"), "wb") as container_file:
+            container_file.write("not a container")
+        runner = SpoolRunner(self.spool, self.outbox)
+        self.assertEqual(runner.recover(), 1)
+        self.assertEqual(runner.queued(), ["job.zip"])
+        self.assertFalse(os.path.exists(alive))
+
+    def test_recover_locked_runner(self):
+        claimed = self.dead_runner_directory()
+        other = SpoolRunner(self.spool, self.outbox)
+        lock_file = other._lock(claimed)
+        with open(os.path.join(claimed, "job.zip"), "wb") as container_file:
+            container_file.write("not a container")
+        try:
+            runner = SpoolRunner(self.spool, self.outbox)
+            self.assertEqual(runner.recover(), 0)
+            self.assertTrue(os.path.isfile(os.path.join(claimed, "job.zip")))
+        finally:
+            other._unlock(claimed, lock_file)
+
+    def test_recover_alive_runner(self):
+        other = SpoolRunner(self.spool, self.outbox)
+        self.enqueue("job.zip")
+        other.claim("job.zip")
+        other.runner_id = "other"
+        runner = SpoolRunner(self.spool, self.outbox)
+        runner.runner_id = "this"
+        self.assertEqual(runner.recover(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -173,6 +173,26 @@ class TestSyncMap(unittest.TestCase):
         os.close(handler)
         os.remove(output_file_path)
 
+    def test_output_string(self):
+        syn = self.load("res/example_jobs/example7/OEBPS/Resources/de.txt", 24)
+        parameters = {
+            PPN_TASK_OS_FILE_SMIL_PAGE_REF: "sonnet001.xhtml",
+            PPN_TASK_OS_FILE_SMIL_AUDIO_REF: "sonnet001.mp3"
+        }
+        for sync_map_format in SyncMapFormat.ALLOWED_VALUES:
+            handler, output_file_path = tempfile.mkstemp()
+            self.assertTrue(syn.output(sync_map_format, output_file_path, parameters))
+            with open(output_file_path, "rb") as output_file:
+                contents = output_file.read()
+            self.assertEqual(syn.output_string(sync_map_format, parameters), contents)
+            os.close(handler)
+            os.remove(output_file_path)
+
+    def test_output_string_fail(self):
+        syn = self.load()
+        self.assertEqual(syn.output_string(SyncMapFormat.SMIL, {}), None)
+        self.assertEqual(syn.output_string("foo"), None)
+
 if __name__ == '__main__':
     unittest.main()
 
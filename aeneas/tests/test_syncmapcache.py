@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import shutil
+import tempfile
+import unittest
+
+from . import get_abs_path
+
+import aeneas.globalconstants as gc
+from aeneas.checkpoint import CheckpointStore
+from aeneas.dtw import DTWAlgorithm
+from aeneas.executetask import ExecuteTask
+from aeneas.syncmap import SyncMap, SyncMapFragment
+from aeneas.syncmapcache import SyncMapCache
+from aeneas.task import Task
+from aeneas.ttsbackend import FakeTTSBackend
+
+class TestSyncMapCache(unittest.TestCase):
+
+    CONFIG_STRING = "task_language=en|is_text_type=plain|os_task_file_name=output.txt|os_task_file_format=txt"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def load_task(self):
+        task = Task(self.CONFIG_STRING)
+        task.text_file_path_absolute = get_abs_path("res/inputtext/sonnet_plain.txt")
+        return task
+
+    def completed_task(self):
+        task = self.load_task()
+        task.sync_map = SyncMap()
+        for fragment in task.text_file.fragments:
+            task.sync_map.append(SyncMapFragment(fragment, 0.0, 1.0))
+        return task
+
+    def test_constants(self):
+        constants = SyncMapCache.constants()
+        self.assertTrue("ALIGNER_MARGIN=60" in constants)
+        self.assertTrue("SYNTHESIZER_TTS_BACKEND=espeak" in constants)
+        self.assertFalse(any([c.startswith("EXECUTE_JOB_") for c in constants]))
+        self.assertEqual(constants, sorted(constants))
+
+    def test_task_key_extends_checkpoint_key(self):
+        task = self.load_task()
+        key1 = CheckpointStore(self.directory).task_key(task)
+        key2 = SyncMapCache(self.directory).task_key(task)
+        self.assertNotEqual(key1, key2)
+
+    def test_task_key_parameters(self):
+        task = self.load_task()
+        key1 = SyncMapCache(self.directory, parameters=["margin=None"]).task_key(task)
+        key2 = SyncMapCache(self.directory, parameters=["margin=30"]).task_key(task)
+        key3 = SyncMapCache(self.directory, parameters=["margin=None"]).task_key(task)
+        self.assertNotEqual(key1, key2)
+        self.assertEqual(key1, key3)
+
+    def test_save_load(self):
+        task = self.completed_task()
+        self.assertTrue(SyncMapCache(self.directory).save(task))
+        sync_map = SyncMapCache(self.directory).load(self.load_task())
+        self.assertEqual(len(sync_map), len(task.sync_map))
+
+    def test_execute_task_no_cache(self):
+        executor = ExecuteTask(self.load_task(), cache_directory=None)
+        self.assertFalse(executor.execute_cached())
+
+    def test_execute_task_cache_miss(self):
+        executor = ExecuteTask(self.load_task(), cache_directory=self.directory)
+        self.assertFalse(executor.execute_cached())
+
+    def test_execute_task_cache_hit(self):
+        task = self.completed_task()
+        ExecuteTask(task, cache_directory=self.directory)._cache().save(task)
+        task = self.load_task()
+        executor = ExecuteTask(task, cache_directory=self.directory)
+        self.assertTrue(executor.execute_cached())
+        self.assertEqual(len(task.sync_map), len(task.text_file.fragments))
+
+    def test_execute_task_cache_planned_margin(self):
+        task = self.completed_task()
+        ExecuteTask(task, cache_directory=self.directory)._cache().save(task)
+        executor = ExecuteTask(self.load_task(), margin=30, cache_directory=self.directory)
+        self.assertFalse(executor.execute_cached())
+        executor = ExecuteTask(self.load_task(), margin=gc.ALIGNER_MARGIN, cache_directory=self.directory)
+        self.assertTrue(executor.execute_cached())
+
+    def test_execute_task_cache_two_margins(self):
+        task = self.completed_task()
+        ExecuteTask(task, margin=30, cache_directory=self.directory)._cache().save(task)
+        executor = ExecuteTask(self.load_task(), margin=15, cache_directory=self.directory)
+        self.assertFalse(executor.execute_cached())
+        executor = ExecuteTask(self.load_task(), cache_directory=self.directory)
+        self.assertFalse(executor.execute_cached())
+        executor = ExecuteTask(self.load_task(), margin=30, cache_directory=self.directory)
+        self.assertTrue(executor.execute_cached())
+
+    def test_execute_task_cache_algorithm(self):
+        task = self.completed_task()
+        ExecuteTask(task, cache_directory=self.directory)._cache().save(task)
+        executor = ExecuteTask(self.load_task(), algorithm=DTWAlgorithm.EXACT, cache_directory=self.directory)
+        self.assertFalse(executor.execute_cached())
+        executor = ExecuteTask(self.load_task(), algorithm=DTWAlgorithm.STRIPE, cache_directory=self.directory)
+        self.assertTrue(executor.execute_cached())
+
+    def test_execute_task_cache_other_backend_parameters(self):
+        task = self.completed_task()
+        ExecuteTask(task, tts_backend=FakeTTSBackend(), cache_directory=self.directory)._cache().save(task)
+        executor = ExecuteTask(self.load_task(), tts_backend=FakeTTSBackend(), cache_directory=self.directory)
+        self.assertTrue(executor.execute_cached())
+        executor = ExecuteTask(self.load_task(), tts_backend=FakeTTSBackend(sample_rate=8000), cache_directory=self.directory)
+        self.assertFalse(executor.execute_cached())
+        executor = ExecuteTask(self.load_task(), cache_directory=self.directory)
+        self.assertFalse(executor.execute_cached())
+
+if __name__ == '__main__':
+    unittest.main()
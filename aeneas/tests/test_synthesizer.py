@@ -12,6 +12,7 @@ from aeneas.language import Language
 from aeneas.logger import Logger
 from aeneas.synthesizer import Synthesizer
 from aeneas.textfile import TextFile, TextFileFormat
+from aeneas.ttsbackend import FakeTTSBackend
 
 class TestSynthesizer(unittest.TestCase):
 
@@ -43,6 +44,40 @@ class TestSynthesizer(unittest.TestCase):
         self.assertGreater(len(anchors), 0)
         os.remove(output_file_path)
 
+    def test_synthesize_with_fake_backend(self):
+        handler, output_file_path = tempfile.mkstemp(suffix=".wav")
+        tfl = TextFile(get_abs_path("res/inputtext/sonnet_plain.txt"), TextFileFormat.PLAIN)
+        tfl.set_language(Language.EN)
+        synth = Synthesizer(tts_backend=FakeTTSBackend())
+        anchors = synth.synthesize(tfl, output_file_path)
+        self.assertEqual(len(anchors), len(tfl))
+        self.assertEqual(anchors[0][0], 0.0)
+        self.assertGreater(anchors[1][0], anchors[0][0])
+        self.assertGreater(os.path.getsize(output_file_path), 0)
+        os.remove(output_file_path)
+
+    def test_synthesize_matching_duration(self):
+        handler, output_file_path = tempfile.mkstemp(suffix=".wav")
+        tfl = TextFile(get_abs_path("res/inputtext/sonnet_plain.txt"), TextFileFormat.PLAIN)
+        tfl.set_language(Language.EN)
+        synth = Synthesizer(tts_backend=FakeTTSBackend())
+        synth.synthesize(tfl, output_file_path)
+        self.assertEqual(synth.speed, 1.0)
+        self.assertEqual(synth.duration_ratio, None)
+        natural_duration = synth.tts_backend.synthesize(tfl.fragments)[2]
+        target_duration = 1.5 * sum(natural_duration)
+        anchors = synth.synthesize(tfl, output_file_path, target_duration=target_duration)
+        self.assertEqual(len(anchors), len(tfl))
+        self.assertLess(synth.speed, 1.0)
+        self.assertAlmostEqual(synth.duration_ratio, 1.0, places=1)
+        os.remove(output_file_path)
+
+    def test_estimate_speed_clamped(self):
+        tfl = TextFile(get_abs_path("res/inputtext/sonnet_plain.txt"), TextFileFormat.PLAIN)
+        synth = Synthesizer(tts_backend=FakeTTSBackend())
+        self.assertEqual(synth.estimate_speed(tfl, 0.001), 2.0)
+        self.assertEqual(synth.estimate_speed(tfl, 100000.0), 0.5)
+
 if __name__ == '__main__':
     unittest.main()
 
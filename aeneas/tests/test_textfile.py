@@ -157,6 +157,18 @@ class TestTextFile(unittest.TestCase):
         tfl.read_from_list_with_ids(text_list)
         self.assertEqual(len(tfl), 5)
 
+    def test_read_from_data(self):
+        path = get_abs_path("res/inputtext/de_utf8.txt")
+        with open(path, "rb") as text_file:
+            data = text_file.read()
+        tfl = TextFile(path, TextFileFormat.PARSED)
+        tfl_data = TextFile("de_utf8.txt", TextFileFormat.PARSED, data=data)
+        self.assertEqual(len(tfl_data), len(tfl))
+        self.assertEqual(
+            [(f.identifier, f.text) for f in tfl_data.fragments],
+            [(f.identifier, f.text) for f in tfl.fragments]
+        )
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import unittest
+
+from aeneas.language import Language
+from aeneas.textfile import TextFile
+from aeneas.ttsbackend import create_tts_backend
+from aeneas.ttsbackend import ESPEAKTTSBackend, FakeTTSBackend, TTSBackend, TTSBackendType
+
+class TestTTSBackend(unittest.TestCase):
+
+    def load_fragments(self, lines):
+        tfl = TextFile()
+        tfl.read_from_list(lines)
+        tfl.set_language(Language.EN)
+        return tfl.fragments
+
+    def test_create_espeak(self):
+        backend = create_tts_backend(TTSBackendType.ESPEAK)
+        self.assertTrue(isinstance(backend, ESPEAKTTSBackend))
+
+    def test_create_fake(self):
+        backend = create_tts_backend(TTSBackendType.FAKE)
+        self.assertTrue(isinstance(backend, FakeTTSBackend))
+
+    def test_create_default(self):
+        backend = create_tts_backend()
+        self.assertTrue(isinstance(backend, ESPEAKTTSBackend))
+
+    def test_create_unknown(self):
+        with self.assertRaises(ValueError):
+            create_tts_backend("foo")
+
+    def test_base_not_implemented(self):
+        backend = TTSBackend()
+        with self.assertRaises(NotImplementedError):
+            backend.synthesize([])
+
+    def test_fake_durations(self):
+        backend = FakeTTSBackend(character_duration=0.1, sample_rate=16000)
+        fragments = self.load_fragments([u"abc", u"", u"hello"])
+        samples, sample_rate, durations = backend.synthesize(fragments)
+        self.assertEqual(sample_rate, 16000)
+        self.assertEqual(len(durations), 3)
+        self.assertAlmostEqual(durations[0], 0.3)
+        self.assertAlmostEqual(durations[1], 0.0)
+        self.assertAlmostEqual(durations[2], 0.5)
+        self.assertEqual(len(samples), int(0.8 * 16000))
+
+    def test_fake_speed(self):
+        backend = FakeTTSBackend(character_duration=0.1, sample_rate=16000)
+        fragments = self.load_fragments([u"abcd"])
+        samples, sample_rate, durations = backend.synthesize(fragments, speed=2.0)
+        self.assertAlmostEqual(durations[0], 0.2)
+        samples, sample_rate, durations = backend.synthesize(fragments, speed=0.5)
+        self.assertAlmostEqual(durations[0], 0.8)
+
+    def test_fake_characters_per_second(self):
+        backend = FakeTTSBackend(character_duration=0.1)
+        self.assertAlmostEqual(backend.characters_per_second, 10.0)
+
+    def test_fake_parameters(self):
+        parameters = FakeTTSBackend(character_duration=0.1, sample_rate=8000).parameters()
+        self.assertEqual(parameters, [
+            "character_duration=0.1",
+            "characters_per_second=10.0",
+            "sample_rate=8000"
+        ])
+        self.assertNotEqual(parameters, FakeTTSBackend().parameters())
+
+    def test_fake_deterministic(self):
+        fragments = self.load_fragments([u"From fairest creatures", u"we desire increase"])
+        samples_1, sample_rate_1, durations_1 = FakeTTSBackend().synthesize(fragments)
+        samples_2, sample_rate_2, durations_2 = FakeTTSBackend().synthesize(fragments)
+        self.assertEqual(durations_1, durations_2)
+        self.assertTrue((samples_1 == samples_2).all())
+
+    def test_fake_unicode(self):
+        fragments = self.load_fragments([u"Ich weiß nicht"])
+        samples, sample_rate, durations = FakeTTSBackend().synthesize(fragments)
+        self.assertGreater(durations[0], 0)
+
+    def test_fake_empty(self):
+        samples, sample_rate, durations = FakeTTSBackend().synthesize([])
+        self.assertEqual(len(samples), 0)
+        self.assertEqual(durations, [])
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+
@@ -440,6 +440,33 @@ class TestValidator(unittest.TestCase):
         self.assertTrue(result.passed)
         self.assertEqual(len(result.errors), 0)
 
+    def test_check_container_analyzed_job(self):
+        logger = Logger()
+        validator = Validator(logger=logger)
+        container_path = get_abs_path("res/container/job.zip")
+        result = validator.check_container(container_path)
+        self.assertTrue(result.passed)
+        self.assertEqual(len(result.job), 3)
+        self.assertEqual(result.container.file_path, container_path)
+        self.assertTrue(result.container.indexed)
+        self.assertNotEqual(result.container.read_entry("config.txt"), None)
+        result.container.close()
+
+    def test_check_container_analyzed_job_failed(self):
+        logger = Logger()
+        validator = Validator(logger=logger)
+        container_path = get_abs_path("res/validator/job_txt_config_bad_1")
+        result = validator.check_container(container_path)
+        self.assertFalse(result.passed)
+        self.assertEqual(result.job, None)
+
+    def test_check_container_analyzed_job_missing(self):
+        logger = Logger()
+        validator = Validator(logger=logger)
+        result = validator.check_container("/this/container/does/not/exist.zip")
+        self.assertEqual(result.job, None)
+        self.assertEqual(result.container, None)
+
     def test_check_container_xml_01(self):
         logger = Logger()
         validator = Validator(logger=logger)
@@ -496,6 +523,16 @@ class TestValidator(unittest.TestCase):
         self.assertTrue(result.passed)
         self.assertEqual(len(result.errors), 0)
 
+    def test_check_container_in_memory(self):
+        logger = Logger()
+        validator = Validator(logger=logger)
+        with open(get_abs_path("res/container/job.zip"), "rb") as container_file:
+            data = container_file.read()
+        result = validator.check_container("job.zip", container_data=data)
+        self.assertTrue(result.passed)
+        self.assertEqual(len(result.job), 3)
+        self.assertEqual(result.container.data, data)
+
 if __name__ == '__main__':
     unittest.main()
 
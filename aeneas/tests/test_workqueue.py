@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from aeneas.workqueue import WorkQueue, WorkQueueNode
+
+def lease_all(arguments):
+    directory, node_id = arguments
+    queue = WorkQueue(directory)
+    leased = []
+    while True:
+        item = queue.lease(node_id)
+        if item == None:
+            return leased
+        leased.append((item.job_id, item.index))
+        queue.complete(item, True)
+
+class TestWorkQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def create_job(self, queue, tasks=3):
+        return queue._create_job({
+            "container": "/this/container/does/not/exist.zip",
+            "config_string": None,
+            "tasks": [{"custom_id": "t%d" % i} for i in range(tasks)],
+            "submitted": time.time()
+        })
+
+    def test_submit_invalid_container(self):
+        queue = WorkQueue(self.directory)
+        self.assertEqual(queue.submit("/this/container/does/not/exist.zip"), None)
+        self.assertEqual(queue.jobs(), [])
+
+    def test_jobs(self):
+        queue = WorkQueue(self.directory)
+        job1 = self.create_job(queue)
+        job2 = self.create_job(queue)
+        self.assertEqual(queue.jobs(), [job1, job2])
+        self.assertEqual(WorkQueue(self.directory).jobs(), [job1, job2])
+
+    def test_lease(self):
+        queue = WorkQueue(self.directory)
+        job_id = self.create_job(queue, tasks=2)
+        item1 = queue.lease("node1")
+        item2 = queue.lease("node2")
+        self.assertEqual((item1.job_id, item1.index), (job_id, 0))
+        self.assertEqual((item2.job_id, item2.index), (job_id, 1))
+        self.assertEqual(queue.lease("node3"), None)
+        self.assertTrue(queue.holds(item1))
+        self.assertTrue(queue.renew(item1))
+
+    def test_release(self):
+        queue = WorkQueue(self.directory)
+        self.create_job(queue, tasks=1)
+        item = queue.lease("node1")
+        queue.release(item)
+        self.assertFalse(queue.holds(item))
+        self.assertFalse(queue.renew(item))
+        self.assertEqual(queue.lease("node2").index, 0)
+
+    def test_complete(self):
+        queue = WorkQueue(self.directory)
+        job_id = self.create_job(queue, tasks=3)
+        queue.complete(queue.lease("node1"), True)
+        queue.complete(queue.lease("node1"), False, "error")
+        queue.lease("node1")
+        status = queue.status(job_id)
+        self.assertEqual(status["succeeded"], 1)
+        self.assertEqual(status["failed"], 1)
+        self.assertEqual(status["leased"], 1)
+        self.assertEqual(status["pending"], 0)
+        self.assertFalse(status["finished"])
+        self.assertEqual(queue.lease("node1"), None)
+
+    def test_expired_lease(self):
+        queue = WorkQueue(self.directory, lease_duration=60.0)
+        job_id = self.create_job(queue, tasks=1)
+        item1 = queue.lease("node1")
+        self.assertEqual(queue.lease("node2"), None)
+        past = time.time() - 120
+        os.utime(queue._lease_path(job_id, 0), (past, past))
+        item2 = queue.lease("node2")
+        self.assertEqual(item2.index, 0)
+        self.assertFalse(queue.holds(item1))
+        self.assertTrue(queue.holds(item2))
+        queue.release(item1)
+        self.assertTrue(queue.holds(item2))
+
+    def test_complete_expired_lease(self):
+        queue = WorkQueue(self.directory, lease_duration=60.0)
+        job_id = self.create_job(queue, tasks=1)
+        item1 = queue.lease("node1")
+        past = time.time() - 120
+        os.utime(queue._lease_path(job_id, 0), (past, past))
+        item2 = queue.lease("node2")
+        self.assertFalse(queue.complete(item1, False, "late"))
+        self.assertTrue(queue.complete(item2, True))
+        self.assertEqual(queue.status(job_id)["succeeded"], 1)
+
+    def test_complete_already_done(self):
+        queue = WorkQueue(self.directory)
+        job_id = self.create_job(queue, tasks=1)
+        item = queue.lease("node1")
+        queue._write_json(queue._done_path(job_id, 0), {"node": "node2", "success": True})
+        self.assertFalse(queue.complete(item, False, "late"))
+        self.assertEqual(queue.status(job_id)["succeeded"], 1)
+        self.assertEqual(os.listdir(os.path.dirname(queue._done_path(job_id, 0))), ["0.json"])
+
+    def test_gather_not_finished(self):
+        queue = WorkQueue(self.directory)
+        job_id = self.create_job(queue, tasks=1)
+        self.assertEqual(queue.gather(job_id, self.directory), (False, None))
+        queue.complete(queue.lease("node1"), False, "error")
+        self.assertEqual(queue.gather(job_id, self.directory), (False, None))
+
+    def test_remove(self):
+        queue = WorkQueue(self.directory)
+        job_id = self.create_job(queue)
+        queue.remove(job_id)
+        self.assertEqual(queue.jobs(), [])
+        self.assertEqual(queue.status(job_id), None)
+
+    def test_node_invalid_container(self):
+        queue = WorkQueue(self.directory)
+        job_id = self.create_job(queue, tasks=2)
+        node = WorkQueueNode(queue, node_id="node1")
+        self.assertEqual(node.run(), 2)
+        self.assertEqual(queue.status(job_id)["failed"], 2)
+        self.assertEqual(node.executors, dict())
+
+    def test_several_processes(self):
+        queue = WorkQueue(self.directory)
+        jobs = [self.create_job(queue, tasks=10) for i in range(3)]
+        pool = multiprocessing.Pool(4)
+        try:
+            results = pool.map(lease_all, [(self.directory, "node%d" % i) for i in range(4)])
+        finally:
+            pool.close()
+            pool.join()
+        leased = sum(results, [])
+        self.assertEqual(len(leased), 30)
+        self.assertEqual(len(set(leased)), 30)
+        for job_id in jobs:
+            self.assertTrue(queue.status(job_id)["finished"])
+
+if __name__ == '__main__':
+    unittest.main()
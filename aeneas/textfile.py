@@ -118,8 +118,20 @@ class TextFile(object):
     """
     A list of text fragments.
 
+    The text fragments are read from the file at ``file_path``,
+    or, if ``data`` is not ``None``, from its (UTF-8 encoded) contents,
+    held in memory.
+
+    :param file_path: the path of the text file
+    :type  file_path: string (path)
+    :param file_format: the format of the text file
+    :type  file_format: string (from :class:`aeneas.textfile.TextFileFormat` enumeration)
+    :param parameters: additional parameters used to parse the text file
+    :type  parameters: dict
     :param logger: the logger object
     :type  logger: :class:`aeneas.logger.Logger`
+    :param data: the contents of the text file
+    :type  data: string
     """
 
     TAG = "TextFile"
@@ -129,16 +141,18 @@ class TextFile(object):
             file_path=None,
             file_format=None,
             parameters=None,
-            logger=None
+            logger=None,
+            data=None
         ):
         self.file_path = file_path
         self.file_format = file_format
         self.parameters = parameters
+        self.data = data
         self.fragments = []
         self.logger = Logger()
         if logger != None:
             self.logger = logger
-        if (self.file_path != None) and (self.file_format != None):
+        if ((self.file_path != None) or (self.data != None)) and (self.file_format != None):
             self._read_from_file()
 
     def __len__(self):
@@ -210,7 +224,7 @@ class TextFile(object):
         """
 
         # test if we can read the given file
-        if not os.path.isfile(self.file_path):
+        if (self.data == None) and (not os.path.isfile(self.file_path)):
             msg = "File '%s' cannot be read" % self.file_path
             self._log(msg, Logger.CRITICAL)
             raise OSError(msg)
@@ -221,10 +235,14 @@ class TextFile(object):
             raise ValueError(msg)
 
         # read the contents of the file
-        self._log("Reading contents of file '%s'" % self.file_path)
-        text_file = codecs.open(self.file_path, "r", "utf-8")
-        lines = text_file.readlines()
-        text_file.close()
+        if self.data == None:
+            self._log("Reading contents of file '%s'" % self.file_path)
+            text_file = codecs.open(self.file_path, "r", "utf-8")
+            lines = text_file.readlines()
+            text_file.close()
+        else:
+            self._log("Reading contents of file '%s' from memory" % self.file_path)
+            lines = self.data.decode("utf-8").splitlines(True)
 
         # clear text fragments
         self.clear()
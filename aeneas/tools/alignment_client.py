@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Submit a task or a job to an alignment server
+started with ``aeneas.tools.alignment_server``,
+and print the result.
+"""
+
+import json
+import os
+import sys
+import urllib2
+
+import aeneas.globalconstants as gc
+from aeneas.tools import get_rel_path
+
+__author__ = "Alberto Pettarin"
+__copyright__ = """
+    Copyright 2012-2013, Alberto Pettarin (www.albertopettarin.it)
+    Copyright 2013-2015, ReadBeyond Srl (www.readbeyond.it)
+    """
+__license__ = "GNU AGPL 3"
+__version__ = "1.0.0"
+__email__ = "aeneas@readbeyond.it"
+__status__ = "Production"
+
+SERVER_URL_VARIABLE = "AENEAS_SERVER"
+""" Environment variable holding the URL of the server """
+
+def usage():
+    name = "aeneas.tools.alignment_client"
+    dir_path = get_rel_path("../tests/res/example_jobs/example1/OEBPS/Resources")
+    config_string = "task_language=en|os_task_file_format=srt|is_text_type=parsed"
+    file_path = get_rel_path("../tests/res/container/job.zip")
+    print ""
+    print "Usage:"
+    print "  $ python -m %s task path/to/audio.mp3 path/to/text.txt config_string /path/to/output/file.smil" % name
+    print "  $ python -m %s job /path/to/container [config_string] /path/to/output/dir" % name
+    print "  $ python -m %s status" % name
+    print ""
+    print "The server URL is read from the %s environment variable" % SERVER_URL_VARIABLE
+    print "(default: %s)" % server_url()
+    print ""
+    print "Example:"
+    print "  $ DIR=\"%s\"" % dir_path
+    print "  $ CONFIG_STRING=\"%s\"" % config_string
+    print "  $ python -m %s task $DIR/sonnet001.mp3 $DIR/sonnet001.txt \"$CONFIG_STRING\" /tmp/sonnet001.srt" % name
+    print "  $ python -m %s job %s /tmp/" % (name, file_path)
+    print ""
+
+def server_url():
+    """
+    Return the URL of the server.
+
+    :rtype: string
+    """
+    return os.environ.get(
+        SERVER_URL_VARIABLE,
+        "http://%s:%d" % (gc.SERVER_HOST, gc.SERVER_PORT)
+    )
+
+def submit(path, request=None):
+    """
+    Send the given request to the server,
+    and return its (decoded) response.
+
+    If ``request`` is ``None``, send a GET request.
+
+    :param path: the path of the request, e.g. ``/task``
+    :type  path: string
+    :param request: the request
+    :type  request: dict
+    :rtype: dict
+    """
+    data = None
+    if request != None:
+        data = json.dumps(request)
+    http_request = urllib2.Request(
+        server_url() + path,
+        data,
+        {"Content-Type": "application/json"}
+    )
+    try:
+        return json.loads(urllib2.urlopen(http_request).read())
+    except urllib2.HTTPError as exc:
+        return json.loads(exc.read())
+
+def main():
+    if len(sys.argv) < 2:
+        usage()
+        return
+    mode = sys.argv[1]
+    if (mode == "task") and (len(sys.argv) >= 6):
+        path = "/task"
+        request = {
+            "audio_file_path": os.path.abspath(sys.argv[2]),
+            "text_file_path": os.path.abspath(sys.argv[3]),
+            "config_string": sys.argv[4],
+            "sync_map_file_path": os.path.abspath(sys.argv[5])
+        }
+    elif (mode == "job") and (len(sys.argv) >= 4):
+        path = "/job"
+        request = {"container_path": os.path.abspath(sys.argv[2])}
+        if len(sys.argv) >= 5:
+            request["config_string"] = sys.argv[3]
+            request["output_directory"] = os.path.abspath(sys.argv[4])
+        else:
+            request["output_directory"] = os.path.abspath(sys.argv[3])
+    elif mode == "status":
+        path = "/status"
+        request = None
+    else:
+        usage()
+        return
+
+    try:
+        response = submit(path, request)
+    except (urllib2.URLError, ValueError) as exc:
+        print "[ERRO] Cannot contact the server at %s: %s" % (server_url(), exc)
+        return
+
+    if mode == "status":
+        for key in sorted(response.keys()):
+            print "[INFO] %s: %s" % (key, response[key])
+    elif not response["success"]:
+        print "[ERRO] %s" % response.get("error", "An error occurred while executing the %s" % mode)
+    elif mode == "task":
+        print "[INFO] Created %s (%.3f s)" % (response["sync_map_file_path"], response["elapsed"])
+    else:
+        print "[INFO] Created %s (%.3f s)" % (response["output_path"], response["elapsed"])
+
+if __name__ == '__main__':
+    main()
+
+
+
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Run a long-running alignment server,
+which executes the tasks and jobs
+submitted with ``aeneas.tools.alignment_client``.
+"""
+
+import sys
+
+import aeneas.globalconstants as gc
+from aeneas.alignmentserver import AlignmentServer
+from aeneas.logger import Logger
+
+__author__ = "Alberto Pettarin"
+__copyright__ = """
+    Copyright 2012-2013, Alberto Pettarin (www.albertopettarin.it)
+    Copyright 2013-2015, ReadBeyond Srl (www.readbeyond.it)
+    """
+__license__ = "GNU AGPL 3"
+__version__ = "1.0.0"
+__email__ = "aeneas@readbeyond.it"
+__status__ = "Production"
+
+def usage():
+    name = "aeneas.tools.alignment_server"
+    print ""
+    print "Usage:"
+    print "  $ python -m %s [port [workers [/path/to/cache/dir]]]" % name
+    print ""
+    print "Example:"
+    print "  $ python -m %s" % name
+    print "  $ python -m %s %d 4 /tmp/aeneas_cache" % (name, gc.SERVER_PORT)
+    print ""
+
+def main():
+    port = gc.SERVER_PORT
+    workers = gc.SERVER_WORKERS
+    cache_directory = gc.EXECUTE_TASK_CACHE_DIRECTORY
+    try:
+        if len(sys.argv) >= 2:
+            port = int(sys.argv[1])
+        if len(sys.argv) >= 3:
+            workers = int(sys.argv[2])
+    except ValueError:
+        usage()
+        return
+    if len(sys.argv) >= 4:
+        cache_directory = sys.argv[3]
+
+    logger = Logger(tee=False)
+    server = AlignmentServer(
+        port=port,
+        workers=workers,
+        cache_directory=cache_directory,
+        logger=logger
+    )
+    print "[INFO] Listening on %s:%d (press CTRL+C to stop)" % server.server_address
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print "[INFO] Stopped"
+
+if __name__ == '__main__':
+    main()
+
+
+
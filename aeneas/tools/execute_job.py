@@ -57,12 +57,20 @@ def main():
         print "[ERRO] The job cannot be loaded from the specified container"
         return
 
+    # the sync maps are written into the output container
+    # as soon as each task is done
+    if not executor.open_output_container(output_dir):
+        print "[ERRO] The output container cannot be created"
+        executor.clean(True)
+        return
+
     print "[INFO] Executing..."
     result = executor.execute()
     print "[INFO] Executing... done"
 
     if not result:
         print "[ERRO] An error occurred while executing the job"
+        executor.clean(True)
         return
 
     print "[INFO] Creating output container..."
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Run a spool runner, which executes the job containers
+moved into a spool directory, and writes
+the output containers into an outbox directory.
+"""
+
+import sys
+
+import aeneas.globalconstants as gc
+from aeneas.logger import Logger
+from aeneas.spoolrunner import SpoolRunner
+
+__author__ = "Alberto Pettarin"
+__copyright__ = """
+    Copyright 2012-2013, Alberto Pettarin (www.albertopettarin.it)
+    Copyright 2013-2015, ReadBeyond Srl (www.readbeyond.it)
+    """
+__license__ = "GNU AGPL 3"
+__version__ = "1.0.0"
+__email__ = "aeneas@readbeyond.it"
+__status__ = "Production"
+
+def usage():
+    name = "aeneas.tools.spool_runner"
+    print ""
+    print "Usage:"
+    print "  $ python -m %s /path/to/spool/dir /path/to/outbox/dir [workers [once]]" % name
+    print ""
+    print "Options:"
+    print "  once : exit when the spool directory is empty"
+    print ""
+    print "Example:"
+    print "  $ python -m %s /tmp/spool /tmp/outbox" % name
+    print "  $ python -m %s /tmp/spool /tmp/outbox 4" % name
+    print "  $ python -m %s /tmp/spool /tmp/outbox 4 once" % name
+    print ""
+
+def main():
+    if len(sys.argv) < 3:
+        usage()
+        return
+    spool_directory = sys.argv[1]
+    outbox_directory = sys.argv[2]
+    workers = gc.SPOOL_WORKERS
+    try:
+        if len(sys.argv) >= 4:
+            workers = int(sys.argv[3])
+    except ValueError:
+        usage()
+        return
+    once = (len(sys.argv) >= 5) and (sys.argv[4] == "once")
+
+    logger = Logger(tee=False)
+    runner = SpoolRunner(
+        spool_directory,
+        outbox_directory,
+        workers=workers,
+        logger=logger
+    )
+    print "[INFO] Watching '%s' (press CTRL+C to stop)" % spool_directory
+    try:
+        runner.run(once=once)
+    except KeyboardInterrupt:
+        runner.stop()
+        print "[INFO] Stopped"
+    status = runner.status()
+    print "[INFO] Completed: %d" % status["completed"]
+    print "[INFO] Failed:    %d" % status["failed"]
+
+if __name__ == '__main__':
+    main()
+
+
+
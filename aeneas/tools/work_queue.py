@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Submit jobs to a work queue in a shared directory,
+execute their tasks on this node,
+and gather their output containers.
+"""
+
+import sys
+
+from aeneas.logger import Logger
+from aeneas.workqueue import WorkQueue, WorkQueueNode
+
+__author__ = "Alberto Pettarin"
+__copyright__ = """
+    Copyright 2012-2013, Alberto Pettarin (www.albertopettarin.it)
+    Copyright 2013-2015, ReadBeyond Srl (www.readbeyond.it)
+    """
+__license__ = "GNU AGPL 3"
+__version__ = "1.0.0"
+__email__ = "aeneas@readbeyond.it"
+__status__ = "Production"
+
+def usage():
+    name = "aeneas.tools.work_queue"
+    print ""
+    print "Usage:"
+    print "  $ python -m %s /path/to/queue/dir submit /path/to/container [config_string]" % name
+    print "  $ python -m %s /path/to/queue/dir work [wait]" % name
+    print "  $ python -m %s /path/to/queue/dir status" % name
+    print "  $ python -m %s /path/to/queue/dir gather job_id /path/to/output/dir" % name
+    print ""
+    print "Options:"
+    print "  wait : keep waiting for new tasks when the queue is empty"
+    print ""
+    print "Example:"
+    print "  $ python -m %s /nfs/queue submit /nfs/input/job.zip" % name
+    print "  $ python -m %s /nfs/queue work" % name
+    print "  $ python -m %s /nfs/queue status" % name
+    print "  $ python -m %s /nfs/queue gather 9b9ec5b2-6f37-4f4b-9b1f-2a8e1b1d3c11 /nfs/output" % name
+    print ""
+
+def main():
+    if len(sys.argv) < 3:
+        usage()
+        return
+    directory = sys.argv[1]
+    mode = sys.argv[2]
+
+    logger = Logger(tee=False)
+    queue = WorkQueue(directory, logger=logger)
+    if (mode == "submit") and (len(sys.argv) >= 4):
+        config_string = None
+        if len(sys.argv) >= 5:
+            config_string = sys.argv[4]
+        job_id = queue.submit(sys.argv[3], config_string)
+        if job_id == None:
+            print "[ERRO] Cannot submit the job"
+        else:
+            print "[INFO] Submitted job '%s'" % job_id
+    elif mode == "work":
+        wait = (len(sys.argv) >= 4) and (sys.argv[3] == "wait")
+        node = WorkQueueNode(queue, logger=logger)
+        print "[INFO] Node '%s' working on '%s'" % (node.node_id, directory)
+        try:
+            executed = node.run(wait=wait)
+            print "[INFO] Executed %d tasks" % executed
+        except KeyboardInterrupt:
+            print "[INFO] Stopped"
+    elif mode == "status":
+        for job_id in queue.jobs():
+            status = queue.status(job_id)
+            print "[INFO] %s: %d tasks, %d succeeded, %d failed, %d leased, %d pending" % (
+                job_id,
+                status["tasks"],
+                status["succeeded"],
+                status["failed"],
+                status["leased"],
+                status["pending"]
+            )
+    elif (mode == "gather") and (len(sys.argv) >= 5):
+        result, path = queue.gather(sys.argv[3], sys.argv[4])
+        if result:
+            print "[INFO] Created output file '%s'" % path
+        else:
+            print "[ERRO] Cannot gather the job"
+    else:
+        usage()
+
+if __name__ == '__main__':
+    main()
+
+
+
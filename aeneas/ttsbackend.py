@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+This module contains the text-to-speech (TTS) backends
+used by :class:`aeneas.synthesizer.Synthesizer`
+to synthesize a list of text fragments.
+
+The classes provided by this module are:
+
+1. :class:`aeneas.ttsbackend.TTSBackendType`
+   is an enumeration of the available backends.
+2. :class:`aeneas.ttsbackend.TTSBackend`
+   is the base class (interface) of all the backends.
+3. :class:`aeneas.ttsbackend.ESPEAKTTSBackend`
+   synthesizes text using ``espeak``.
+4. :class:`aeneas.ttsbackend.FakeTTSBackend`
+   generates a deterministic tone/noise signal,
+   without calling any external program.
+   It is meant for benchmarking and testing only.
+
+A backend synthesizes a batch of text fragments,
+possibly at a given speed factor
+(``1.0`` is the natural speed of the backend,
+``0.5`` is twice as slow, ``2.0`` is twice as fast),
+and it returns a triple ``(samples, sample_rate, durations)``:
+
+1. ``samples`` is a mono ``numpy`` array
+   containing the concatenation of the synthesized fragments;
+2. ``sample_rate`` is the sample rate of ``samples``, in Hz;
+3. ``durations`` is the list of the durations,
+   in seconds, of each fragment.
+"""
+
+import numpy
+import os
+import tempfile
+import zlib
+from scikits.audiolab import wavread
+
+import aeneas.globalconstants as gc
+import aeneas.globalfunctions as gf
+from aeneas.espeakwrapper import ESPEAKWrapper
+from aeneas.logger import Logger
+
+__author__ = "Alberto Pettarin"
+__copyright__ = """
+    Copyright 2012-2013, Alberto Pettarin (www.albertopettarin.it)
+    Copyright 2013-2015, ReadBeyond Srl (www.readbeyond.it)
+    """
+__license__ = "GNU AGPL v3"
+__version__ = "1.0.0"
+__email__ = "aeneas@readbeyond.it"
+__status__ = "Production"
+
+class TTSBackendType(object):
+    """
+    Enumeration of the available TTS backends.
+    """
+
+    ESPEAK = "espeak"
+    """ Synthesize with ``espeak`` """
+
+    FAKE = "fake"
+    """ Generate a deterministic tone/noise signal (for benchmarking) """
+
+    ALLOWED_VALUES = [ESPEAK, FAKE]
+    """ List of all the allowed values """
+
+
+
+def create_tts_backend(backend_type=None, logger=None):
+    """
+    Create a TTS backend object of the given type.
+
+    If ``backend_type`` is ``None``, use
+    :class:`aeneas.globalconstants.SYNTHESIZER_TTS_BACKEND`.
+
+    :param backend_type: the type of backend to create
+    :type  backend_type: string (from :class:`aeneas.ttsbackend.TTSBackendType` enumeration)
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    :rtype: :class:`aeneas.ttsbackend.TTSBackend`
+    """
+    if backend_type == None:
+        backend_type = gc.SYNTHESIZER_TTS_BACKEND
+    if backend_type == TTSBackendType.ESPEAK:
+        return ESPEAKTTSBackend(logger=logger)
+    if backend_type == TTSBackendType.FAKE:
+        return FakeTTSBackend(logger=logger)
+    raise ValueError("TTS backend '%s' is not supported." % backend_type)
+
+
+
+class TTSBackend(object):
+    """
+    Base class for TTS backends.
+
+    Subclasses must implement ``synthesize``.
+
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    """
+
+    TAG = "TTSBackend"
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        if self.logger == None:
+            self.logger = Logger()
+        self.characters_per_second = None
+
+    @property
+    def characters_per_second(self):
+        """
+        The (average) number of characters per second
+        synthesized by this backend at its natural speed,
+        or ``None`` if unknown.
+
+        It is used to estimate the speed factor
+        that matches a given target duration.
+
+        :rtype: float
+        """
+        return self.__characters_per_second
+    @characters_per_second.setter
+    def characters_per_second(self, characters_per_second):
+        self.__characters_per_second = characters_per_second
+
+    def _log(self, message, severity=Logger.DEBUG):
+        self.logger.log(message, severity, self.TAG)
+
+    def parameters(self):
+        """
+        Return the sorted list of the ``name=value`` strings
+        of the parameters of this backend
+        affecting the synthesized samples
+        (e.g., to be included in the key of a cache).
+
+        Subclasses having their own parameters must extend it.
+
+        :rtype: list of strings
+        """
+        return ["characters_per_second=%s" % self.characters_per_second]
+
+    def synthesize(self, fragments, speed=1.0):
+        """
+        Synthesize the given text fragments,
+        at the given speed factor.
+
+        Return a triple ``(samples, sample_rate, durations)``,
+        where ``samples`` is a mono ``numpy`` array
+        holding the concatenation of the synthesized fragments,
+        ``sample_rate`` is its sample rate, in Hz,
+        and ``durations`` is the list of fragment durations, in seconds.
+
+        A fragment with no text must have zero duration.
+
+        :param fragments: the text fragments to be synthesized
+        :type  fragments: list of :class:`aeneas.textfile.TextFragment`
+        :param speed: the speed factor (``1.0`` is the natural speed)
+        :type  speed: float
+        :rtype: tuple (see above)
+        """
+        raise NotImplementedError("This method must be implemented by a subclass")
+
+
+
+class ESPEAKTTSBackend(TTSBackend):
+    """
+    A TTS backend synthesizing text with ``espeak``,
+    one fragment at a time.
+
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    """
+
+    TAG = "ESPEAKTTSBackend"
+
+    ESPEAK_SAMPLE_RATE = 22050
+    """ Sample rate of the ``wav`` files produced by ``espeak`` """
+
+    CHARACTERS_PER_SECOND = 14.0
+    """ Characters per second synthesized by ``espeak``
+    at its default speed (roughly ``175`` words per minute) """
+
+    def __init__(self, logger=None):
+        TTSBackend.__init__(self, logger=logger)
+        self.characters_per_second = self.CHARACTERS_PER_SECOND
+
+    def synthesize(self, fragments, speed=1.0):
+        espeak = ESPEAKWrapper(logger=self.logger)
+        espeak_speed = None
+        if speed != 1.0:
+            espeak_speed = int(round(ESPEAKWrapper.DEFAULT_SPEED * speed))
+            self._log("Synthesizing at %d words per minute" % espeak_speed)
+        waves = []
+        durations = []
+        sample_rate = None
+        num = 0
+        for fragment in fragments:
+            # synthesize and get the duration of the output file
+            self._log("Synthesizing fragment %d" % num)
+            handler, tmp_destination = tempfile.mkstemp(
+                suffix=".wav",
+                dir=gf.custom_tmp_dir()
+            )
+            duration = espeak.synthesize(
+                text=fragment.text,
+                language=fragment.language,
+                output_file_path=tmp_destination,
+                speed=espeak_speed
+            )
+            if duration > 0:
+                self._log("Fragment %d duration: %f" % (num, duration))
+                data, sample_rate, encoding = wavread(tmp_destination)
+                waves.append(data)
+            else:
+                self._log("Fragment %d has zero duration" % num)
+            durations.append(duration)
+
+            # remove temporary file
+            self._log("Removing temporary file '%s'" % tmp_destination)
+            os.close(handler)
+            os.remove(tmp_destination)
+            num += 1
+
+        # concatenate once, instead of appending fragment by fragment
+        if len(waves) > 0:
+            samples = numpy.concatenate(waves)
+        else:
+            samples = numpy.array([])
+        if sample_rate == None:
+            sample_rate = self.ESPEAK_SAMPLE_RATE
+        return (samples, sample_rate, durations)
+
+
+
+class FakeTTSBackend(TTSBackend):
+    """
+    A TTS backend producing, for each fragment,
+    a deterministic signal made of one short tone
+    for each character, mixed with a little noise.
+    Whitespace characters are rendered as (almost) silence.
+
+    The same text always produces the same samples,
+    and the duration of a fragment is proportional
+    to the number of its characters.
+
+    No external program is called, so this backend
+    can be used to benchmark and stress-test the whole pipeline
+    on machines where ``espeak`` is not installed.
+
+    :param character_duration: the duration of each character, in seconds
+    :type  character_duration: float
+    :param sample_rate: the sample rate of the generated signal, in Hz
+    :type  sample_rate: int
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    """
+
+    TAG = "FakeTTSBackend"
+
+    BASE_FREQUENCY = 200.0
+    """ Frequency of the lowest tone, in Hz """
+
+    FREQUENCY_STEP = 50.0
+    """ Frequency step between tones, in Hz """
+
+    FREQUENCY_STEPS = 32
+    """ Number of distinct tones """
+
+    NOISE_AMPLITUDE = 0.01
+    """ Amplitude of the additive noise """
+
+    TONE_AMPLITUDE = 0.5
+    """ Amplitude of each tone """
+
+    def __init__(
+            self,
+            character_duration=gc.SYNTHESIZER_FAKE_CHARACTER_DURATION,
+            sample_rate=gc.SYNTHESIZER_FAKE_SAMPLE_RATE,
+            logger=None
+        ):
+        TTSBackend.__init__(self, logger=logger)
+        self.character_duration = character_duration
+        self.sample_rate = sample_rate
+        self.characters_per_second = 1.0 / character_duration
+
+    def parameters(self):
+        return sorted(TTSBackend.parameters(self) + [
+            "character_duration=%s" % self.character_duration,
+            "sample_rate=%s" % self.sample_rate
+        ])
+
+    def synthesize(self, fragments, speed=1.0):
+        character_duration = self.character_duration / speed
+        waves = []
+        durations = []
+        num = 0
+        for fragment in fragments:
+            self._log("Synthesizing fragment %d" % num)
+            data = self._synthesize_text(fragment.text, character_duration)
+            duration = float(len(data)) / self.sample_rate
+            self._log("Fragment %d duration: %f" % (num, duration))
+            waves.append(data)
+            durations.append(duration)
+            num += 1
+        if len(waves) > 0:
+            samples = numpy.concatenate(waves)
+        else:
+            samples = numpy.array([])
+        return (samples, self.sample_rate, durations)
+
+    def _synthesize_text(self, text, character_duration):
+        """
+        Return the samples for the given text.
+
+        :param text: the text to synthesize
+        :type  text: unicode
+        :param character_duration: the duration of each character, in seconds
+        :type  character_duration: float
+        :rtype: numpy array
+        """
+        if (text == None) or (len(text) == 0):
+            return numpy.array([])
+        char_samples = max(1, int(character_duration * self.sample_rate))
+        # the noise is seeded with the text, so that it is reproducible
+        encoded = text
+        if isinstance(text, unicode):
+            encoded = text.encode("utf-8")
+        seed = zlib.crc32(encoded) & 0xffffffff
+        noise = numpy.random.RandomState(seed).uniform(
+            -self.NOISE_AMPLITUDE,
+            self.NOISE_AMPLITUDE,
+            char_samples * len(text)
+        )
+        # one tone per character, with a triangular envelope
+        frequencies = numpy.array([
+            0.0 if char.isspace() else
+            self.BASE_FREQUENCY + self.FREQUENCY_STEP * (ord(char) % self.FREQUENCY_STEPS)
+            for char in text
+        ])
+        times = numpy.arange(char_samples, dtype=numpy.float64) / self.sample_rate
+        envelope = 1.0 - numpy.abs(numpy.linspace(-1.0, 1.0, char_samples))
+        tones = numpy.sin(2 * numpy.pi * numpy.outer(frequencies, times))
+        tones *= self.TONE_AMPLITUDE * envelope
+        return tones.ravel() + noise
@@ -407,14 +407,27 @@ class Validator(object):
         self._log("Checking task configuration: returning %s" % result.passed)
         return result
 
-    def check_container(self, container_path, container_format=None):
+    def check_container(self, container_path, container_format=None, container_data=None):
         """
         Check whether the given container is well-formed.
 
+        If the check passes, the returned result
+        holds the job analyzed from the container,
+        and the container itself, with its entries indexed
+        (see :class:`aeneas.validator.ValidatorResult`),
+        so that they can be reused, e.g., to load the job.
+
+        If ``container_data`` is not ``None``,
+        the container is held in memory
+        (see :class:`aeneas.container.Container`),
+        and ``container_path`` is used only in messages.
+
         :param container_path: the path of the container to be checked
         :type  container_path: string (path)
         :param container_format: the format of the container
         :type  container_format: string (from ContainerFormat enumeration)
+        :param container_data: the contents of the container
+        :type  container_data: string
         :rtype: :class:`aeneas.validator.ValidatorResult`
         """
         self._log("Checking container file '%s'" % container_path)
@@ -423,7 +436,7 @@ class Validator(object):
 
         # check the container file exists
         self._log("Checking container file exists")
-        if not os.path.exists(container_path):
+        if (container_data == None) and (not os.path.exists(container_path)):
             msg = "Container file '%s' not found." % container_path
             result.passed = False
             result.add_error(msg)
@@ -432,24 +445,25 @@ class Validator(object):
 
         # check if we have config.xml or config.txt
         self._log("Checking container file has config file")
-        container = Container(container_path, container_format)
-        if container.has_config_xml:
-            self._log("Container has XML config file")
-            result = self._check_container_with_xml_config(
-                container=container,
-                config_contents=None
-            )
-        elif container.has_config_txt:
-            self._log("Container has TXT config file")
-            result = self._check_container_with_txt_config_string(
-                container=container,
-                config_string=None
-            )
-        else:
-            msg = "Container does not have a TXT or XML configuration file."
-            result.passed = False
-            result.add_error(msg)
-            self._log(msg)
+        with Container(container_path, container_format, data=container_data) as container:
+            if container.has_config_xml:
+                self._log("Container has XML config file")
+                result = self._check_container_with_xml_config(
+                    container=container,
+                    config_contents=None
+                )
+            elif container.has_config_txt:
+                self._log("Container has TXT config file")
+                result = self._check_container_with_txt_config_string(
+                    container=container,
+                    config_string=None
+                )
+            else:
+                msg = "Container does not have a TXT or XML configuration file."
+                result.passed = False
+                result.add_error(msg)
+                self._log(msg)
+            result.container = container
 
         # return result
         self._log("Checking container: returning %s" % result.passed)
@@ -459,26 +473,35 @@ class Validator(object):
             self,
             container_path,
             config_string,
-            container_format=None
+            container_format=None,
+            container_data=None
         ):
         """
         Check whether the given container and configuration strings
         from the wizard are well-formed.
 
+        As for ``check_container``, the returned result
+        holds the analyzed job and the container,
+        which can be held in memory as well.
+
         :param container_path: the path of the container to be checked
         :type  container_path: string (path)
         :param config_string: the configuration string generated by the wizard
         :type  config_string: string
         :param container_format: the format of the container
         :type  container_format: string (from ContainerFormat enumeration)
+        :param container_data: the contents of the container
+        :type  container_data: string
         :rtype: :class:`aeneas.validator.ValidatorResult`
         """
         self._log("Checking container from wizard")
-        container = Container(container_path, container_format)
-        return self._check_container_with_txt_config_string(
-            container=container,
-            config_string=config_string
-        )
+        with Container(container_path, container_format, data=container_data) as container:
+            result = self._check_container_with_txt_config_string(
+                container=container,
+                config_string=config_string
+            )
+            result.container = container
+            return result
 
     def _check_container_with_txt_config_string(
             self,
@@ -531,6 +554,8 @@ class Validator(object):
         else:
             job = analyzer.analyze_from_wizard(config_string)
         self._check_analyzed_job(job, container, result)
+        if result.passed:
+            result.job = job
 
         # return result
         self._log("Checking container with TXT config file: returning %s" % result.passed)
@@ -637,6 +662,8 @@ class Validator(object):
         analyzer = AnalyzeContainer(container)
         job = analyzer.analyze()
         self._check_analyzed_job(job, container, result)
+        if result.passed:
+            result.job = job
 
         # return result
         self._log("Checking container: returning %s" % result.passed)
@@ -782,6 +809,8 @@ class ValidatorResult(object):
         self.passed = True
         self.warnings = []
         self.errors = []
+        self.job = None
+        self.container = None
 
     def __str__(self):
         accumulator = ""
@@ -834,6 +863,35 @@ class ValidatorResult(object):
     def errors(self, errors):
         self.__errors = errors
 
+    @property
+    def job(self):
+        """
+        The job analyzed while validating a container,
+        if the validation passed, or ``None``.
+
+        :rtype: :class:`aeneas.job.Job`
+        """
+        return self.__job
+    @job.setter
+    def job(self, job):
+        self.__job = job
+
+    @property
+    def container(self):
+        """
+        The validated container, with its entries already indexed,
+        or ``None`` if no container was validated.
+
+        Its archive file is closed, but it is opened again
+        if the container is used.
+
+        :rtype: :class:`aeneas.container.Container`
+        """
+        return self.__container
+    @container.setter
+    def container(self, container):
+        self.__container = container
+
     def add_warning(self, message):
         """
         Add a message to the warnings.
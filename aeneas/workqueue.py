@@ -0,0 +1,747 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+A work queue distributing the tasks of jobs
+among several nodes (machines or processes)
+sharing a directory, without a broker.
+
+Each job submitted to the queue (see :class:`aeneas.workqueue.WorkQueue`)
+is split into work items, one per task.
+Each node (see :class:`aeneas.workqueue.WorkQueueNode`)
+leases a pending item by creating its lease file exclusively,
+executes the task, stores its sync map in the results directory
+of the job, and marks the item as done.
+While executing, the node renews its lease periodically:
+if a node fails, its lease expires,
+and the item is leased again by another node.
+Once all the items of a job are done,
+the sync maps are gathered into a single output container.
+
+The queue directory is organized as follows: ::
+
+    queue/
+        JOB_ID/
+            job.json         # the container and the tasks of the job
+            leases/
+                0.lease      # item 0 is leased by some node
+            results/         # the sync maps of the completed tasks
+            done/
+                1.json       # item 1 is done (succeeded or failed)
+
+The directory must be on a filesystem shared by all the nodes,
+supporting exclusive file creation (``O_EXCL``) and atomic renames,
+and the container of each job must be readable by all the nodes
+at the path given on submission.
+"""
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+
+import aeneas.globalconstants as gc
+from aeneas.checkpoint import CheckpointStore
+from aeneas.executejob import ExecuteJob
+from aeneas.executetask import ExecuteTask
+from aeneas.logger import Logger
+
+__author__ = "Alberto Pettarin"
+__copyright__ = """
+    Copyright 2012-2013, Alberto Pettarin (www.albertopettarin.it)
+    Copyright 2013-2015, ReadBeyond Srl (www.readbeyond.it)
+    """
+__license__ = "GNU AGPL v3"
+__version__ = "1.0.0"
+__email__ = "aeneas@readbeyond.it"
+__status__ = "Production"
+
+class WorkItem(object):
+    """
+    A work item leased by a node,
+    that is, a task of a job in the queue.
+
+    :param job_id: the identifier of the job
+    :type  job_id: string
+    :param index: the index of the task in the job
+    :type  index: int
+    :param node_id: the identifier of the node holding the lease
+    :type  node_id: string
+    :param token: the token identifying the lease
+    :type  token: string
+    """
+
+    def __init__(self, job_id, index, node_id, token):
+        self.job_id = job_id
+        self.index = index
+        self.node_id = node_id
+        self.token = token
+
+    def __str__(self):
+        return "%s/%d" % (self.job_id, self.index)
+
+
+
+class WorkQueue(object):
+    """
+    A work queue stored in a shared directory.
+
+    :param directory: the path of the queue directory
+    :type  directory: string (path)
+    :param lease_duration: the time, in seconds, after which
+                           a lease not renewed expires. Default:
+                           :class:`aeneas.globalconstants.WORK_QUEUE_LEASE_DURATION`
+    :type  lease_duration: float
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    """
+
+    TAG = "WorkQueue"
+
+    JOB_FILE_NAME = "job.json"
+    """ Name of the description file of a job """
+
+    LEASES_DIRECTORY_NAME = "leases"
+    """ Name of the directory of the leases of a job """
+
+    RESULTS_DIRECTORY_NAME = "results"
+    """ Name of the directory of the sync maps of a job """
+
+    DONE_DIRECTORY_NAME = "done"
+    """ Name of the directory of the completed items of a job """
+
+    LEASE_EXTENSION = ".lease"
+    """ Extension of the lease files """
+
+    def __init__(
+            self,
+            directory,
+            lease_duration=gc.WORK_QUEUE_LEASE_DURATION,
+            logger=None
+        ):
+        self.directory = directory
+        self.lease_duration = lease_duration
+        self.logger = logger
+        if self.logger == None:
+            self.logger = Logger()
+        self.descriptions = dict()
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def _log(self, message, severity=Logger.DEBUG):
+        """ Log """
+        self.logger.log(message, severity, self.TAG)
+
+    def _job_path(self, job_id, *names):
+        return os.path.join(self.directory, job_id, *names)
+
+    def _lease_path(self, job_id, index):
+        return self._job_path(
+            job_id,
+            self.LEASES_DIRECTORY_NAME,
+            "%d%s" % (index, self.LEASE_EXTENSION)
+        )
+
+    def _done_path(self, job_id, index):
+        return self._job_path(job_id, self.DONE_DIRECTORY_NAME, "%d.json" % index)
+
+    @classmethod
+    def _write_json(cls, path, contents):
+        """
+        Write the given contents as JSON into the given file, atomically.
+        """
+        handler, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        with os.fdopen(handler, "wb") as json_file:
+            json.dump(contents, json_file, sort_keys=True)
+        os.rename(tmp_path, path)
+
+    @classmethod
+    def _read_json(cls, path):
+        """
+        Read the JSON contents of the given file,
+        or return ``None`` if it does not exist or it is not valid.
+        """
+        try:
+            with open(path, "rb") as json_file:
+                return json.load(json_file)
+        except (IOError, ValueError):
+            return None
+
+    @classmethod
+    def describe_task(cls, task):
+        """
+        Return the description of the given task,
+        used by the nodes to check that they execute
+        the same task the job was submitted with.
+
+        :param task: the task
+        :type  task: :class:`aeneas.task.Task`
+        :rtype: dict
+        """
+        return {
+            "custom_id": task.configuration.custom_id,
+            "text_file_path": task.text_file_path,
+            "audio_file_path": task.audio_file_path
+        }
+
+    def submit(self, container_path, config_string=None):
+        """
+        Submit the job in the given container,
+        creating a work item for each of its tasks.
+
+        Return the identifier of the job,
+        or ``None`` if it cannot be loaded.
+
+        :param container_path: the path of the container,
+                               readable by all the nodes
+        :type  container_path: string (path)
+        :param config_string: the configuration string (from wizard)
+        :type  config_string: string
+        :rtype: string
+        """
+        container_path = os.path.abspath(container_path)
+        executor = ExecuteJob(logger=self.logger)
+        try:
+            if not executor.load_job_from_container(container_path, config_string):
+                self._log("Cannot load the job from '%s'" % container_path, Logger.WARNING)
+                return None
+            tasks = [self.describe_task(task) for task in executor.job.tasks]
+        finally:
+            executor.clean(True)
+        return self._create_job({
+            "container": container_path,
+            "config_string": config_string,
+            "tasks": tasks,
+            "submitted": time.time()
+        })
+
+    def _create_job(self, description):
+        """
+        Create the directory of a new job with the given description,
+        and return its identifier.
+
+        The job directory is created under a temporary name
+        and then renamed, so that nodes never see a partial job.
+
+        :param description: the description of the job
+        :type  description: dict
+        :rtype: string
+        """
+        job_id = str(uuid.uuid4()).lower()
+        tmp_directory = tempfile.mkdtemp(prefix=".", dir=self.directory)
+        for name in [
+                self.LEASES_DIRECTORY_NAME,
+                self.RESULTS_DIRECTORY_NAME,
+                self.DONE_DIRECTORY_NAME
+            ]:
+            os.makedirs(os.path.join(tmp_directory, name))
+        self._write_json(os.path.join(tmp_directory, self.JOB_FILE_NAME), description)
+        os.rename(tmp_directory, self._job_path(job_id))
+        self._log("Submitted job '%s' with %d tasks" % (job_id, len(description["tasks"])), Logger.INFO)
+        return job_id
+
+    def jobs(self):
+        """
+        Return the identifiers of the jobs in the queue,
+        oldest first.
+
+        :rtype: list of strings
+        """
+        jobs = []
+        for job_id in os.listdir(self.directory):
+            description = self.description(job_id)
+            if description != None:
+                jobs.append((description["submitted"], job_id))
+        return [job_id for submitted, job_id in sorted(jobs)]
+
+    def description(self, job_id):
+        """
+        Return the description of the given job,
+        or ``None`` if it is not in the queue.
+
+        :param job_id: the identifier of the job
+        :type  job_id: string
+        :rtype: dict
+        """
+        if job_id.startswith("."):
+            return None
+        if job_id not in self.descriptions:
+            description = self._read_json(self._job_path(job_id, self.JOB_FILE_NAME))
+            if description == None:
+                return None
+            self.descriptions[job_id] = description
+        return self.descriptions[job_id]
+
+    def results(self, job_id):
+        """
+        Return the store of the sync maps of the given job.
+
+        :param job_id: the identifier of the job
+        :type  job_id: string
+        :rtype: :class:`aeneas.checkpoint.CheckpointStore`
+        """
+        return CheckpointStore(
+            self._job_path(job_id, self.RESULTS_DIRECTORY_NAME),
+            logger=self.logger
+        )
+
+    def is_done(self, job_id, index):
+        """
+        Return ``True`` if the given item is done.
+
+        :rtype: bool
+        """
+        return os.path.exists(self._done_path(job_id, index))
+
+    def lease(self, node_id):
+        """
+        Lease a pending item, for the given node.
+
+        Return the leased item,
+        or ``None`` if no item is pending.
+
+        :param node_id: the identifier of the node
+        :type  node_id: string
+        :rtype: :class:`aeneas.workqueue.WorkItem`
+        """
+        for job_id in self.jobs():
+            for index in range(len(self.description(job_id)["tasks"])):
+                if self.is_done(job_id, index):
+                    continue
+                item = self._acquire(job_id, index, node_id)
+                if (item == None) and self._break_expired(job_id, index):
+                    item = self._acquire(job_id, index, node_id)
+                if item != None:
+                    if self.is_done(job_id, index):
+                        # completed since we checked
+                        self.release(item)
+                        continue
+                    self._log("Node '%s' leased item '%s'" % (node_id, item))
+                    return item
+        return None
+
+    def _acquire(self, job_id, index, node_id):
+        """
+        Create the lease file of the given item, exclusively.
+
+        Return the leased item, or ``None``
+        if the item is already leased.
+
+        :rtype: :class:`aeneas.workqueue.WorkItem`
+        """
+        token = str(uuid.uuid4()).lower()
+        try:
+            handler = os.open(
+                self._lease_path(job_id, index),
+                os.O_CREAT | os.O_EXCL | os.O_WRONLY
+            )
+        except OSError:
+            return None
+        with os.fdopen(handler, "wb") as lease_file:
+            json.dump({"node": node_id, "token": token}, lease_file)
+        return WorkItem(job_id, index, node_id, token)
+
+    def _break_expired(self, job_id, index):
+        """
+        Remove the lease of the given item, if expired.
+
+        The lease file is first renamed to a name
+        unique to the caller, so that only one node breaks it;
+        if it turns out to be a different lease
+        than the expired one (i.e., it was broken and taken
+        by another node in the meantime), it is restored.
+
+        Return ``True`` if the expired lease has been removed.
+
+        :rtype: bool
+        """
+        path = self._lease_path(job_id, index)
+        try:
+            expired = (time.time() - os.path.getmtime(path)) > self.lease_duration
+        except OSError:
+            # released in the meantime
+            return True
+        if not expired:
+            return False
+        lease = self._read_json(path)
+        broken_path = "%s.%s" % (path, uuid.uuid4())
+        try:
+            os.rename(path, broken_path)
+        except OSError:
+            return False
+        if self._read_json(broken_path) != lease:
+            try:
+                os.link(broken_path, path)
+            except OSError:
+                pass
+            os.remove(broken_path)
+            return False
+        os.remove(broken_path)
+        node_id = None
+        if lease != None:
+            node_id = lease["node"]
+        self._log("Lease of item '%s/%d' held by '%s' expired" % (job_id, index, node_id), Logger.WARNING)
+        return True
+
+    def holds(self, item):
+        """
+        Return ``True`` if the lease of the given item
+        is still held by its node.
+
+        :param item: the leased item
+        :type  item: :class:`aeneas.workqueue.WorkItem`
+        :rtype: bool
+        """
+        lease = self._read_json(self._lease_path(item.job_id, item.index))
+        return (lease != None) and (lease.get("token") == item.token)
+
+    def renew(self, item):
+        """
+        Renew the lease of the given item.
+
+        Return ``False`` if the lease is no longer held by its node.
+
+        :param item: the leased item
+        :type  item: :class:`aeneas.workqueue.WorkItem`
+        :rtype: bool
+        """
+        if not self.holds(item):
+            return False
+        try:
+            os.utime(self._lease_path(item.job_id, item.index), None)
+        except OSError:
+            return False
+        return True
+
+    def release(self, item):
+        """
+        Release the lease of the given item,
+        if still held by its node.
+
+        :param item: the leased item
+        :type  item: :class:`aeneas.workqueue.WorkItem`
+        """
+        if self.holds(item):
+            try:
+                os.remove(self._lease_path(item.job_id, item.index))
+            except OSError:
+                pass
+
+    def complete(self, item, success, error=None, elapsed=0.0):
+        """
+        Mark the given item as done, and release its lease.
+
+        The done file is written into a temporary file,
+        and then linked to its final name, exclusively:
+        if the lease is no longer held by the node of the item,
+        or if the item has already been marked as done
+        (e.g., by another node which leased it
+        after the lease of this node expired),
+        the item is not marked again,
+        and ``False`` is returned.
+
+        If ``success`` is ``True``, the sync map of the task
+        must have been stored in the results of the job.
+
+        :param item: the leased item
+        :type  item: :class:`aeneas.workqueue.WorkItem`
+        :param success: ``True`` if the task succeeded
+        :type  success: bool
+        :param error: the error message, if the task failed
+        :type  error: string
+        :param elapsed: the execution time, in seconds
+        :type  elapsed: float
+        :rtype: bool
+        """
+        if not self.holds(item):
+            self._log("Node '%s' no longer holds item '%s'" % (item.node_id, item), Logger.WARNING)
+            return False
+        path = self._done_path(item.job_id, item.index)
+        tmp_path = "%s.%s" % (path, item.token)
+        self._write_json(tmp_path, {
+            "node": item.node_id,
+            "success": success,
+            "error": error,
+            "elapsed": elapsed
+        })
+        try:
+            # fails if the done file exists, like O_EXCL
+            os.link(tmp_path, path)
+        except OSError:
+            self._log("Item '%s' already done, result of node '%s' discarded" % (item, item.node_id), Logger.WARNING)
+            return False
+        finally:
+            os.remove(tmp_path)
+        self.release(item)
+        self._log("Node '%s' completed item '%s'" % (item.node_id, item))
+        return True
+
+    def status(self, job_id):
+        """
+        Return the status of the given job,
+        that is, the number of its items
+        succeeded, failed, leased and pending.
+
+        :param job_id: the identifier of the job
+        :type  job_id: string
+        :rtype: dict
+        """
+        description = self.description(job_id)
+        if description == None:
+            return None
+        status = {"tasks": 0, "succeeded": 0, "failed": 0, "leased": 0, "pending": 0}
+        for index in range(len(description["tasks"])):
+            status["tasks"] += 1
+            done = self._read_json(self._done_path(job_id, index))
+            if done != None:
+                if done["success"]:
+                    status["succeeded"] += 1
+                else:
+                    status["failed"] += 1
+            elif os.path.exists(self._lease_path(job_id, index)):
+                status["leased"] += 1
+            else:
+                status["pending"] += 1
+        status["finished"] = (status["succeeded"] + status["failed"] == status["tasks"])
+        return status
+
+    def gather(self, job_id, output_directory):
+        """
+        Gather the sync maps of the given job,
+        and write its output container
+        into the given directory.
+
+        Return a tuple ``(bool, string)``,
+        with the result of the operation
+        and the path of the output container:
+        the operation fails if some items are not done
+        or some tasks failed.
+
+        :param job_id: the identifier of the job
+        :type  job_id: string
+        :param output_directory: the path of the output directory
+        :type  output_directory: string (path)
+        :rtype: tuple
+        """
+        status = self.status(job_id)
+        if (status == None) or (status["succeeded"] < status["tasks"]):
+            self._log("Job '%s' not completed successfully" % job_id, Logger.WARNING)
+            return (False, None)
+        description = self.description(job_id)
+        results = self.results(job_id)
+        executor = ExecuteJob(logger=self.logger)
+        try:
+            if not executor.load_job_from_container(
+                    description["container"],
+                    description["config_string"]
+                ):
+                return (False, None)
+            for task in executor.job.tasks:
+                task.sync_map = results.load(task)
+                if task.sync_map == None:
+                    self._log("Job '%s' has missing results" % job_id, Logger.WARNING)
+                    return (False, None)
+            return executor.write_output_container(output_directory)
+        finally:
+            executor.clean(True)
+
+    def remove(self, job_id):
+        """
+        Remove the given job from the queue.
+
+        :param job_id: the identifier of the job
+        :type  job_id: string
+        """
+        path = self._job_path(job_id)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        self.descriptions.pop(job_id, None)
+
+
+
+class WorkQueueNode(object):
+    """
+    A node executing the items of a work queue.
+
+    The container of each job is decompressed
+    once per node, when the node leases
+    its first item of the job.
+
+    :param queue: the work queue
+    :type  queue: :class:`aeneas.workqueue.WorkQueue`
+    :param node_id: the identifier of the node;
+                    if ``None``, use the host name and the process id
+    :type  node_id: string
+    :param tts_backend: the TTS backend used by the tasks
+    :type  tts_backend: :class:`aeneas.ttsbackend.TTSBackend`
+    :param cache_directory: the directory of the persistent sync map cache
+    :type  cache_directory: string (path)
+    :param logger: the logger object
+    :type  logger: :class:`aeneas.logger.Logger`
+    """
+
+    TAG = "WorkQueueNode"
+
+    def __init__(
+            self,
+            queue,
+            node_id=None,
+            tts_backend=None,
+            cache_directory=gc.EXECUTE_TASK_CACHE_DIRECTORY,
+            logger=None
+        ):
+        self.queue = queue
+        self.node_id = node_id
+        if self.node_id == None:
+            self.node_id = "%s-%d" % (socket.gethostname(), os.getpid())
+        self.tts_backend = tts_backend
+        self.cache_directory = cache_directory
+        self.logger = logger
+        if self.logger == None:
+            self.logger = Logger()
+        self.executors = dict()
+        self.executed = 0
+
+    def _log(self, message, severity=Logger.DEBUG):
+        """ Log """
+        self.logger.log(message, severity, self.TAG)
+
+    def _executor(self, job_id):
+        """
+        Return the executor of the given job,
+        loading it from its container if needed,
+        or ``None`` if it cannot be loaded.
+
+        :rtype: :class:`aeneas.executejob.ExecuteJob`
+        """
+        if job_id not in self.executors:
+            description = self.queue.description(job_id)
+            executor = ExecuteJob(logger=self.logger)
+            if not executor.load_job_from_container(
+                    description["container"],
+                    description["config_string"]
+                ):
+                return None
+            self.executors[job_id] = executor
+        return self.executors[job_id]
+
+    def execute_item(self, item):
+        """
+        Execute the task of the given leased item,
+        store its sync map, and mark the item as done.
+
+        While the task is executed, the lease is renewed
+        periodically; if the lease is lost (e.g., this node
+        has been too slow), or if another node has completed
+        the item in the meantime, the result is discarded.
+
+        Return ``True`` if the task succeeded.
+
+        :param item: the leased item
+        :type  item: :class:`aeneas.workqueue.WorkItem`
+        :rtype: bool
+        """
+        start = time.time()
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(item, stop))
+        heartbeat.daemon = True
+        heartbeat.start()
+        error = None
+        task = None
+        try:
+            executor = self._executor(item.job_id)
+            if executor == None:
+                error = "The job cannot be loaded from the container"
+            else:
+                task = executor.job.tasks[item.index]
+                expected = self.queue.description(item.job_id)["tasks"][item.index]
+                if self.queue.describe_task(task) != expected:
+                    error = "The task does not match the submitted one"
+                elif not ExecuteTask(
+                        task,
+                        logger=self.logger,
+                        tts_backend=self.tts_backend,
+                        cache_directory=self.cache_directory
+                    ).execute():
+                    error = "An error occurred while executing the task"
+        except Exception as exc:
+            error = "Unexpected error: %s" % exc
+        finally:
+            stop.set()
+            heartbeat.join()
+        if not self.queue.holds(item):
+            self._log("Lease of item '%s' lost, result discarded" % item, Logger.WARNING)
+            return False
+        success = (error == None)
+        if success and not self.queue.results(item.job_id).save(task):
+            error = "Cannot store the sync map"
+            success = False
+        if not self.queue.complete(item, success, error, time.time() - start):
+            # lease lost or completed by another node in the meantime
+            return False
+        self.executed += 1
+        if not success:
+            self._log("Item '%s' failed: %s" % (item, error), Logger.WARNING)
+        return success
+
+    def _heartbeat(self, item, stop):
+        interval = self.queue.lease_duration / 3.0
+        while not stop.wait(interval):
+            if not self.queue.renew(item):
+                return
+
+    def run(self, wait=False, poll_interval=gc.WORK_QUEUE_POLL_INTERVAL):
+        """
+        Execute the pending items of the queue,
+        until no item is pending
+        (or forever, if ``wait`` is ``True``).
+
+        Return the number of items executed.
+
+        :param wait: if ``True``, wait for new items
+                     when no item is pending
+        :type  wait: bool
+        :param poll_interval: the time, in seconds,
+                              between two checks for new items
+        :type  poll_interval: float
+        :rtype: int
+        """
+        executed = self.executed
+        try:
+            while True:
+                item = self.queue.lease(self.node_id)
+                if item != None:
+                    self.execute_item(item)
+                elif wait:
+                    self._clean_finished()
+                    time.sleep(poll_interval)
+                else:
+                    break
+        finally:
+            self.clean()
+        return self.executed - executed
+
+    def _clean_finished(self):
+        """
+        Remove the decompressed containers
+        of the jobs having no pending items.
+        """
+        for job_id in list(self.executors.keys()):
+            status = self.queue.status(job_id)
+            if (status == None) or (status["pending"] + status["leased"] == 0):
+                self.executors.pop(job_id).clean(True)
+
+    def clean(self):
+        """
+        Remove the decompressed containers of all the jobs.
+        """
+        for executor in self.executors.values():
+            executor.clean(True)
+        self.executors = dict()
+
+
+
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(sys.argv[0])))
+sys.path.append(PROJECT_DIR)
+
+from aeneas.workqueue import WorkQueue, WorkQueueNode
+
+def run_node(arguments):
+    directory, node_id = arguments
+    return WorkQueueNode(WorkQueue(directory), node_id=node_id).run()
+
+class TestWorkQueue(unittest.TestCase):
+
+    def test_work_queue(self):
+        input_path = "../aeneas/tests/res/container/job.zip"
+        output_path = "/tmp/"
+        directory = tempfile.mkdtemp()
+        try:
+            queue = WorkQueue(directory)
+            job_id = queue.submit(input_path)
+            self.assertNotEqual(job_id, None)
+            pool = multiprocessing.Pool(3)
+            executed = pool.map(run_node, [(directory, "node%d" % i) for i in range(3)])
+            pool.close()
+            pool.join()
+            self.assertEqual(sum(executed), queue.status(job_id)["tasks"])
+            result, path = queue.gather(job_id, output_path)
+            self.assertTrue(result)
+            self.assertTrue(os.path.exists(path))
+        finally:
+            shutil.rmtree(directory)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
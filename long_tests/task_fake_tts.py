@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+import os
+import sys
+import unittest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(sys.argv[0])))
+sys.path.append(PROJECT_DIR)
+
+from aeneas.executetask import ExecuteTask
+from aeneas.logger import Logger
+from aeneas.task import Task
+from aeneas.ttsbackend import FakeTTSBackend
+
+class TestExecuteTask(unittest.TestCase):
+
+    def test_execute(self):
+        config_string = "task_language=en|os_task_file_format=txt|os_task_file_name=output.txt|is_text_type=plain"
+        task = Task(config_string)
+        task.audio_file_path_absolute = "../aeneas/tests/res/container/job/assets/p001.mp3"
+        task.text_file_path_absolute = "../aeneas/tests/res/inputtext/sonnet_plain.txt"
+        logger = Logger(tee=True)
+        executor = ExecuteTask(task, logger=logger, tts_backend=FakeTTSBackend())
+        result = executor.execute()
+        self.assertTrue(result)
+        task.sync_map_file_path_absolute = "/tmp/output.txt"
+        path = task.output_sync_map_file()
+        self.assertNotEqual(path, None)
+
+
+
+if __name__ == '__main__':
+    unittest.main()